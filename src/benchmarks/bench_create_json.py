@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark the CSV validation and transformation paths in create_json.py.
+
+This script:
+1. Builds synthetic rows covering every MarketplacePlanCSV column
+2. Times the model path (MarketplacePlanCSV(**row) + model_dump) against the
+   TypeAdapter fast path (validate_csv_row), both followed by the transform
+3. Checks that both paths produce identical records and reports the speedup
+
+Usage:
+    uv run python src/benchmarks/bench_create_json.py [--rows N] [--repeat N]
+"""
+
+import sys
+import os
+import argparse
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# Add the src directory to the path so we can import our modules
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from models.model import MarketplacePlanCSV
+from scripts.create_json import transform_csv_record, transform_csv_row, validate_csv_row
+
+
+def build_rows(count: int) -> List[Dict[str, str]]:
+    """Build raw csv.DictReader-style rows with realistic value shapes."""
+    aliases = [field.alias or name for name, field in MarketplacePlanCSV.model_fields.items()]
+    rows: List[Dict[str, str]] = []
+
+    for i in range(count):
+        row: Dict[str, str] = {}
+        for alias in aliases:
+            if 'Premium' in alias or 'Age' in alias:
+                row[alias] = f"${300 + i % 500:,}.{i % 100:02d}"
+            elif 'Deductible' in alias or 'Maximum' in alias:
+                row[alias] = f"${1000 + i % 9000:,}" if i % 4 else "Included in Medical"
+            elif 'Code' in alias or 'ID' in alias:
+                row[alias] = str(10000 + i)
+            else:
+                row[alias] = f"{alias} value {i % 50}"
+        rows.append(row)
+
+    return rows
+
+
+def time_path(label: str, transform: Callable[[Dict[str, str]], Dict[str, Any]],
+              rows: List[Dict[str, str]], repeat: int) -> float:
+    """Run a transform over all rows and return the best time in seconds."""
+    best: Optional[float] = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for row in rows:
+            transform(row)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    assert best is not None
+    print(f"  {label:<28} {best:8.3f}s  ({len(rows) / best:,.0f} rows/s)")
+    return best
+
+
+def main(argv: Optional[List[str]] = None):
+    """Main function to run the benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark create_json.py validation paths.")
+    parser.add_argument('--rows', type=int, default=20000, help="Number of synthetic rows")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per path; the best time is reported")
+    args = parser.parse_args(argv if argv is not None else [])
+
+    print(f"🏁 Benchmarking CSV validation paths with {args.rows:,} rows...")
+    rows = build_rows(args.rows)
+
+    def model_path(row: Dict[str, str]) -> Dict[str, Any]:
+        return transform_csv_record(MarketplacePlanCSV(**row))
+
+    def fast_path(row: Dict[str, str]) -> Dict[str, Any]:
+        return transform_csv_row(validate_csv_row(row))
+
+    if any(model_path(row) != fast_path(row) for row in rows[:1000]):
+        print("❌ Fast path output differs from the model path")
+        return 1
+    print("✓ Fast path output matches the model path")
+
+    # Validation alone shows the cost of the model round-trip without the shared transform
+    print("\n📊 Validation only:")
+    model_validate = time_path("MarketplacePlanCSV + dump",
+                               lambda row: MarketplacePlanCSV(**row).model_dump(by_alias=True),
+                               rows, args.repeat)
+    fast_validate = time_path("validate_csv_row", validate_csv_row, rows, args.repeat)
+
+    print("\n📊 Validation + transform:")
+    model_total = time_path("model path", model_path, rows, args.repeat)
+    fast_total = time_path("fast path", fast_path, rows, args.repeat)
+
+    print("\n🎉 Speedup:")
+    print(f"   • Validation: {model_validate / fast_validate:.2f}x")
+    print(f"   • End to end: {model_total / fast_total:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
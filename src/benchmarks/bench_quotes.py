@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark the vectorized household quotes in household_quotes.py.
+
+This script:
+1. Builds a PlanStore of synthetic plans spread over a number of counties,
+   with premiums following the federal age curve
+2. Builds random households (one to six members) in those counties
+3. Quotes every household against every plan in its county, once by looping
+   over the plan dicts returned by PlanStore.lookup and once with
+   quote_households, checks that both agree and reports households/s
+
+Usage:
+    uv run python src/benchmarks/bench_quotes.py [--counties N] [--plans-per-county N] [--households N]
+"""
+
+import sys
+import os
+import argparse
+import random
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Add the src directory to the path so we can import our modules
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.household_quotes import (
+    CHILD_AGE_LIMIT,
+    CURVE_FIRST_AGE,
+    CURVE_LAST_AGE,
+    DEFAULT_AGE_CURVE,
+    MAX_CHARGED_CHILDREN,
+    PREMIUM_POINTS,
+    quote_households,
+)
+from utils.plan_files import plan_columns
+from utils.plan_store import PlanStore
+
+
+def build_records(counties: int, plans_per_county: int) -> List[Dict[str, Any]]:
+    """Build plan records whose published premiums follow the federal age curve."""
+    records = []
+    for county in range(counties):
+        for plan in range(plans_per_county):
+            record: Dict[str, Any] = {name: None if kind == 'null' else 0 if kind in ('int', 'float') else ''
+                                      for name, kind in plan_columns()}
+            base = 250.0 + (county * 7 + plan * 13) % 200
+            for column, age in PREMIUM_POINTS:
+                record[column] = round(base * DEFAULT_AGE_CURVE[age - CURVE_FIRST_AGE], 2)
+            record.update(state_code='CA', fips_county_code=6000 + county, hios_issuer_id=10000 + plan % 20,
+                          plan_id_standard_component=f"{10000 + plan}CA{county:04d}")
+            records.append(record)
+    return records
+
+
+def build_households(count: int, counties: int, seed: int = 7) -> List[Tuple[str, int, List[int]]]:
+    """Build random households of one to six members."""
+    generator = random.Random(seed)
+    households = []
+    for _ in range(count):
+        adults = [generator.randint(21, 70) for _ in range(generator.randint(1, 2))]
+        children = [generator.randint(0, 20) for _ in range(generator.randint(0, 4))]
+        households.append(('CA', 6000 + generator.randrange(counties), adults + children))
+    return households
+
+
+def member_premium(plan: Dict[str, Any], age: int) -> float:
+    """Interpolate one member's premium from a plan dict, the way a loop over plans would."""
+    age = min(max(age, CURVE_FIRST_AGE), CURVE_LAST_AGE)
+    points = [(point_age, plan[column]) for column, point_age in PREMIUM_POINTS]
+    for (low_age, low), (high_age, high) in zip(points, points[1:]):
+        if age <= high_age or high_age == points[-1][0]:
+            low_factor = DEFAULT_AGE_CURVE[low_age - CURVE_FIRST_AGE]
+            high_factor = DEFAULT_AGE_CURVE[high_age - CURVE_FIRST_AGE]
+            t = (DEFAULT_AGE_CURVE[age - CURVE_FIRST_AGE] - low_factor) / (high_factor - low_factor)
+            return low + (high - low) * t
+    raise AssertionError("unreachable")
+
+
+def quote_with_dicts(store: PlanStore, households: Sequence[Tuple[str, int, List[int]]]) -> List[List[float]]:
+    """Quote each household by looping over its county's plan dicts."""
+    columns = [column for column, _ in PREMIUM_POINTS]
+    quotes = []
+    for state_code, fips_county_code, ages in households:
+        ordered = sorted(ages, reverse=True)
+        children = [age for age in ordered if age < CHILD_AGE_LIMIT][:MAX_CHARGED_CHILDREN]
+        charged = [age for age in ordered if age >= CHILD_AGE_LIMIT] + children
+        plans = store.county_plans(state_code, fips_county_code, columns=columns)
+        quotes.append([sum(member_premium(plan, age) for age in charged) for plan in plans])
+    return quotes
+
+
+def main(argv: Optional[List[str]] = None):
+    """Main function to run the benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark vectorized household premium quotes.")
+    parser.add_argument('--counties', type=int, default=500, help="Number of counties")
+    parser.add_argument('--plans-per-county', type=int, default=60, help="Plans offered in each county")
+    parser.add_argument('--households', type=int, default=20000, help="Number of households to quote")
+    args = parser.parse_args(argv if argv is not None else [])
+
+    print(f"🏁 Quoting {args.households:,} households against {args.plans_per_county} plans in each of "
+          f"{args.counties:,} counties...")
+    records = build_records(args.counties, args.plans_per_county)
+    store = PlanStore(lambda: records)
+    households = build_households(args.households, args.counties)
+
+    started = time.perf_counter()
+    expected = quote_with_dicts(store, households)
+    loop_time = time.perf_counter() - started
+
+    quote_households(store.snapshot, households[:1])  # builds the premium matrix once per snapshot
+    started = time.perf_counter()
+    quotes = quote_households(store.snapshot, households)
+    vector_time = time.perf_counter() - started
+
+    worst = max(abs(a - b) for quote, reference in zip(quotes, expected)
+                for a, b in zip(quote.premiums, reference))
+    print(f"  dict loop      {loop_time:6.2f}s  ({args.households / loop_time:10,.0f} households/s)")
+    print(f"  vectorized     {vector_time:6.2f}s  ({args.households / vector_time:10,.0f} households/s, "
+          f"{loop_time / vector_time:5.1f}x faster)")
+    print(f"  largest difference between the two: ${worst:.6f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark the seed.sql output modes in generate_seed_sql.py.
+
+This script:
+1. Builds synthetic records covering every MarketplacePlanJSON column
+2. Writes a seed file in each output mode (one INSERT per plan, multi-row
+   INSERTs, COPY FROM stdin) and reports the generation time and file size
+3. With --database-url, applies each file with psql the way a seed is loaded
+   and reports the apply time. This TRUNCATEs marketplace_plans before every
+   run, so only point it at a disposable database such as the local
+   `supabase start` one
+
+Usage:
+    uv run python src/benchmarks/bench_seed_sql.py [--records N] [--rows-per-insert N]
+        [--database-url URL]
+"""
+
+import sys
+import os
+import io
+import argparse
+import shutil
+import subprocess
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Add the src directory to the path so we can import our modules
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from scripts.generate_seed_sql import OUTPUT_MODES, get_table_columns, write_seed_rows
+from utils.plan_files import plan_columns
+
+
+def build_records(count: int) -> List[Dict[str, Any]]:
+    """Build records shaped like marketplace_plans.json entries."""
+    records = []
+    for i in range(count):
+        record: Dict[str, Any] = {}
+        for name, kind in plan_columns():
+            if kind == 'float':
+                record[name] = 300.0 + i % 500 + 0.25
+            elif kind == 'int':
+                record[name] = 10000 + i
+            elif kind == 'null':
+                record[name] = None
+            else:
+                record[name] = f"{name[:12]} {i % 50}"
+        record['state_code'] = 'CA'
+        record['plan_id_standard_component'] = f"{10000 + i}CA0010001"
+        records.append(record)
+    return records
+
+
+def write_seed_file(path: Path, records: List[Dict[str, Any]], mode: str, rows_per_insert: int) -> float:
+    """Write a seed file the way generate_seed_sql.py does and return the time taken."""
+    started = time.perf_counter()
+    with open(path, 'w', encoding='utf-8') as f, redirect_stdout(io.StringIO()):
+        f.write("BEGIN;\n")
+        write_seed_rows(f, records, get_table_columns(), mode, rows_per_insert)
+        f.write("COMMIT;\n")
+    return time.perf_counter() - started
+
+
+def apply_seed_file(path: Path, database_url: str) -> float:
+    """Empty marketplace_plans, then load the seed file with psql and return the load time."""
+    subprocess.run(['psql', database_url, '-q', '-v', 'ON_ERROR_STOP=1',
+                    '-c', 'TRUNCATE TABLE marketplace_plans'], check=True, capture_output=True)
+    started = time.perf_counter()
+    subprocess.run(['psql', database_url, '-q', '-v', 'ON_ERROR_STOP=1', '-f', str(path)],
+                   check=True, capture_output=True)
+    return time.perf_counter() - started
+
+
+def main(argv: Optional[List[str]] = None):
+    """Main function to run the benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark the seed.sql output modes.")
+    parser.add_argument('--records', type=int, default=20000, help="Number of synthetic records")
+    parser.add_argument('--rows-per-insert', type=int, default=500, help="Plans per multi-row INSERT")
+    parser.add_argument('--database-url', default=None,
+                        help="Also time loading each file with psql (TRUNCATES marketplace_plans)")
+    args = parser.parse_args(argv if argv is not None else [])
+
+    if args.database_url and shutil.which('psql') is None:
+        print("❌ --database-url needs psql on the PATH")
+        return 1
+
+    print(f"🏁 Writing {args.records:,} records in each seed.sql mode...")
+    records = build_records(args.records)
+
+    baseline_size: Optional[int] = None
+    baseline_apply: Optional[float] = None
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for mode in OUTPUT_MODES:
+            path = Path(temp_dir) / f"seed-{mode}.sql"
+            generate_time = write_seed_file(path, records, mode, args.rows_per_insert)
+            size = path.stat().st_size
+            baseline_size = baseline_size or size
+            line = (f"  {mode:<13} {size / (1024 * 1024):8.2f} MB ({baseline_size / size:5.2f}x smaller)  "
+                    f"generated in {generate_time:6.2f}s")
+
+            if args.database_url:
+                try:
+                    apply_time = apply_seed_file(path, args.database_url)
+                except subprocess.CalledProcessError as e:
+                    print(f"❌ Applying the {mode} seed failed: {e.stderr.decode(errors='replace').strip()}")
+                    return 1
+                baseline_apply = baseline_apply or apply_time
+                line += f"  applied in {apply_time:6.2f}s ({baseline_apply / apply_time:5.2f}x faster)"
+
+            print(line)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
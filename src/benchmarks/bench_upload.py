@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Benchmark the concurrent batch upload in upload_to_db.py.
+
+This script:
+1. Starts a local PostgREST stand-in in a separate process: an HTTP server
+   that accepts inserts on /rest/v1/marketplace_plans, waits a fixed latency
+   per request plus a per-row cost, and echoes the rows back like PostgREST
+2. Points the Supabase client from utils.db at the stand-in
+3. Uploads the same synthetic records with different numbers of batches in
+   flight, then with adaptive batch sizing, and reports the wall time and
+   throughput of each run
+
+Usage:
+    uv run python src/benchmarks/bench_upload.py [--records N] [--batch-size N]
+        [--latency-ms MS] [--row-cost-us US] [--max-body-kb KB] [--in-flight 1,2,4,8]
+"""
+
+import sys
+import os
+import io
+import json
+import argparse
+import multiprocessing
+import threading
+import time
+import urllib.request
+from contextlib import redirect_stdout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+# Add the src directory to the path so we can import our modules
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+
+class PostgrestStandIn(ThreadingHTTPServer):
+    """A threaded HTTP server that answers PostgREST inserts after a simulated delay."""
+
+    daemon_threads = True
+
+    def __init__(self, latency: float, row_cost: float, max_body_bytes: int):
+        super().__init__(('127.0.0.1', 0), PostgrestHandler)
+        self.latency = latency
+        self.row_cost = row_cost
+        self.max_body_bytes = max_body_bytes
+        self.rows_received = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        """Base URL to use as SUPABASE_URL."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class PostgrestHandler(BaseHTTPRequestHandler):
+    """Handle POST /rest/v1/<table> like PostgREST with return=representation."""
+
+    protocol_version = 'HTTP/1.1'
+    server: PostgrestStandIn
+
+    def do_GET(self) -> None:
+        """Report the number of rows received so far (GET /stats)."""
+        with self.server.lock:
+            response = json.dumps({"rows": self.server.rows_received}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def do_DELETE(self) -> None:
+        """Reset the row counter (DELETE /stats)."""
+        with self.server.lock:
+            self.server.rows_received = 0
+        self.send_response(204)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if len(body) > self.server.max_body_bytes:
+            self.send_response(413)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        rows = json.loads(body)
+        rows = rows if isinstance(rows, list) else [rows]
+        time.sleep(self.server.latency + self.server.row_cost * len(rows))
+
+        with self.server.lock:
+            self.server.rows_received += len(rows)
+
+        response = json.dumps(rows).encode('utf-8')
+        self.send_response(201)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        """Keep the benchmark output clean."""
+
+
+def serve_stand_in(latency: float, row_cost: float, max_body_bytes: int,
+                   urls: "multiprocessing.Queue[str]") -> None:
+    """Run the stand-in server until the process is terminated."""
+    server = PostgrestStandIn(latency, row_cost, max_body_bytes)
+    urls.put(server.url)
+    server.serve_forever()
+
+
+def rows_received(url: str) -> int:
+    """Ask the stand-in how many rows it has received."""
+    with urllib.request.urlopen(f"{url}/stats") as response:
+        return json.load(response)["rows"]
+
+
+def reset_rows_received(url: str) -> None:
+    """Reset the stand-in row counter."""
+    urllib.request.urlopen(urllib.request.Request(f"{url}/stats", method='DELETE')).close()
+
+
+def build_records(count: int) -> List[Dict[str, Any]]:
+    """Build records shaped like prepared marketplace_plans rows."""
+    from models.model import MarketplacePlanJSON
+
+    records = []
+    for i in range(count):
+        record: Dict[str, Any] = {}
+        for name, field in MarketplacePlanJSON.model_fields.items():
+            record[name] = 300.0 + i % 500 if 'float' in str(field.annotation) else f"{name} {i % 50}"
+        record['id'] = f"00000000-0000-0000-0000-{i:012d}"
+        records.append(record)
+    return records
+
+
+def main(argv: Optional[List[str]] = None):
+    """Main function to run the benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark concurrent uploads against a local PostgREST stand-in.")
+    parser.add_argument('--records', type=int, default=5000, help="Number of synthetic records")
+    parser.add_argument('--batch-size', type=int, default=100, help="Records per insert request")
+    parser.add_argument('--latency-ms', type=float, default=40.0, help="Simulated round-trip latency per request")
+    parser.add_argument('--row-cost-us', type=float, default=50.0, help="Simulated server time per inserted row")
+    parser.add_argument('--max-body-kb', type=int, default=2048,
+                        help="Reject larger requests with 413 like a gateway body limit")
+    parser.add_argument('--in-flight', default='1,2,4,8', help="Comma-separated max-in-flight values to compare")
+    args = parser.parse_args(argv if argv is not None else [])
+
+    # Run the server in its own process so it does not compete with the uploader for the GIL
+    urls: "multiprocessing.Queue[str]" = multiprocessing.Queue()
+    server = multiprocessing.Process(target=serve_stand_in, daemon=True,
+                                     args=(args.latency_ms / 1000, args.row_cost_us / 1_000_000,
+                                           args.max_body_kb * 1024, urls))
+    server.start()
+    url = urls.get(timeout=30)
+
+    # utils.db builds its client from the environment on first use
+    os.environ['SUPABASE_URL'] = url
+    os.environ['SUPABASE_KEY'] = 'bench-key'
+    from scripts.upload_to_db import BatchSizer, upload_records_to_supabase
+
+    print(f"🏁 Uploading {args.records:,} records in batches of {args.batch_size} to {url} "
+          f"({args.latency_ms:.0f} ms latency, {args.row_cost_us:.0f} µs per row)...")
+    records = build_records(args.records)
+
+    in_flight = [int(value) for value in args.in_flight.split(',')]
+    runs = [(f"{n:>3} in flight", n, None) for n in in_flight]
+    runs.append((f"{in_flight[-1]:>3} in flight, adaptive", in_flight[-1],
+                 BatchSizer(args.batch_size, max_payload_bytes=args.max_body_kb * 1024)))
+
+    baseline: Optional[float] = None
+    for label, max_in_flight, sizer in runs:
+        reset_rows_received(url)
+        started = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            success = upload_records_to_supabase(records, args.batch_size, max_in_flight=max_in_flight, sizer=sizer)
+        elapsed = time.perf_counter() - started
+
+        received = rows_received(url)
+        if not success or received != len(records):
+            print(f"❌ Upload with {label.strip()} failed ({received} rows received)")
+            server.terminate()
+            return 1
+
+        baseline = baseline or elapsed
+        settled = f", settled at {sizer.next_size()} rows" if sizer is not None else ""
+        print(f"  {label:<22} {elapsed:7.2f}s  ({len(records) / elapsed:8,.0f} records/s, "
+              f"{baseline / elapsed:.2f}x{settled})")
+
+    server.terminate()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -7,7 +7,12 @@ This script:
 2. Converts column names to lowercase snake_case
 3. Preserves numeric values as numbers
 4. Converts monetary values (with $) to decimals
-5. Outputs clean JSON data
+5. Outputs clean JSON data (an indented array, or NDJSON with --format ndjson,
+   optionally gzip/zstd compressed with --compression), or a columnar Parquet
+   file with --format parquet
+
+Pass --stream to validate, transform and write records one at a time so that
+peak memory stays flat regardless of the size of the input file.
 """
 
 import sys
@@ -15,13 +20,70 @@ import os
 import json
 import csv
 import re
-from typing import List, Dict, Any, Union
+import io
+import time
+import argparse
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import lru_cache
+from itertools import chain, islice
+from typing import List, Dict, Any, Union, Iterable, Iterator, Optional, Sequence, Tuple, TypedDict
 from datetime import datetime
 
 # Add the src directory to the path so we can import our modules
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from models.model import MarketplacePlanCSV
+from pydantic import TypeAdapter
+from utils.plan_files import (
+    JSON_FORMAT,
+    NDJSON_FORMAT,
+    PARQUET_FORMAT,
+    OUTPUT_FORMATS,
+    NO_COMPRESSION,
+    COMPRESSION_SUFFIXES,
+    encode_ndjson_record,
+    file_size_mb,
+    open_text,
+    plan_file_name,
+    write_parquet_records,
+)
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; column parsing falls back to parse_value per cell
+    np = None
+
+# Compiled validator for raw csv.DictReader rows. It applies the same field
+# checks as MarketplacePlanCSV but returns the alias-keyed dict directly, in
+# model field order, instead of building a model and dumping it again.
+MarketplacePlanCSVRow = TypedDict(  # type: ignore[misc]
+    'MarketplacePlanCSVRow',
+    {field.alias or name: field.annotation for name, field in MarketplacePlanCSV.model_fields.items()},
+)
+CSV_ROW_ADAPTER: TypeAdapter[Dict[str, str]] = TypeAdapter(MarketplacePlanCSVRow)
+
+# A validated CSV record: either a model or a validated alias-keyed row
+CSVRecord = Union[MarketplacePlanCSV, Dict[str, str]]
+
+# Column kinds used by the batch parser
+NUMERIC_COLUMN = 'numeric'
+TEXT_COLUMN = 'text'
+
+# Byte-range chunks created per worker in --workers mode, for load balancing,
+# and chunks submitted per worker before the oldest one is waited for
+CHUNKS_PER_WORKER = 4
+CHUNKS_IN_FLIGHT_PER_WORKER = 2
+
+# Longest mantissa converted in bulk; keeps values exact in float64 (< 2**53)
+MAX_VECTOR_DIGITS = 15
+
+if np is not None:
+    # ASCII characters whose presence means int()/float() can never succeed;
+    # the extra last slot stands for every non-ASCII code point
+    _NUMBER_CHARS = set('0123456789+-._eE$, \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f\x00infinityaINFINITYA')
+    _NON_NUMERIC_CHARS = np.array([chr(code) not in _NUMBER_CHARS for code in range(128)] + [False])
+    _POWERS_OF_TEN = 10.0 ** np.arange(MAX_VECTOR_DIGITS + 1)
 
 
 def convert_to_snake_case(name: str) -> str:
@@ -57,6 +119,29 @@ def convert_to_snake_case(name: str) -> str:
     return name
 
 
+@lru_cache(maxsize=64)
+def snake_case_headers(headers: Tuple[str, ...]) -> Tuple[str, ...]:
+    """
+    Map a header row to snake_case column names.
+
+    The header set is identical for every row of a file, so the mapping is
+    memoized per header tuple and the regex work runs once per file instead
+    of once per cell. Use header_cache_stats() to inspect hits and misses.
+    """
+    return tuple(convert_to_snake_case(header) for header in headers)
+
+
+def header_cache_stats() -> Dict[str, int]:
+    """Return hit/miss counters for the header mapping cache."""
+    info = snake_case_headers.cache_info()
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "max_size": info.maxsize or 0,
+    }
+
+
 def parse_value(value: str) -> Union[str, int, float, None]:
     """Parse a value and convert it to appropriate type."""
     if not value or value.strip() == '':
@@ -95,14 +180,30 @@ def parse_value(value: str) -> Union[str, int, float, None]:
 def transform_csv_record(csv_record: MarketplacePlanCSV) -> Dict[str, Any]:
     """Transform a CSV record to JSON format with snake_case keys and proper types."""
     # Get the original data as a dictionary using the aliases
-    original_data = csv_record.model_dump(by_alias=True)
+    return transform_csv_row(csv_record.model_dump(by_alias=True))
 
-    transformed_data: Dict[str, Any] = {}
 
-    for original_key, value in original_data.items():
-        # Convert key to snake_case
-        snake_case_key = convert_to_snake_case(original_key)
+def validate_csv_row(row: Dict[str, str]) -> Dict[str, str]:
+    """
+    Validate a raw CSV row without building a MarketplacePlanCSV model.
+
+    Returns the same alias-keyed dict as ``MarketplacePlanCSV(**row).model_dump(by_alias=True)``
+    and rejects the same rows.
+    """
+    if None in row:
+        # csv.DictReader stores surplus values under a None key, which the model rejects
+        raise ValueError("Row has more values than the header")
+    return CSV_ROW_ADAPTER.validate_python(row)
 
+
+def transform_csv_row(original_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Transform an alias-keyed CSV row to JSON format with snake_case keys and proper types."""
+    # Convert keys to snake_case using the cached header mapping
+    snake_case_keys = snake_case_headers(tuple(original_data))
+
+    transformed_data: Dict[str, Any] = {}
+
+    for snake_case_key, value in zip(snake_case_keys, original_data.values()):
         # Parse and convert the value
         parsed_value = parse_value(value) if value is not None else None
 
@@ -111,28 +212,270 @@ def transform_csv_record(csv_record: MarketplacePlanCSV) -> Dict[str, Any]:
     return transformed_data
 
 
-def load_csv_data(file_path: str) -> List[MarketplacePlanCSV]:
+def infer_column_kinds(columns: Sequence[Sequence[Optional[str]]]) -> List[str]:
+    """
+    Infer a parser kind for each column from a sample of its values.
+
+    A column is numeric when most of its non-empty sample values parse to a
+    number with parse_value; everything else is treated as text.
+    """
+    kinds: List[str] = []
+    for values in columns:
+        non_empty = [value for value in values if value is not None and value.strip()]
+        numeric = sum(1 for value in non_empty if isinstance(parse_value(value), (int, float)))
+        kinds.append(NUMERIC_COLUMN if non_empty and numeric * 2 >= len(non_empty) else TEXT_COLUMN)
+    return kinds
+
+
+def parse_column(values: Sequence[Optional[str]], kind: str = NUMERIC_COLUMN,
+                 stats: Optional[Dict[str, int]] = None) -> List[Union[str, int, float, None]]:
+    """
+    Parse a whole column of CSV values at once.
+
+    The column is viewed as a matrix of code points and classified with
+    vectorized numpy operations. Cells containing a character that can never
+    appear in a number are returned as stripped text without touching
+    int()/float(). For numeric columns, plain ``$1,234.56`` / ``-12`` /
+    ``3.5`` cells are also converted in bulk by accumulating their digits
+    position by position. Everything else falls back to parse_value, so the
+    result is always identical to calling parse_value on each cell.
+    """
+    if stats is None:
+        stats = {}
+    stats.setdefault('vectorized_cells', 0)
+    stats.setdefault('fallback_cells', 0)
+
+    if np is None or not values:
+        stats['fallback_cells'] += len(values)
+        return [parse_value(value) if value is not None else None for value in values]
+
+    count = len(values)
+    stripped = np.strings.strip(np.array([value if value is not None else '' for value in values], dtype=np.str_))
+    codes = stripped.view(np.uint32).reshape(count, -1)
+
+    empty_mask = codes[:, 0] == 0
+    text_mask = _NON_NUMERIC_CHARS[np.minimum(codes, 128)].any(axis=1)
+    parsed = np.empty(count, dtype=object)
+    parsed[text_mask] = stripped[text_mask].astype(object)
+    resolved = empty_mask | text_mask
+
+    if kind == NUMERIC_COLUMN:
+        int_mask, float_mask, ints, floats = _parse_number_cells(codes, ~resolved)
+        parsed[int_mask] = ints[int_mask]
+        parsed[float_mask] = floats[float_mask]
+        resolved |= int_mask | float_mask
+
+    result: List[Union[str, int, float, None]] = parsed.tolist()
+    fallback_indices = np.flatnonzero(~resolved).tolist()
+    for index in fallback_indices:
+        result[index] = parse_value(values[index])  # type: ignore[arg-type]
+
+    stats['vectorized_cells'] += count - len(fallback_indices)
+    stats['fallback_cells'] += len(fallback_indices)
+    return result
+
+
+def _parse_number_cells(codes: Any, candidates: Any) -> Tuple[Any, Any, Any, Any]:
+    """
+    Convert plain integer and currency cells from their code points.
+
+    Returns int and float masks along with the converted values. Mantissas
+    are limited to MAX_VECTOR_DIGITS digits so that dividing by a power of
+    ten gives the same correctly rounded result as float().
+    """
+    count = codes.shape[0]
+    ok = candidates.copy()
+    mantissa = np.zeros(count, dtype=np.int64)
+    digit_count = np.zeros(count, dtype=np.int64)
+    decimals = np.zeros(count, dtype=np.int64)
+    seen_dot = np.zeros(count, dtype=bool)
+    seen_number = np.zeros(count, dtype=bool)
+    negative = np.zeros(count, dtype=bool)
+    float_syntax = np.zeros(count, dtype=bool)
+
+    # Walk the cells one character position at a time (Horner's method)
+    for position in np.ascontiguousarray(codes.T):
+        is_digit = (position >= 48) & (position <= 57)
+        is_dot = position == 46
+        is_minus = position == 45
+        is_grouping = (position == 36) | (position == 44)  # '$' and ','
+
+        ok &= is_digit | is_dot | is_minus | is_grouping | (position == 0)
+        # Only a single minus before any digit, and a single decimal point
+        ok &= ~(is_minus & (negative | seen_number)) & ~(is_dot & seen_dot)
+
+        mantissa = np.where(is_digit, mantissa * 10 + (position.astype(np.int64) - 48), mantissa)
+        digit_count += is_digit
+        decimals += is_digit & seen_dot
+        seen_dot |= is_dot
+        seen_number |= is_digit | is_dot
+        negative |= is_minus
+        float_syntax |= is_dot | is_grouping
+
+    ok &= (digit_count > 0) & (digit_count <= MAX_VECTOR_DIGITS)
+    magnitude = mantissa / _POWERS_OF_TEN[np.minimum(decimals, MAX_VECTOR_DIGITS)]
+
+    int_mask = ok & ~float_syntax
+    float_mask = ok & float_syntax
+    ints = np.where(negative, -mantissa, mantissa)
+    floats = np.where(negative, -magnitude, magnitude)
+    return int_mask, float_mask, ints, floats
+
+
+def _csv_record_data(record: CSVRecord) -> Dict[str, Any]:
+    """Return the alias-keyed data of a validated record."""
+    return record if isinstance(record, dict) else record.model_dump(by_alias=True)
+
+
+def transform_csv_batch(csv_records: Sequence[CSVRecord],
+                        column_kinds: Optional[List[str]] = None,
+                        stats: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
+    """
+    Transform a batch of CSV records column by column.
+
+    Each column is parsed with parse_column according to its inferred kind.
+    Produces the same dicts as transform_csv_record.
+    """
+    if not csv_records:
+        return []
+
+    dumped = [_csv_record_data(record) for record in csv_records]
+    snake_case_keys = snake_case_headers(tuple(dumped[0]))
+    columns = list(zip(*(row.values() for row in dumped)))
+
+    if column_kinds is None:
+        column_kinds = infer_column_kinds(columns)
+
+    parsed_columns = [parse_column(values, kind, stats) for values, kind in zip(columns, column_kinds)]
+
+    return [dict(zip(snake_case_keys, row)) for row in zip(*parsed_columns)]
+
+
+def iter_csv_records(file_path: str, stats: Optional[Dict[str, int]] = None,
+                     fast_validate: bool = False) -> Iterator[CSVRecord]:
+    """
+    Yield validated CSV records one at a time.
+
+    Only the current row is held in memory. Counts of loaded rows and
+    validation errors are accumulated in ``stats`` when it is provided.
+    With fast_validate, validated row dicts are yielded instead of models.
+    """
+    with open(file_path, 'r', encoding='utf-8') as file:
+        csv_reader = csv.DictReader(file)
+        # Start at 2 since row 1 is headers
+        yield from validate_csv_rows(csv_reader, stats, start_row=2, fast_validate=fast_validate)
+
+
+def validate_csv_rows(rows: Iterable[Dict[str, str]], stats: Optional[Dict[str, int]] = None,
+                      start_row: int = 2, fast_validate: bool = False) -> Iterator[CSVRecord]:
+    """
+    Validate raw CSV rows, skipping and counting failures.
+
+    By default each row becomes a MarketplacePlanCSV model. With
+    fast_validate the row is checked by validate_csv_row and passed on as a
+    dict, which avoids building and dumping a model for every row.
+    """
+    validate = validate_csv_row if fast_validate else _build_csv_model
+    if stats is None:
+        stats = {}
+    stats.setdefault('loaded', 0)
+    stats.setdefault('validation_errors', 0)
+
+    for row_num, row in enumerate(rows, start=start_row):
+        try:
+            record = validate(row)
+        except Exception as e:
+            stats['validation_errors'] += 1
+            if stats['validation_errors'] <= 5:  # Show first 5 errors
+                print(f"  ⚠️ Validation error in row {row_num}: {e}")
+            continue
+
+        stats['loaded'] += 1
+        yield record
+
+
+def _build_csv_model(row: Dict[str, str]) -> MarketplacePlanCSV:
+    """Create a MarketplacePlanCSV instance from a raw CSV row."""
+    return MarketplacePlanCSV(**row)
+
+
+def iter_transformed_records(csv_records: Iterable[CSVRecord],
+                             stats: Optional[Dict[str, int]] = None,
+                             batch_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily apply transform_csv_record to each record, skipping records that fail.
+
+    When batch_size is given, records are transformed in column batches with
+    transform_csv_batch. Column kinds are inferred from the first batch and
+    reused for the rest of the file.
+    """
+    if stats is None:
+        stats = {}
+    stats.setdefault('transformed', 0)
+
+    if batch_size:
+        yield from _iter_transformed_batches(csv_records, stats, batch_size)
+        return
+
+    for i, record in enumerate(csv_records):
+        try:
+            transformed_record = transform_csv_row(_csv_record_data(record))
+        except Exception as e:
+            print(f"  ⚠️ Error transforming record {i + 1}: {e}")
+            continue
+
+        stats['transformed'] += 1
+        yield transformed_record
+
+        # Show progress for large datasets
+        if (i + 1) % 10000 == 0:
+            print(f"  Processed {i + 1:,} records...")
+
+
+def _iter_transformed_batches(csv_records: Iterable[CSVRecord],
+                              stats: Dict[str, int], batch_size: int) -> Iterator[Dict[str, Any]]:
+    """Batch variant of iter_transformed_records."""
+    column_kinds: Optional[List[str]] = None
+    processed = 0
+    records = iter(csv_records)
+
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            break
+
+        try:
+            if column_kinds is None:
+                # Use the first batch as the sample for column kind inference
+                sample = list(zip(*(_csv_record_data(record).values() for record in batch)))
+                column_kinds = infer_column_kinds(sample)
+                numeric = column_kinds.count(NUMERIC_COLUMN)
+                print(f"  🔢 Inferred {numeric} numeric and {len(column_kinds) - numeric} text columns")
+            transformed_batch = transform_csv_batch(batch, column_kinds, stats)
+        except Exception as e:
+            print(f"  ⚠️ Batch transform failed ({e}); falling back to per-record transform")
+            transformed_batch = list(iter_transformed_records(batch, {}))
+
+        stats['transformed'] += len(transformed_batch)
+        yield from transformed_batch
+
+        previous = processed
+        processed += len(batch)
+        # Show progress for large datasets
+        if processed // 10000 > previous // 10000:
+            print(f"  Processed {processed:,} records...")
+
+
+def load_csv_data(file_path: str, fast_validate: bool = False) -> List[CSVRecord]:
     """Load CSV data and validate using Pydantic model."""
     print(f"📖 Loading CSV data from {file_path}...")
 
-    records: List[MarketplacePlanCSV] = []
-    validation_errors = 0
+    stats: Dict[str, int] = {}
 
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            csv_reader = csv.DictReader(file)
-
-            for row_num, row in enumerate(csv_reader, start=2):  # Start at 2 since row 1 is headers
-                try:
-                    # Create MarketplacePlanCSV instance
-                    record = MarketplacePlanCSV(**row)
-                    records.append(record)
-                except Exception as e:
-                    validation_errors += 1
-                    if validation_errors <= 5:  # Show first 5 errors
-                        print(f"  ⚠️ Validation error in row {row_num}: {e}")
-
-        print(f"✅ Successfully loaded {len(records)} records ({validation_errors} validation errors)")
+        records = list(iter_csv_records(file_path, stats, fast_validate))
+
+        print(f"✅ Successfully loaded {len(records)} records ({stats['validation_errors']} validation errors)")
         return records
 
     except FileNotFoundError:
@@ -156,7 +499,251 @@ def save_json_data(data: List[Dict[str, Any]], output_path: str) -> bool:
         return False
 
 
-def generate_transformation_report(sample_data: List[Dict[str, Any]], output_path: str) -> bool:
+def encode_json_record(record: Dict[str, Any]) -> str:
+    """Encode a record as it appears inside the indented JSON array."""
+    # Nest each record one level deeper, matching json.dump(indent=2) of the whole list
+    return json.dumps(record, indent=2, ensure_ascii=False, default=str).replace('\n', '\n  ')
+
+
+def write_json_array(encoded_records: Iterable[str], output_path: str) -> Optional[int]:
+    """
+    Write pre-encoded records to a JSON array file one at a time.
+
+    Returns the number of records written, or None on failure.
+    """
+    count = 0
+    try:
+        with open_text(output_path, 'wt') as f:
+            for encoded in encoded_records:
+                f.write('[\n  ' if count == 0 else ',\n  ')
+                f.write(encoded)
+                count += 1
+
+            f.write('\n]' if count else '[]')
+
+        print(f"💾 JSON data streamed to: {output_path} ({count} records)")
+        return count
+    except Exception as e:
+        print(f"❌ Error streaming JSON file: {e}")
+        return None
+
+
+def write_ndjson(encoded_records: Iterable[str], output_path: str) -> Optional[int]:
+    """
+    Write pre-encoded records as newline-delimited JSON, one record per line.
+
+    Returns the number of records written, or None on failure.
+    """
+    count = 0
+    try:
+        with open_text(output_path, 'wt') as f:
+            for encoded in encoded_records:
+                f.write(encoded)
+                f.write('\n')
+                count += 1
+
+        print(f"💾 NDJSON data streamed to: {output_path} ({count} records)")
+        return count
+    except Exception as e:
+        print(f"❌ Error streaming NDJSON file: {e}")
+        return None
+
+
+def write_parquet(records: Iterable[Dict[str, Any]], output_path: str) -> Optional[int]:
+    """
+    Write records to a columnar Parquet file, one row group at a time.
+
+    Returns the number of records written, or None on failure.
+    """
+    try:
+        count = write_parquet_records(records, output_path)
+        print(f"💾 Parquet data streamed to: {output_path} ({count} records)")
+        return count
+    except Exception as e:
+        print(f"❌ Error writing Parquet file: {e}")
+        return None
+
+
+# Record encoder and file writer for each output format. Parquet records are
+# passed through as dicts and converted to columns by the writer.
+RECORD_ENCODERS = {JSON_FORMAT: encode_json_record, NDJSON_FORMAT: encode_ndjson_record, PARQUET_FORMAT: dict}
+RECORD_WRITERS = {JSON_FORMAT: write_json_array, NDJSON_FORMAT: write_ndjson, PARQUET_FORMAT: write_parquet}
+
+
+def write_records(records: Iterable[Dict[str, Any]], output_path: str,
+                  output_format: str = JSON_FORMAT) -> Optional[int]:
+    """Encode and write records in the given output format one at a time."""
+    return RECORD_WRITERS[output_format](map(RECORD_ENCODERS[output_format], records), output_path)
+
+
+def stream_json_data(records: Iterable[Dict[str, Any]], output_path: str) -> Optional[int]:
+    """
+    Write records to a JSON array file one at a time.
+
+    Produces the same document as save_json_data without materializing the
+    records. Returns the number of records written, or None on failure.
+    """
+    return write_json_array(map(encode_json_record, records), output_path)
+
+
+def find_csv_chunks(file_path: str, chunk_count: int) -> Tuple[List[str], List[Tuple[int, int, int]]]:
+    """
+    Split a CSV file into byte ranges that start and end on row boundaries.
+
+    Quote parity is tracked while scanning so that newlines inside quoted
+    fields never split a row. Returns the header fieldnames and a list of
+    (start_offset, end_offset, first_row_number) tuples.
+    """
+    file_size = os.path.getsize(file_path)
+    chunks: List[Tuple[int, int, int]] = []
+
+    with open(file_path, 'rb') as f:
+        header_bytes = b''
+        in_quotes = False
+        for line in f:
+            header_bytes += line
+            in_quotes ^= line.count(b'"') % 2 == 1
+            if not in_quotes:
+                break
+
+        fieldnames = next(csv.reader(io.StringIO(header_bytes.decode('utf-8'))), [])
+        data_start = len(header_bytes)
+        target_size = max(1, (file_size - data_start) // max(1, chunk_count))
+
+        chunk_start = offset = data_start
+        chunk_row = row_num = 2  # Row 1 is the header
+        in_quotes = False
+        for line in f:
+            offset += len(line)
+            in_quotes ^= line.count(b'"') % 2 == 1
+            if in_quotes:
+                continue
+
+            row_num += 1
+            if offset - chunk_start >= target_size:
+                chunks.append((chunk_start, offset, chunk_row))
+                chunk_start, chunk_row = offset, row_num
+
+        if offset > chunk_start:
+            chunks.append((chunk_start, offset, chunk_row))
+
+    return fieldnames, chunks
+
+
+def convert_csv_chunk(task: Tuple[str, List[str], int, int, int, Optional[int], bool, str]) -> Dict[str, Any]:
+    """
+    Validate, transform and encode one byte range of the CSV file.
+
+    Runs inside a worker process. Returns the encoded records together with
+    the first transformed record and per-chunk counters for reporting.
+    """
+    file_path, fieldnames, start, end, first_row, batch_size, fast_validate, output_format = task
+    encode = RECORD_ENCODERS[output_format]
+    started = time.perf_counter()
+
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    stats: Dict[str, int] = {}
+    rows = csv.DictReader(io.TextIOWrapper(io.BytesIO(data), encoding='utf-8'), fieldnames=fieldnames)
+    valid_rows = validate_csv_rows(rows, stats, start_row=first_row, fast_validate=fast_validate)
+    records = iter_transformed_records(valid_rows, stats, batch_size)
+
+    first_record = next(records, None)
+    encoded = [encode(record) for record in chain([first_record], records)] if first_record else []
+
+    return {
+        "pid": os.getpid(),
+        "encoded": encoded,
+        "first_record": first_record,
+        "stats": stats,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def run_parallel_conversion(csv_file_path: str, json_output_path: str, report_output_path: str,
+                            workers: int, batch_size: Optional[int] = None,
+                            fast_validate: bool = False,
+                            output_format: str = JSON_FORMAT) -> Optional[Dict[str, int]]:
+    """
+    Convert the CSV file to JSON using a pool of worker processes.
+
+    The file is split into row-aligned byte ranges (several per worker so
+    the load stays balanced). Each range is validated, transformed and
+    encoded in a worker, and the results are written back in file order.
+    Only CHUNKS_IN_FLIGHT_PER_WORKER chunks per worker are submitted ahead
+    of the writer, so finished chunks do not pile up in memory.
+    Returns the pipeline counters, or None on failure.
+    """
+    if not os.path.exists(csv_file_path):
+        print(f"❌ File not found: {csv_file_path}")
+        return None
+
+    fieldnames, chunks = find_csv_chunks(csv_file_path, workers * CHUNKS_PER_WORKER)
+    if not chunks:
+        print("❌ No CSV data loaded. Exiting.")
+        return None
+
+    print(f"🧩 Split {csv_file_path} into {len(chunks)} chunks for {workers} workers...")
+    tasks = [(csv_file_path, fieldnames, start, end, first_row, batch_size, fast_validate, output_format)
+             for start, end, first_row in chunks]
+
+    stats: Dict[str, int] = {'loaded': 0, 'validation_errors': 0, 'transformed': 0}
+    worker_stats: Dict[int, Dict[str, float]] = {}
+    first_record: Optional[Dict[str, Any]] = None
+
+    def chunk_results(executor: ProcessPoolExecutor) -> Iterator[Dict[str, Any]]:
+        pending: deque[Future] = deque()
+        for task in tasks:
+            pending.append(executor.submit(convert_csv_chunk, task))
+            # Backpressure: wait for the oldest chunk once enough are queued
+            if len(pending) >= workers * CHUNKS_IN_FLIGHT_PER_WORKER:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def ordered_records(results: Iterable[Dict[str, Any]]) -> Iterator[str]:
+        nonlocal first_record
+        for result in results:
+            for key, value in result["stats"].items():
+                stats[key] = stats.get(key, 0) + value
+            if first_record is None and result["first_record"] is not None:
+                first_record = result["first_record"]
+                print_sample_record(first_record)
+
+            per_worker = worker_stats.setdefault(result["pid"], {"chunks": 0, "records": 0, "seconds": 0.0})
+            per_worker["chunks"] += 1
+            per_worker["records"] += len(result["encoded"])
+            per_worker["seconds"] += result["seconds"]
+
+            yield from result["encoded"]
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Results are taken in submission order, so the output keeps the file order
+            encoded_records = ordered_records(chunk_results(executor))
+            written = RECORD_WRITERS[output_format](encoded_records, json_output_path)
+    except Exception as e:
+        print(f"❌ Error during parallel conversion: {e}")
+        return None
+
+    if written is None or first_record is None:
+        return None
+    stats['written'] = written
+
+    print("\n⚙️ Worker throughput:")
+    for pid, per_worker in sorted(worker_stats.items()):
+        rate = per_worker["records"] / per_worker["seconds"] if per_worker["seconds"] else 0.0
+        print(f"  Worker {pid}: {int(per_worker['chunks'])} chunks, {int(per_worker['records']):,} records "
+              f"in {per_worker['seconds']:.2f}s ({rate:,.0f} records/s)")
+
+    generate_transformation_report([first_record], report_output_path, total_records=written)
+    return stats
+
+
+def generate_transformation_report(sample_data: List[Dict[str, Any]], output_path: str,
+                                   total_records: Optional[int] = None) -> bool:
     """Generate a report showing the transformations applied."""
     try:
         if not sample_data:
@@ -169,7 +756,7 @@ def generate_transformation_report(sample_data: List[Dict[str, Any]], output_pat
             "transformation_info": {
                 "description": "CSV to JSON transformation with snake_case keys and type conversion",
                 "generated_at": datetime.now().isoformat(),
-                "total_records": len(sample_data),
+                "total_records": len(sample_data) if total_records is None else total_records,
                 "transformations_applied": [
                     "Column names converted to lowercase snake_case",
                     "Column names starting with numbers prefixed with 'col_'",
@@ -215,8 +802,82 @@ def generate_transformation_report(sample_data: List[Dict[str, Any]], output_pat
         return False
 
 
-def main():
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line options for the conversion."""
+    parser = argparse.ArgumentParser(description="Convert marketplace plans CSV data to JSON.")
+    parser.add_argument('--stream', action='store_true',
+                        help="Validate, transform and write records one at a time with constant memory")
+    parser.add_argument('--batch-size', type=int, default=None,
+                        help="Parse values column by column in batches of this many records")
+    parser.add_argument('--fast-validate', action='store_true',
+                        help="Validate raw rows with a compiled TypeAdapter instead of building models")
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default=JSON_FORMAT,
+                        help="Write an indented JSON array, newline-delimited JSON (one record per line) "
+                             "or a columnar Parquet file")
+    parser.add_argument('--compression', choices=[NO_COMPRESSION, *COMPRESSION_SUFFIXES], default=NO_COMPRESSION,
+                        help="Compress the output file with gzip or zstd")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Split the CSV into row-aligned chunks and convert them in this many processes")
+    args = parser.parse_args(argv if argv is not None else [])
+
+    if args.format == PARQUET_FORMAT and args.compression != NO_COMPRESSION:
+        parser.error("--compression applies to json and ndjson; Parquet output is zstd-compressed internally")
+    return args
+
+
+def print_sample_record(sample_record: Dict[str, Any]) -> None:
+    """Print the first few fields of a transformed record."""
+    print("\n📋 Sample transformations:")
+    for key, value in list(sample_record.items())[:10]:  # Show first 10 fields
+        value_type = type(value).__name__
+        print(f"  {key}: {value} ({value_type})")
+    print("  ...")
+
+
+def print_header_cache_stats() -> None:
+    """Print the header mapping cache counters."""
+    cache_stats = header_cache_stats()
+    print(f"   • Header mapping cache: {cache_stats['hits']:,} hits, {cache_stats['misses']:,} misses")
+
+
+def run_streaming_conversion(csv_file_path: str, json_output_path: str,
+                             report_output_path: str,
+                             batch_size: Optional[int] = None,
+                             fast_validate: bool = False,
+                             output_format: str = JSON_FORMAT) -> Optional[Dict[str, int]]:
+    """
+    Convert the CSV file to JSON without holding the dataset in memory.
+
+    Rows flow through validation, transformation and serialization as a
+    generator pipeline. Returns the pipeline counters, or None on failure.
+    """
+    if not os.path.exists(csv_file_path):
+        print(f"❌ File not found: {csv_file_path}")
+        return None
+
+    print(f"📖 Streaming CSV data from {csv_file_path}...")
+    stats: Dict[str, int] = {}
+    records = iter_transformed_records(iter_csv_records(csv_file_path, stats, fast_validate), stats, batch_size)
+
+    # Peek at the first record so it can be shown and used for the report
+    first_record = next(records, None)
+    if first_record is None:
+        print("❌ No CSV data loaded. Exiting.")
+        return None
+    print_sample_record(first_record)
+
+    written = write_records(chain([first_record], records), json_output_path, output_format)
+    if written is None:
+        return None
+    stats['written'] = written
+
+    generate_transformation_report([first_record], report_output_path, total_records=written)
+    return stats
+
+
+def main(argv: Optional[List[str]] = None):
     """Main function to orchestrate the CSV to JSON conversion."""
+    args = parse_args(argv)
     print("🚀 Starting CSV to JSON conversion with transformations...")
 
     # Configuration
@@ -224,44 +885,58 @@ def main():
     output_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
 
     # Output file paths
-    json_output_path = os.path.join(output_dir, "marketplace_plans.json")
+    json_output_path = os.path.join(output_dir, plan_file_name("marketplace_plans", args.format, args.compression))
     report_output_path = os.path.join(output_dir, "transformation_report.json")
 
+    if args.stream or args.workers > 1:
+        if args.workers > 1:
+            stats = run_parallel_conversion(csv_file_path, json_output_path, report_output_path,
+                                            args.workers, batch_size=args.batch_size,
+                                            fast_validate=args.fast_validate, output_format=args.format)
+        else:
+            stats = run_streaming_conversion(csv_file_path, json_output_path, report_output_path,
+                                             batch_size=args.batch_size,
+                                             fast_validate=args.fast_validate, output_format=args.format)
+        if stats is None:
+            print("❌ Streaming conversion failed. Exiting.")
+            return
+
+        print("\n🎉 Conversion completed successfully!")
+        print("📊 Summary:")
+        print(f"   • Total records processed: {stats['loaded']}")
+        print(f"   • Successfully transformed: {stats['transformed']}")
+        print(f"   • Validation errors: {stats['validation_errors']}")
+        print(f"   • Output: {json_output_path} ({file_size_mb(json_output_path):.2f} MB)")
+        if 'vectorized_cells' in stats:
+            print(f"   • Vectorized cells: {stats['vectorized_cells']:,} ({stats['fallback_cells']:,} per-cell fallbacks)")
+        if args.workers <= 1:
+            print_header_cache_stats()
+        return
+
     # Step 1: Load and validate CSV data
-    csv_records = load_csv_data(csv_file_path)
+    csv_records = load_csv_data(csv_file_path, fast_validate=args.fast_validate)
     if not csv_records:
         print("❌ No CSV data loaded. Exiting.")
         return
 
     # Step 2: Transform records
     print("🔄 Transforming records...")
-    transformed_records: List[Dict[str, Any]] = []
-
-    for i, record in enumerate(csv_records):
-        try:
-            transformed_record = transform_csv_record(record)
-            transformed_records.append(transformed_record)
-
-            # Show progress for large datasets
-            if (i + 1) % 10000 == 0:
-                print(f"  Processed {i + 1:,} records...")
-        except Exception as e:
-            print(f"  ⚠️ Error transforming record {i + 1}: {e}")
-            continue
+    transformed_records: List[Dict[str, Any]] = list(
+        iter_transformed_records(csv_records, batch_size=args.batch_size)
+    )
 
     print(f"✅ Successfully transformed {len(transformed_records)} records")
 
     # Step 3: Show sample of transformations
     if transformed_records:
-        print("\n📋 Sample transformations:")
-        sample_record = transformed_records[0]
-        for key, value in list(sample_record.items())[:10]:  # Show first 10 fields
-            value_type = type(value).__name__
-            print(f"  {key}: {value} ({value_type})")
-        print("  ...")
+        print_sample_record(transformed_records[0])
 
     # Step 4: Save JSON data
-    if not save_json_data(transformed_records, json_output_path):
+    if args.format == JSON_FORMAT and args.compression == NO_COMPRESSION:
+        saved = save_json_data(transformed_records, json_output_path)
+    else:
+        saved = write_records(transformed_records, json_output_path, args.format) is not None
+    if not saved:
         print("❌ Failed to save JSON file. Exiting.")
         return
 
@@ -275,8 +950,9 @@ def main():
     print(f"\n📊 Summary:")
     print(f"   • Total records processed: {len(csv_records)}")
     print(f"   • Successfully transformed: {len(transformed_records)}")
-    print(f"   • Output format: JSON with snake_case keys and proper types")
+    print(f"   • Output format: {args.format.upper()} with snake_case keys and proper types")
+    print_header_cache_stats()
 
 
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1:])
@@ -2,17 +2,63 @@
 """
 Script to generate seed.sql file from marketplace_plans.json
 Creates INSERT statements for the marketplace_plans table using the MarketplacePlanJSON model
+
+The input may also be an NDJSON file (optionally .gz/.zst compressed) or a Parquet
+file written by create_json.py --format ndjson/parquet, in which case records are
+read one line or one record batch at a time. With --workers the statements
+are formatted in a pool of processes and written in input order. An output path
+ending in .gz (or .zst) is compressed. The seed ends by refreshing the
+state_county_lookup materialized view and rebuilding the slcsp_benchmarks
+table (its per-statement triggers are deferred for the seed's transaction).
+
+Output modes (--mode):
+    insert        one INSERT statement per plan (the default)
+    multi-insert  INSERT statements of --rows-per-insert plans each, so the column
+                  list is written once per statement instead of once per plan
+    copy          a single COPY ... FROM stdin block in PostgreSQL text format;
+                  the smallest and fastest to apply, but only psql understands it
+
+Usage:
+    python generate_seed_sql.py [--input PATH] [--output PATH]
+        [--mode insert|multi-insert|copy] [--rows-per-insert N] [--workers N] [--chunk-size N] [--validate]
 """
 
+import argparse
 import json
+import math
+import os
 import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import chain, islice, repeat
 from pathlib import Path
-from typing import Any
+from functools import lru_cache, partial
+from typing import Any, Callable, Iterable, Iterator, List, Optional, TextIO
 
 # Add src to path to import models
 sys.path.append(str(Path(__file__).parent.parent))
 
 from models.model import MarketplacePlanJSON
+from utils.plan_files import iter_plan_records, open_text, plan_columns
+from utils.plan_validation import validate_plan_batch
+
+INSERT_MODE = 'insert'
+MULTI_INSERT_MODE = 'multi-insert'
+COPY_MODE = 'copy'
+OUTPUT_MODES = (INSERT_MODE, MULTI_INSERT_MODE, COPY_MODE)
+
+DEFAULT_ROWS_PER_INSERT = 500
+
+# Plans formatted per task, and tasks queued per worker process in --workers mode
+DEFAULT_CHUNK_SIZE = 2000
+CHUNKS_IN_FLIGHT_PER_WORKER = 2
+
+PROGRESS_INTERVAL = 1000
+
+# Characters that must be escaped in SQL string literals and in COPY text format
+SQL_ESCAPES = str.maketrans({"'": "''", '\\': '\\\\'})
+COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
 
 
 def escape_sql_string(value: Any) -> str:
@@ -21,17 +67,143 @@ def escape_sql_string(value: Any) -> str:
         return "NULL"
     if isinstance(value, bool):
         return "TRUE" if value else "FALSE"
-    if isinstance(value, (int, float)):
-        if str(value).lower() in ('nan', 'inf', '-inf'):
-            return "NULL"
+    if isinstance(value, float):
+        # NaN and infinity have no SQL literal
+        return str(value) if math.isfinite(value) else "NULL"
+    if isinstance(value, int):
         return str(value)
     if isinstance(value, str):
         # Escape single quotes and backslashes
-        escaped = value.replace("'", "''").replace("\\", "\\\\")
-        return f"'{escaped}'"
+        return f"'{value.translate(SQL_ESCAPES)}'"
     return f"'{str(value)}'"
 
 
+def escape_copy_value(value: Any) -> str:
+    """Format a value for a COPY text-format row"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, float):
+        return str(value) if math.isfinite(value) else "\\N"
+    if isinstance(value, int):
+        return str(value)
+    return str(value).translate(COPY_ESCAPES)
+
+
+# Type-specialized formatters. Each handles the value type its column is declared
+# with directly and hands anything else (None, or a value of an unexpected type)
+# to the general escape function, so the output is always the same as escaping
+# every value with escape_sql_string / escape_copy_value.
+
+def format_sql_float(value: Any) -> str:
+    if value.__class__ is float:
+        return repr(value) if math.isfinite(value) else "NULL"
+    return escape_sql_string(value)
+
+
+def format_sql_int(value: Any) -> str:
+    if value.__class__ is int:
+        return repr(value)
+    return escape_sql_string(value)
+
+
+def format_sql_text(value: Any) -> str:
+    if value.__class__ is str:
+        return f"'{value.translate(SQL_ESCAPES)}'"
+    return escape_sql_string(value)
+
+
+def format_copy_float(value: Any) -> str:
+    if value.__class__ is float:
+        return repr(value) if math.isfinite(value) else "\\N"
+    return escape_copy_value(value)
+
+
+def format_copy_int(value: Any) -> str:
+    if value.__class__ is int:
+        return repr(value)
+    return escape_copy_value(value)
+
+
+def format_copy_text(value: Any) -> str:
+    if value.__class__ is str:
+        return value.translate(COPY_ESCAPES)
+    return escape_copy_value(value)
+
+
+def format_number_column(values: list[Any], number_type: type, formatter: Callable[[Any], str]) -> list[str]:
+    """
+    Format a numeric column in one pass.
+
+    When every value has the column's type (and, for floats, their sum is
+    finite, so none is NaN or infinite) the whole column is formatted with
+    the type's repr; otherwise each value goes through the column formatter.
+    """
+    if set(map(type, values)) == {number_type} and (number_type is int or math.isfinite(sum(values))):
+        return list(map(number_type.__repr__, values))
+    return list(map(formatter, values))
+
+
+def format_text_column(values: list[Any], escapes: dict[int, str], template: str,
+                       formatter: Callable[[Any], str]) -> list[str]:
+    """
+    Format a text column in one pass.
+
+    When every value is a string the column is escaped with a single
+    translate over the joined values; otherwise each value goes through the
+    column formatter.
+    """
+    if set(map(type, values)) == {str}:
+        joined = COLUMN_SEPARATOR.join(values)
+        if joined.count(COLUMN_SEPARATOR) == len(values) - 1:
+            return list(map(template.format, joined.translate(escapes).split(COLUMN_SEPARATOR)))
+    return list(map(formatter, values))
+
+
+# Separates the values of a text column while it is escaped as one string
+COLUMN_SEPARATOR = '\x00'
+
+SQL_COLUMN_FORMATTERS: dict[str, Callable[[list[Any]], list[str]]] = {
+    'float': partial(format_number_column, number_type=float, formatter=format_sql_float),
+    'int': partial(format_number_column, number_type=int, formatter=format_sql_int),
+    'text': partial(format_text_column, escapes=SQL_ESCAPES, template="'{}'", formatter=format_sql_text),
+}
+COPY_COLUMN_FORMATTERS: dict[str, Callable[[list[Any]], list[str]]] = {
+    'float': partial(format_number_column, number_type=float, formatter=format_copy_float),
+    'int': partial(format_number_column, number_type=int, formatter=format_copy_int),
+    'text': partial(format_text_column, escapes=COPY_ESCAPES, template="{}", formatter=format_copy_text),
+}
+
+
+@lru_cache(maxsize=8)
+def column_formatters(columns: tuple[str, ...], copy: bool = False) -> tuple[Callable[[list[Any]], list[str]], ...]:
+    """Pick a column formatter for each column once, from its MarketplacePlanJSON field type"""
+    kinds = dict(plan_columns())
+    formatters = COPY_COLUMN_FORMATTERS if copy else SQL_COLUMN_FORMATTERS
+    fallback = partial(map_values, formatter=escape_copy_value if copy else escape_sql_string)
+    return tuple(formatters.get(kinds.get(column, ''), fallback) for column in columns)
+
+
+def map_values(values: list[Any], formatter: Callable[[Any], str]) -> list[str]:
+    """Format a column of values one by one"""
+    return list(map(formatter, values))
+
+
+def format_value_rows(plans: list[dict[str, Any]], columns: list[str], copy: bool = False) -> list[tuple[str, ...]]:
+    """
+    Format the values of a batch of plans column by column.
+
+    Each column is gathered and formatted in one pass with the formatter
+    chosen for it, then the columns are transposed back into rows.
+    """
+    formatted_columns = [
+        formatter(list(map(dict.get, plans, repeat(column))))
+        for column, formatter in zip(columns, column_formatters(tuple(columns), copy))
+    ]
+    return list(zip(*formatted_columns)) if formatted_columns else [() for _ in plans]
+
+
 def get_table_columns() -> list[str]:
     """Get the column names from the MarketplacePlanJSON model in the correct order"""
     # Get field names from the Pydantic model
@@ -43,32 +215,205 @@ def get_table_columns() -> list[str]:
     return columns
 
 
-def generate_insert_statement(plan: dict[str, Any], columns: list[str]) -> str:
-    """Generate a single INSERT statement for a marketplace plan"""
+def generate_values_tuple(plan: dict[str, Any], columns: list[str]) -> str:
+    """Generate the parenthesized VALUES tuple for a marketplace plan"""
+    return values_tuple(format_value_rows([plan], columns[1:])[0])
 
-    # Generate UUID for the id field
-    values = ["gen_random_uuid()"]  # PostgreSQL function to generate UUID
 
-    # Add values for each column (excluding id which we just added)
-    for column in columns[1:]:  # Skip the id column
-        value = plan.get(column)
-        values.append(escape_sql_string(value))
+def values_tuple(values: tuple[str, ...]) -> str:
+    """Build a VALUES tuple from formatted values, generating the UUID for the id field"""
+    return f"(gen_random_uuid(), {', '.join(values)})" if values else "(gen_random_uuid())"
 
-    # Create the INSERT statement
-    columns_str = ", ".join(columns)
-    values_str = ", ".join(values)
 
-    return f"INSERT INTO marketplace_plans ({columns_str}) VALUES ({values_str});"
+def generate_insert_statement(plan: dict[str, Any], columns: list[str]) -> str:
+    """Generate a single INSERT statement for a marketplace plan"""
+    columns_str = ", ".join(columns)
+    return f"INSERT INTO marketplace_plans ({columns_str}) VALUES {generate_values_tuple(plan, columns)};"
 
 
-def main():
+def generate_multi_insert_statement(values_tuples: list[str], columns: list[str]) -> str:
+    """Generate one INSERT statement for several VALUES tuples"""
+    columns_str = ", ".join(columns)
+    rows_str = ",\n".join(values_tuples)
+    return f"INSERT INTO marketplace_plans ({columns_str}) VALUES\n{rows_str};"
+
+
+def generate_copy_header(columns: list[str]) -> str:
+    """Generate the COPY statement that starts a stdin data block (id is left to its default)"""
+    return f"COPY marketplace_plans ({', '.join(columns[1:])}) FROM stdin;"
+
+
+def generate_copy_row(plan: dict[str, Any], columns: list[str]) -> str:
+    """Generate a tab-separated COPY text-format row for a marketplace plan"""
+    return "\t".join(format_value_rows([plan], columns[1:], copy=True)[0])
+
+
+def format_seed_chunk(plans: list[dict[str, Any]], columns: list[str], mode: str = INSERT_MODE,
+                      rows_per_insert: int = DEFAULT_ROWS_PER_INSERT,
+                      first_index: int = 0, validate: bool = False) -> tuple[str, list[str], int, int]:
+    """
+    Format a chunk of plans as seed SQL text in the given output mode.
+
+    In multi-insert mode the chunk is split into statements of
+    rows_per_insert plans, so chunks should be a multiple of it. With
+    validate, the whole chunk is first checked against MarketplacePlanJSON
+    and plans that fail are left out and reported with their row numbers.
+
+    Returns:
+        tuple[str, list[str], int, int]: The SQL text, the error messages,
+        the number of plans written and the number that failed validation
+    """
+    copy = mode == COPY_MODE
+    errors: list[str] = []
+    invalid_count = 0
+    if validate:
+        invalid, errors = validate_plan_batch(plans, first_row=first_index + 1)
+        if invalid:
+            invalid_count = len(invalid)
+            plans = [plan for i, plan in enumerate(plans) if i not in invalid]
+    try:
+        value_rows = format_value_rows(plans, columns[1:], copy)
+    except Exception:
+        # A malformed plan fails the whole batch; format plan by plan to skip and report it
+        value_rows = []
+        for i, plan in enumerate(plans, start=first_index):
+            try:
+                value_rows.extend(format_value_rows([plan], columns[1:], copy))
+            except Exception as e:
+                errors.append(f"Error processing record {i + 1}: {e}")
+
+    if mode == COPY_MODE:
+        lines = ["\t".join(values) for values in value_rows]
+    elif mode == MULTI_INSERT_MODE:
+        tuples = [values_tuple(values) for values in value_rows]
+        lines = [generate_multi_insert_statement(tuples[start:start + rows_per_insert], columns)
+                 for start in range(0, len(tuples), rows_per_insert)]
+    else:
+        prefix = f"INSERT INTO marketplace_plans ({', '.join(columns)}) VALUES "
+        lines = [f"{prefix}{values_tuple(values)};" for values in value_rows]
+
+    return "".join(line + "\n" for line in lines), errors, len(value_rows), invalid_count
+
+
+def format_seed_task(task: tuple[list[dict[str, Any]], list[str], str, int, int, bool]
+                     ) -> tuple[str, list[str], int, int]:
+    """Format one chunk in a worker process (see format_seed_chunk)."""
+    return format_seed_chunk(*task)
+
+
+def iter_chunks(plans: Iterable[dict[str, Any]], chunk_size: int) -> Iterator[list[dict[str, Any]]]:
+    """Group plans into lists of chunk_size, reading the input lazily"""
+    iterator = iter(plans)
+    while chunk := list(islice(iterator, chunk_size)):
+        yield chunk
+
+
+def write_seed_rows(f: TextIO, plans: Iterable[dict[str, Any]], columns: list[str],
+                    mode: str = INSERT_MODE, rows_per_insert: int = DEFAULT_ROWS_PER_INSERT,
+                    workers: int = 1, chunk_size: int = DEFAULT_CHUNK_SIZE, validate: bool = False,
+                    stats: Optional[dict[str, int]] = None) -> int:
+    """
+    Write the plans to an open seed file in the given output mode.
+
+    Plans are read in chunks of chunk_size. With more than one worker the
+    chunks are formatted (and validated) in a process pool, with at most a
+    few chunks per worker held in memory, and written in input order, so the
+    output is the same as with a single worker.
+
+    If given, stats receives the number of plans 'written' and the number
+    left out as 'invalid'.
+
+    Returns:
+        int: Number of plans read
+    """
+    if stats is None:
+        stats = {}
+    stats['written'] = stats['invalid'] = 0
+
+    if mode == MULTI_INSERT_MODE:
+        # Keep statements whole within a chunk so the output does not depend on the chunking
+        chunk_size = -(-chunk_size // rows_per_insert) * rows_per_insert
+
+    if mode == COPY_MODE:
+        f.write(generate_copy_header(columns) + "\n")
+
+    total_records = 0
+
+    def write_chunk(count: int, text: str, errors: list[str], written: int, invalid: int) -> None:
+        nonlocal total_records
+        f.write(text)
+        stats['written'] += written
+        stats['invalid'] += invalid
+        for error in errors:
+            print(error)
+        # Progress indicator
+        if (total_records + count) // PROGRESS_INTERVAL > total_records // PROGRESS_INTERVAL:
+            print(f"  Processed {total_records + count} records...")
+        total_records += count
+
+    chunks = iter_chunks(plans, chunk_size)
+    if workers <= 1:
+        for chunk in chunks:
+            write_chunk(len(chunk), *format_seed_chunk(chunk, columns, mode, rows_per_insert, total_records,
+                                                       validate))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending: deque[tuple[int, Future]] = deque()
+            submitted = 0
+            for chunk in chunks:
+                pending.append((len(chunk), executor.submit(
+                    format_seed_task, (chunk, columns, mode, rows_per_insert, submitted, validate))))
+                submitted += len(chunk)
+                # Backpressure: wait for the oldest chunk once enough are queued
+                if len(pending) >= workers * CHUNKS_IN_FLIGHT_PER_WORKER:
+                    count, future = pending.popleft()
+                    write_chunk(count, *future.result())
+            while pending:
+                count, future = pending.popleft()
+                write_chunk(count, *future.result())
+
+    if mode == COPY_MODE:
+        f.write("\\.\n")
+
+    return total_records
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Generate supabase/seed.sql from the marketplace plans data.")
+    parser.add_argument('--input', type=Path, default=None,
+                        help="JSON array, NDJSON (.ndjson, .jsonl, optionally .gz/.zst) or Parquet file to read "
+                             "(default: src/data/marketplace_plans.json)")
+    parser.add_argument('--output', type=Path, default=None,
+                        help="SQL file to write, compressed if it ends in .gz or .zst (default: supabase/seed.sql)")
+    parser.add_argument('--mode', choices=OUTPUT_MODES, default=INSERT_MODE,
+                        help="One INSERT per plan, multi-row INSERTs, or a COPY FROM stdin block (psql only)")
+    parser.add_argument('--rows-per-insert', type=int, default=DEFAULT_ROWS_PER_INSERT,
+                        help="Plans per INSERT statement in multi-insert mode")
+    parser.add_argument('--workers', type=int, default=1,
+                        help=f"Format statements in this many processes (this machine has {os.cpu_count()} CPUs)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="Plans formatted (and validated) per task")
+    parser.add_argument('--validate', action='store_true',
+                        help="Validate every record against MarketplacePlanJSON, reporting failures with their "
+                             "row numbers and leaving them out of the seed")
+    args = parser.parse_args(argv if argv is not None else [])
+    if args.rows_per_insert < 1:
+        parser.error("--rows-per-insert must be at least 1")
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+    return args
+
+
+def main(argv: Optional[List[str]] = None):
     """Main function to generate seed.sql file"""
+    args = parse_args(argv)
 
     # Define paths relative to script location
     script_dir = Path(__file__).parent
     project_root = script_dir.parent.parent
-    json_file = project_root / "src" / "data" / "marketplace_plans.json"
-    output_file = project_root / "supabase" / "seed.sql"
+    json_file = args.input or project_root / "src" / "data" / "marketplace_plans.json"
+    output_file = args.output or project_root / "supabase" / "seed.sql"
 
     print(f"Reading data from: {json_file}")
     print(f"Output file: {output_file}")
@@ -79,17 +424,15 @@ def main():
         return 1
 
     try:
-        # Load and validate JSON data
+        # Load and validate JSON data; NDJSON input is read one record at a time
         print("Loading JSON data...")
-        with open(json_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-
-        print(f"Loaded {len(data)} records")
+        records = iter_plan_records(str(json_file))
+        first_record = next(records, None)
 
-        # Validate first record with Pydantic model
-        if data:
+        # Validate first record with Pydantic model (--validate checks every record while writing)
+        if first_record is not None and not args.validate:
             try:
-                MarketplacePlanJSON(**data[0])
+                MarketplacePlanJSON(**first_record)
                 print("✓ Data validation successful")
             except Exception as e:
                 print(f"Warning: Data validation failed for first record: {e}")
@@ -100,12 +443,15 @@ def main():
         print(f"Table columns ({len(columns)}): {', '.join(columns[:5])}...")
 
         # Generate SQL file
-        print("Generating SQL INSERT statements...")
+        workers = f", {args.workers} workers" if args.workers > 1 else ""
+        validating = ", validating every record" if args.validate else ""
+        print(f"Generating SQL ({args.mode} mode{workers}{validating})...")
+        started = time.perf_counter()
 
-        with open(output_file, 'w', encoding='utf-8') as f:
+        with open_text(str(output_file), 'wt') as f:
             # Write header
             f.write("-- Seed data for marketplace_plans table\n")
-            f.write(f"-- Generated from marketplace_plans.json with {len(data)} records\n")
+            f.write(f"-- Generated from {json_file.name}\n")
             f.write(f"-- Generated on: {Path(__file__).name}\n\n")
 
             # Write TRUNCATE statement (optional, commented out by default)
@@ -115,25 +461,29 @@ def main():
             # Write INSERT statements
             f.write("-- Insert marketplace plans data\n")
             f.write("BEGIN;\n\n")
-
-            for i, plan in enumerate(data):
-                try:
-                    insert_statement = generate_insert_statement(plan, columns)
-                    f.write(insert_statement + "\n")
-
-                    # Progress indicator
-                    if (i + 1) % 1000 == 0:
-                        print(f"  Processed {i + 1}/{len(data)} records...")
-
-                except Exception as e:
-                    print(f"Error processing record {i + 1}: {e}")
-                    continue
-
+            # Rebuild the SLCSP benchmarks once at the end rather than after every statement
+            f.write("SET LOCAL marketplace.defer_slcsp = 'on';\n\n")
+
+            data = chain([first_record], records) if first_record is not None else records
+            stats: dict[str, int] = {}
+            total_records = write_seed_rows(f, data, columns, args.mode, args.rows_per_insert,
+                                            workers=args.workers, chunk_size=args.chunk_size,
+                                            validate=args.validate, stats=stats)
+
+            # Rebuild the county lookup and the SLCSP benchmarks from the rows just inserted
+            f.write("\nSELECT refresh_state_county_lookup();\n")
+            f.write("SELECT refresh_slcsp_benchmarks();\n")
             f.write("\nCOMMIT;\n")
-            f.write(f"\n-- Total records inserted: {len(data)}\n")
+            f.write(f"\n-- Total records inserted: {stats['written']}\n")
 
         print(f"✓ Successfully generated {output_file}")
-        print(f"  Total records: {len(data)}")
+        print(f"  Total records: {total_records}")
+        if args.validate:
+            if stats['invalid']:
+                print(f"  ⚠️ {stats['invalid']} records failed validation and were left out (see above)")
+            else:
+                print("  ✓ All records passed validation")
+        print(f"  Generated in {time.perf_counter() - started:.2f}s")
 
         # Show file size
         file_size = output_file.stat().st_size
@@ -154,5 +504,5 @@ def main():
 
 
 if __name__ == "__main__":
-    exit_code = main()
+    exit_code = main(sys.argv[1:])
     sys.exit(exit_code)
@@ -3,36 +3,88 @@
 Upload marketplace plans JSON data to Supabase database.
 
 This script:
-1. Reads the marketplace_plans.json file
+1. Reads the marketplace_plans.json file (or an NDJSON file, optionally gzip/zstd compressed,
+   or a Parquet file read one record batch at a time)
 2. Validates each record using the MarketplacePlanJSON Pydantic model
-3. Uploads records to the Supabase marketplace_plans table
-4. Provides progress tracking and error handling
+3. Uploads records to the Supabase marketplace_plans table, or with --copy streams them
+   straight into the database behind Supabase with PostgreSQL COPY
+4. Refreshes the state_county_lookup materialized view once the load has finished
+   (the slcsp_benchmarks table is rebuilt per county by triggers on marketplace_plans)
+5. Provides progress tracking and error handling
+
+Usage:
+    python upload_to_db.py [--input PATH] [--limit N] [--offset N] [--batch-size N] [--max-in-flight N]
+                        [--no-adaptive] [--min-batch-size N] [--max-batch-size N] [--max-payload-kb N]
+                        [--journal PATH] [--resume] [--upsert]
+                        [--copy] [--database-url URL] [--copy-format binary|csv] [--no-refresh-lookup]
 """
 
 import sys
 import os
 import json
-from typing import List, Dict, Any, Optional
+import re
+import time
+import hashlib
+import argparse
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import chain, islice
+from typing import List, Dict, Any, Optional, Deque, Iterable, Iterator, Set, Sized, Tuple
 import uuid
 
 # Add the src directory to the path so we can import our modules
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from models.model import MarketplacePlanJSON
-from utils.db import get_supabase_client
-from pydantic import ValidationError
-
-
-def load_json_data(file_path: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
-    """Load JSON data from file with optional limit."""
+from utils.db import (SupabaseClientPool, get_client_pool, get_supabase_client, invalidate_cached_queries,
+                      stream_table)
+from utils.json_payload import encode_rows, execute_with_payload, join_rows
+from utils.pg_copy import BINARY_FORMAT, COPY_FORMATS, LOCAL_DATABASE_URL, call_function, copy_records_to_postgres
+from utils.plan_files import iter_plan_records
+from utils.plan_validation import MarketplacePlanJSONRow
+from utils.upload_journal import BUSINESS_KEY_COLUMNS, UploadJournal, business_key, open_journal
+import httpx
+from pydantic import TypeAdapter, ValidationError
+
+# Validates a raw record and returns the same dict as MarketplacePlanJSON(**record).model_dump()
+PLAN_ROW_ADAPTER: TypeAdapter[Dict[str, Any]] = TypeAdapter(MarketplacePlanJSONRow)
+
+# Invalid and unchanged record positions are written to the journal in groups of this size
+JOURNAL_FLUSH_SIZE = 1000
+
+# A batch whose request never reached PostgREST (or was turned away with one of
+# these statuses) is sent again, with the same body, up to this many times in all.
+# A 503 may come from a proxy after PostgREST committed the batch, so it is only
+# retried for upserts, where sending the batch again is harmless.
+SEND_ATTEMPTS = 3
+RETRY_DELAY_SECONDS = 0.5
+TRANSIENT_STATUS_CODES = ('429',)
+UPSERT_TRANSIENT_STATUS_CODES = ('429', '503')
+
+# Database function that refreshes the state_county_lookup materialized view
+REFRESH_LOOKUP_FUNCTION = 'refresh_state_county_lookup'
+
+# Tables whose cached query results are dropped after a load
+LOADED_TABLES = ('marketplace_plans', 'state_county_lookup', 'slcsp_benchmarks')
+
+
+def load_json_data(file_path: str, limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
+    """
+    Load JSON data from file with optional limit and offset.
+
+    Accepts a JSON array, an NDJSON file (optionally .gz/.zst compressed) or a
+    Parquet file. All of them are read incrementally (JSON arrays through a
+    memory map), so a limit stops reading early and records before the offset
+    are not kept in memory.
+    """
     print(f"📖 Loading JSON data from {file_path}...")
 
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = list(islice(iter_plan_records(file_path, offset=offset), limit or None))
 
+        if offset:
+            print(f"⏭️ Skipped the first {offset} records")
         if limit:
-            data = data[:limit]
             print(f"✅ Loaded {len(data)} records (limited to {limit} for testing)")
         else:
             print(f"✅ Loaded {len(data)} records")
@@ -50,6 +102,27 @@ def load_json_data(file_path: str, limit: Optional[int] = None) -> List[Dict[str
         return []
 
 
+def iter_json_data(file_path: str, limit: Optional[int] = None, offset: int = 0) -> Iterator[Dict[str, Any]]:
+    """
+    Stream records from a plan file with optional limit and offset.
+
+    Like load_json_data, but records are yielded as they are read instead of
+    being collected in a list. Errors are reported and end the stream.
+    """
+    print(f"📖 Streaming JSON data from {file_path}...")
+    if offset:
+        print(f"⏭️ Skipping the first {offset} records")
+
+    try:
+        yield from islice(iter_plan_records(file_path, offset=offset), limit or None)
+    except FileNotFoundError:
+        print(f"❌ File not found: {file_path}")
+    except json.JSONDecodeError as e:
+        print(f"❌ Invalid JSON format: {e}")
+    except Exception as e:
+        print(f"❌ Error loading JSON data: {e}")
+
+
 def validate_record(record_data: Dict[str, Any]) -> Optional[MarketplacePlanJSON]:
     """Validate a single record using the Pydantic model."""
     try:
@@ -64,146 +137,645 @@ def validate_record(record_data: Dict[str, Any]) -> Optional[MarketplacePlanJSON
 
 def prepare_record_for_db(validated_record: MarketplacePlanJSON) -> Dict[str, Any]:
     """Prepare a validated record for database insertion."""
-    # Convert the Pydantic model to a dictionary
+    # Convert the Pydantic model to a dictionary (None is sent as JSON null)
     record_dict = validated_record.model_dump()
 
     # Add UUID for the id field
     record_dict['id'] = str(uuid.uuid4())
 
-    # Handle None values - Supabase expects null, not None
-    for key, value in record_dict.items():
-        if value is None:
-            record_dict[key] = None
-
     return record_dict
 
 
-def upload_records_to_supabase(records: List[Dict[str, Any]], batch_size: int = 50) -> bool:
-    """Upload records to Supabase in batches."""
-    try:
-        supabase = get_supabase_client()
-        total_records = len(records)
-
-        print(f"🚀 Starting upload of {total_records} records in batches of {batch_size}...")
+def serialize_record(record_data: Dict[str, Any], upsert: bool = False) -> Dict[str, Any]:
+    """
+    Validate a raw record and serialize it for the database in one pass.
 
-        # Upload in batches starting from the beginning
-        for i in range(0, total_records, batch_size):
-            batch = records[i:i + batch_size]
-            batch_num = (i // batch_size) + 1
-            total_batches = (total_records + batch_size - 1) // batch_size
+    Produces the same dict as validate_record followed by prepare_record_for_db,
+    but the compiled row validator returns the validated values directly
+    instead of building a model and dumping it. For an upsert on the business
+    key the id is left out, so that existing rows keep theirs and new rows get
+    the column default, and a content hash lets later runs skip unchanged rows.
 
-            print(f"  📦 Uploading batch {batch_num}/{total_batches} ({len(batch)} records)...")
+    Raises:
+        ValidationError: If the record does not match MarketplacePlanJSON
+    """
+    record_dict = PLAN_ROW_ADAPTER.validate_python(record_data)
+    if upsert:
+        record_dict['content_hash'] = content_hash(record_dict)
+    else:
+        record_dict['id'] = str(uuid.uuid4())
+    return record_dict
 
-            try:
-                result = supabase.table('marketplace_plans').insert(batch).execute()  # type: ignore
 
-                if result.data:
-                    print(f"    ✅ Batch {batch_num} uploaded successfully ({len(result.data)} records)")
-                else:
-                    print(f"    ⚠️ Batch {batch_num} upload returned no data")
+def content_hash(record: Dict[str, Any]) -> str:
+    """Hash the values of a record (excluding id and content_hash) independently of key order."""
+    values = {key: value for key, value in record.items() if key not in ('id', 'content_hash')}
+    payload = json.dumps(values, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def fetch_content_hashes(supabase: Any, page_size: int = 1000) -> Dict[Tuple[Any, ...], Optional[str]]:
+    """Fetch the content hash of every row in the table, keyed by business key."""
+    rows = stream_table('marketplace_plans', ','.join([*BUSINESS_KEY_COLUMNS, 'content_hash']),
+                        key=BUSINESS_KEY_COLUMNS, page_size=page_size, client=supabase)
+    return {business_key(row): row.get('content_hash') for row in rows}
+
+
+# Error text that PostgREST, Kong and proxies use when a request body is too large
+PAYLOAD_ERROR_PATTERN = re.compile(r'\b413\b|too large|size limit', re.IGNORECASE)
+
+
+class BatchSizer:
+    """
+    Adapt the insert batch size to maximize rows per second.
+
+    After every successful batch the throughput (rows per second of request
+    time) is compared with the previous batch: if it did not drop, the size
+    keeps moving in the same direction, otherwise the direction reverses.
+    Sizes stay within [min_size, max_size] and under max_payload_bytes,
+    using the average encoded row size. A payload error lowers max_size
+    below the rejected batch size.
+    """
+
+    def __init__(self, initial_size: int = 100, min_size: int = 10, max_size: int = 1000,
+                 max_payload_bytes: int = 1_000_000, step: float = 1.5):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_payload_bytes = max_payload_bytes
+        self.step = step
+        self.size = max(min_size, min(initial_size, max_size))
+        self.row_bytes = 0.0
+        self.growing = True
+        self.last_throughput: Optional[float] = None
+
+    def estimate_row_bytes(self, records: List[Dict[str, Any]], sample_size: int = 100) -> None:
+        """Estimate the encoded size of a row from a sample of the records."""
+        sample = records[:sample_size]
+        if sample:
+            self.row_bytes = len(json.dumps(sample, default=str).encode('utf-8')) / len(sample)
+
+    def next_size(self) -> int:
+        """Return the number of rows to put in the next batch."""
+        size = self.size
+        if self.row_bytes:
+            size = min(size, int(self.max_payload_bytes // self.row_bytes))
+        return max(1, size)
+
+    def record(self, rows: int, seconds: float) -> None:
+        """Update the batch size from a successful batch."""
+        if seconds <= 0:
+            return
+        throughput = rows / seconds
+        if self.last_throughput is not None and throughput < self.last_throughput:
+            self.growing = not self.growing
+        self.last_throughput = throughput
+
+        size = self.size * self.step if self.growing else self.size / self.step
+        self.size = max(self.min_size, min(int(size), self.max_size))
+
+    def payload_rejected(self, rows: int) -> None:
+        """Lower the maximum batch size after a batch of this many rows was too large."""
+        self.max_size = max(1, min(self.max_size, rows // 2))
+        self.min_size = min(self.min_size, self.max_size)
+        self.size = min(self.size, self.max_size)
+        self.growing = False
+
+
+def is_payload_error(error: Exception) -> bool:
+    """Return True if an insert failed because the request body was too large."""
+    if str(getattr(error, 'code', '')) == '413':
+        return True
+    return bool(PAYLOAD_ERROR_PATTERN.search(str(getattr(error, 'message', None) or error)))
 
-            except Exception as e:
-                print(f"    ❌ Error uploading batch {batch_num}: {e}")
 
-                # Show details of the problematic batch for debugging
-                print(f"    🔍 Analyzing batch {batch_num} for issues...")
-                for j, record in enumerate(batch):
-                    for field, value in record.items():
-                        if isinstance(value, str) and len(value) > 200:
-                            print(f"      Record {j+1}, field '{field}': {len(value)} chars (truncated: {value[:100]}...)")
+def is_transient_error(error: Exception, upsert: bool = False) -> bool:
+    """
+    Return True if a failed request is safe to send again.
 
-                return False
+    Connection errors raised before the request was sent and 429s are
+    retried for any batch; 503s only for upserts, since an insert may
+    already have been committed behind the proxy that answered.
+    """
+    if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+        return True
+    codes = UPSERT_TRANSIENT_STATUS_CODES if upsert else TRANSIENT_STATUS_CODES
+    return str(getattr(error, 'code', '')) in codes
+
+
+def insert_batch(supabase: Any, batch: List[Dict[str, Any]], upsert: bool = False,
+                 rows: Optional[List[bytes]] = None) -> Dict[str, Any]:
+    """
+    Insert (or upsert on the business key) one batch into the marketplace_plans table.
+
+    The batch is serialized once (or not at all, when its encoded rows are
+    passed in from a batch that was split) and the same bytes are sent
+    again if the request fails with a transient error.
+
+    Runs in a worker thread, so it does not print; the outcome is returned
+    to the caller for reporting in batch order. Besides the data or error it
+    holds the wall-clock seconds, the CPU seconds spent in this thread, the
+    body size and the encoded rows for reuse.
+    """
+    started = time.perf_counter()
+    cpu_started = time.thread_time()
+    outcome: Dict[str, Any] = {"data": None, "error": None, "rows": rows, "payload_bytes": 0}
+    try:
+        if rows is None:
+            rows, _ = encode_rows(batch)
+            outcome["rows"] = rows
+        payload = join_rows(rows)
+        outcome["payload_bytes"] = len(payload)
+
+        table = supabase.table('marketplace_plans')
+        for attempt in range(1, SEND_ATTEMPTS + 1):
+            # The builder only contributes headers and query parameters; its json is never encoded
+            if upsert:
+                request = table.upsert(batch, on_conflict=','.join(BUSINESS_KEY_COLUMNS))  # type: ignore
+            else:
+                request = table.insert(batch)  # type: ignore
+            try:
+                outcome["data"] = execute_with_payload(request, payload).data
+                break
+            except Exception as e:
+                if attempt == SEND_ATTEMPTS or not is_transient_error(e, upsert):
+                    raise
+                time.sleep(RETRY_DELAY_SECONDS * attempt)
+    except Exception as e:
+        outcome["error"] = e
+    outcome["seconds"] = time.perf_counter() - started
+    outcome["cpu_seconds"] = time.thread_time() - cpu_started
+    return outcome
+
+
+def insert_pooled_batch(pool: SupabaseClientPool, batch: List[Dict[str, Any]], upsert: bool = False,
+                        rows: Optional[List[bytes]] = None) -> Dict[str, Any]:
+    """Check a client out of the pool for one batch and insert it with insert_batch."""
+    with pool.client() as supabase:
+        return insert_batch(supabase, batch, upsert, rows)
+
+
+def report_batch(label: str, batch: List[Dict[str, Any]], outcome: Dict[str, Any]) -> bool:
+    """Print the outcome of an uploaded batch. Returns False if the batch failed."""
+    if outcome["error"] is None:
+        if outcome["data"]:
+            print(f"    ✅ {label} uploaded successfully ({len(outcome['data'])} records, {outcome['seconds']:.2f}s, "
+                  f"{outcome.get('cpu_seconds', 0.0) * 1000:.1f} ms CPU, "
+                  f"{outcome.get('payload_bytes', 0) / 1024:,.0f} KB)")
+        else:
+            print(f"    ⚠️ {label} upload returned no data")
+        return True
 
-        print("🎉 Successfully uploaded all records!")
+    print(f"    ❌ Error uploading {label}: {outcome['error']}")
+
+    # Show details of the problematic batch for debugging
+    print(f"    🔍 Analyzing {label} for issues...")
+    for j, record in enumerate(batch):
+        for field, value in record.items():
+            if isinstance(value, str) and len(value) > 200:
+                print(f"      Record {j+1}, field '{field}': {len(value)} chars (truncated: {value[:100]}...)")
+
+    return False
+
+
+def upload_records_to_supabase(records: Iterable[Dict[str, Any]], batch_size: int = 50,
+                               max_in_flight: int = 1, sizer: Optional[BatchSizer] = None,
+                               journal: Optional[UploadJournal] = None,
+                               positions: Optional[Iterable[int]] = None, upsert: bool = False) -> bool:
+    """
+    Upload records to Supabase in batches.
+
+    Up to ``max_in_flight`` batches are sent concurrently from a thread pool,
+    each on a client checked out of get_client_pool (or of a pool of its own
+    when more batches are in flight than that pool has clients), so parallel
+    batches do not share one client's connections. A new batch is only sent
+    once there is a free slot (backpressure), and results are reported in
+    record order. Batches have ``batch_size`` rows unless a BatchSizer is
+    given, in which case the size adapts to the observed throughput.
+
+    A batch rejected as too large is split in half and retried. After any
+    other failure no further batches are sent; batches already in flight
+    are waited for and reported.
+
+    Each successful batch is recorded in the journal, if given, under the
+    file positions of its records (``positions``, defaulting to the list
+    index) so that a later run can resume after it. With ``upsert`` the
+    rows are merged into existing rows with the same business key.
+    """
+    items = zip(positions, records) if positions is not None else enumerate(records)
+    total = len(records) if isinstance(records, Sized) else None
+    return upload_record_stream(items, total, batch_size, max_in_flight, sizer, journal, upsert)
+
+
+def upload_record_stream(items: Iterable[Tuple[int, Dict[str, Any]]], total: Optional[int] = None,
+                         batch_size: int = 50, max_in_flight: int = 1, sizer: Optional[BatchSizer] = None,
+                         journal: Optional[UploadJournal] = None, upsert: bool = False) -> bool:
+    """
+    Upload a stream of (file position, record) pairs in batches.
+
+    Records are pulled from the stream one batch at a time, so only the
+    batches in flight are held in memory. See upload_records_to_supabase
+    for the batching, retry and journal behaviour; ``total`` is only used
+    in progress messages.
+    """
+    owned_pool: Optional[SupabaseClientPool] = None
+    try:
+        pool = get_client_pool()
+        if pool.size < max_in_flight:
+            pool = owned_pool = SupabaseClientPool(size=max_in_flight)
+        stream = iter(items)
+        of_total = f" of {total}" if total is not None else ""
+        started = time.perf_counter()
+
+        if sizer is not None:
+            sample = list(islice(stream, 100))
+            sizer.estimate_row_bytes([record for _, record in sample])
+            stream = chain(sample, stream)
+            print(f"🚀 Starting upload of {total if total is not None else 'streamed'} records in adaptive batches "
+                  f"({sizer.min_size}-{sizer.max_size} rows, starting at {sizer.next_size()}, "
+                  f"{max_in_flight} in flight)...")
+        else:
+            print(f"🚀 Starting upload of {total if total is not None else 'streamed'} records in batches of "
+                  f"{batch_size} ({max_in_flight} in flight)...")
+
+        pending: Deque[Tuple[str, int, List[Tuple[int, Dict[str, Any]]], Future]] = deque()
+        cpu_seconds = 0.0
+        batch_count = 0
+        uploaded = 0
+        position = 0
+        exhausted = False
+        failed = False
+
+        with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+
+            def submit(start: int, batch: List[Tuple[int, Dict[str, Any]]], rows: Optional[List[bytes]] = None
+                       ) -> Tuple[str, int, List[Tuple[int, Dict[str, Any]]], Future]:
+                nonlocal batch_count
+                batch_count += 1
+                label = f"Batch {batch_count} (records {start + 1}-{start + len(batch)}{of_total})"
+                print(f"  📦 Uploading {label}...")
+                records = [record for _, record in batch]
+                return label, start, batch, executor.submit(insert_pooled_batch, pool, records, upsert, rows)
+
+            while pending or not (exhausted or failed):
+                # Send another batch while there is a free slot
+                if not (exhausted or failed) and len(pending) < max_in_flight:
+                    size = sizer.next_size() if sizer is not None else batch_size
+                    batch = list(islice(stream, size))
+                    if batch:
+                        pending.append(submit(position, batch))
+                        position += len(batch)
+                    exhausted = len(batch) < size
+                    continue
+
+                # Otherwise wait for the oldest batch
+                label, start, batch, future = pending.popleft()
+                outcome = future.result()
+                cpu_seconds += outcome.get("cpu_seconds", 0.0)
+
+                if outcome["error"] is not None and not failed and len(batch) > 1 \
+                        and is_payload_error(outcome["error"]):
+                    print(f"    ✂️ {label} was too large ({outcome['error']}); splitting it in half")
+                    if sizer is not None:
+                        sizer.payload_rejected(len(batch))
+                    # The halves are sent with the rows this batch already encoded
+                    middle = len(batch) // 2
+                    rows = outcome.get("rows")
+                    first_half = submit(start, batch[:middle], rows[:middle] if rows else None)
+                    second_half = submit(start + middle, batch[middle:], rows[middle:] if rows else None)
+                    pending.appendleft(second_half)
+                    pending.appendleft(first_half)
+                    continue
+
+                if outcome["error"] is None and sizer is not None:
+                    sizer.record(len(batch), outcome["seconds"])
+
+                records = [record for _, record in batch]
+                if not report_batch(label, records, outcome):
+                    failed = True
+                    continue
+                uploaded += len(batch)
+                if journal is not None:
+                    journal.commit_batch([batch_position for batch_position, _ in batch], records)
+
+        if failed:
+            return False
+
+        elapsed = time.perf_counter() - started
+        rate = uploaded / elapsed if elapsed else 0.0
+        print(f"🎉 Successfully uploaded all {uploaded} records! ({elapsed:.2f}s, {rate:,.0f} records/s, "
+              f"{cpu_seconds:.2f}s CPU in upload threads)")
+        if sizer is not None:
+            print(f"📏 Batch size settled at {sizer.next_size()} rows "
+                  f"(~{sizer.next_size() * sizer.row_bytes / 1024:,.0f} KB per request)")
         return True
 
     except Exception as e:
         print(f"❌ Error during upload: {e}")
         return False
+    finally:
+        if owned_pool is not None:
+            owned_pool.close()
+
+
+def copy_record_stream(items: Iterable[Tuple[int, Dict[str, Any]]], database_url: str,
+                       copy_format: str = BINARY_FORMAT, journal: Optional[UploadJournal] = None) -> bool:
+    """
+    Load a stream of (file position, record) pairs with a single PostgreSQL COPY.
+
+    Used instead of PostgREST batches with --copy. The COPY runs in one
+    transaction, so either every record is committed (and recorded in the
+    journal, if given) or none is. Records are streamed straight into the
+    COPY; only their positions and business keys are kept, for the journal.
+    """
+    committed_positions: List[int] = []
+    committed_keys: List[Dict[str, Any]] = []
+
+    def records() -> Iterator[Dict[str, Any]]:
+        for position, record in items:
+            if journal is not None:
+                committed_positions.append(position)
+                committed_keys.append({column: record.get(column) for column in BUSINESS_KEY_COLUMNS})
+            yield record
 
+    try:
+        print(f"🚀 Copying records into marketplace_plans ({copy_format} COPY)...")
+        started = time.perf_counter()
 
-def main():
-    """Main function to orchestrate the upload process."""
-    print("🚀 Starting marketplace plans data upload to Supabase...")
+        copied = copy_records_to_postgres(records(), database_url, copy_format)
 
-    # Configuration
-    json_file_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'marketplace_plans.json')
-    test_limit = None  # Full upload - all records
-    batch_size = 100   # Increased batch size for better performance
+        if journal is not None:
+            journal.commit_batch(committed_positions, committed_keys)
+
+        elapsed = time.perf_counter() - started
+        rate = copied / elapsed if elapsed else 0.0
+        print(f"🎉 Successfully copied {copied} records! ({elapsed:.2f}s, {rate:,.0f} records/s)")
+        return True
 
-    # Step 1: Test database connection
-    print("🔗 Testing database connection...")
-    try:
-        supabase = get_supabase_client()
-        result = supabase.table('marketplace_plans').select('count').execute()
-        current_count = len(result.data) if result.data else 0
-        print(f"✅ Database connection successful! Current records in table: {current_count}")
     except Exception as e:
-        print(f"❌ Database connection failed: {e}")
-        print("Please check your Supabase credentials and ensure the service is running.")
-        return
+        print(f"❌ Error during COPY: {e}")
+        return False
 
-    # Step 2: Load JSON data
-    json_data = load_json_data(json_file_path, limit=test_limit)
-    if not json_data:
-        print("❌ No JSON data loaded. Exiting.")
-        return
 
-    # Step 3: Validate records
-    print("🔍 Validating records...")
-    validated_records: List[MarketplacePlanJSON] = []
-    validation_errors = 0
+def refresh_state_county_lookup(copy: bool = False, database_url: str = LOCAL_DATABASE_URL) -> bool:
+    """
+    Refresh the state_county_lookup materialized view after a load.
+
+    Goes through the database connection when the records were copied, and
+    through the Supabase RPC endpoint otherwise. A failed refresh does not
+    undo the load, so it is reported as a warning.
 
-    for i, record_data in enumerate(json_data):
-        validated_record = validate_record(record_data)
-        if validated_record:
-            validated_records.append(validated_record)
+    Returns:
+        bool: True if the view was refreshed
+    """
+    print("🔄 Refreshing the state_county_lookup view...")
+    try:
+        if copy:
+            call_function(database_url, REFRESH_LOOKUP_FUNCTION)
         else:
-            validation_errors += 1
-            if validation_errors <= 5:  # Show first 5 errors
-                print(f"  ❌ Record {i + 1} failed validation")
+            get_supabase_client().rpc(REFRESH_LOOKUP_FUNCTION).execute()
+    except Exception as e:
+        print(f"⚠️ Could not refresh state_county_lookup: {e}")
+        print(f"   Run `SELECT {REFRESH_LOOKUP_FUNCTION}();` once the problem is fixed")
+        return False
+    print("✅ state_county_lookup refreshed")
+    return True
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Upload marketplace plans data to Supabase.")
+    parser.add_argument('--input', default=None,
+                        help="JSON array, NDJSON (.ndjson, .jsonl, optionally .gz/.zst) or Parquet file to upload "
+                             "(default: src/data/marketplace_plans.json)")
+    parser.add_argument('--limit', type=int, default=None,
+                        help="Upload at most this many records")
+    parser.add_argument('--offset', type=int, default=0,
+                        help="Skip this many records at the start of the file (e.g. to resume an upload)")
+    parser.add_argument('--journal', default=None,
+                        help="Checkpoint journal recording committed batches (default: <input>.journal.sqlite)")
+    parser.add_argument('--resume', action='store_true',
+                        help="Skip the records a previous run already committed, according to the journal")
+    parser.add_argument('--upsert', action='store_true',
+                        help="Upsert on (state_code, fips_county_code, plan_id_standard_component) and only send "
+                             "rows whose content hash changed")
+    parser.add_argument('--copy', action='store_true',
+                        help="Load with PostgreSQL COPY over a direct database connection instead of PostgREST")
+    parser.add_argument('--database-url', default=os.getenv('DATABASE_URL') or LOCAL_DATABASE_URL,
+                        help="PostgreSQL connection string for --copy (default: $DATABASE_URL, "
+                             "or the local supabase start database)")
+    parser.add_argument('--copy-format', choices=COPY_FORMATS, default=BINARY_FORMAT,
+                        help="COPY data format for --copy")
+    parser.add_argument('--refresh-lookup', action=argparse.BooleanOptionalAction, default=True,
+                        help="Refresh the state_county_lookup view after a successful load")
+    parser.add_argument('--batch-size', type=int, default=100,
+                        help="Records per insert request (the starting size when adaptive)")
+    parser.add_argument('--adaptive', action=argparse.BooleanOptionalAction, default=True,
+                        help="Grow or shrink the batch size to maximize rows per second")
+    parser.add_argument('--min-batch-size', type=int, default=10,
+                        help="Smallest adaptive batch size")
+    parser.add_argument('--max-batch-size', type=int, default=1000,
+                        help="Largest adaptive batch size")
+    parser.add_argument('--max-payload-kb', type=int, default=1024,
+                        help="Keep adaptive batches under this request size")
+    parser.add_argument('--max-in-flight', type=int, default=4,
+                        help="Number of batches uploaded concurrently")
+    args = parser.parse_args(argv if argv is not None else [])
+    if args.copy and args.upsert:
+        parser.error("--upsert is not supported with --copy")
+    return args
+
+
+def main(argv: Optional[List[str]] = None):
+    """Main function to orchestrate the upload process."""
+    args = parse_args(argv)
+    print("🚀 Starting marketplace plans data upload to Supabase...")
 
-    print(f"✅ Validated {len(validated_records)} records ({validation_errors} validation errors)")
+    # Configuration
+    json_file_path = args.input or os.path.join(os.path.dirname(__file__), '..', 'data', 'marketplace_plans.json')
+    test_limit = args.limit  # None uploads all records
+    batch_size = args.batch_size
+
+    # Step 1: Test database connection (COPY connects to the database directly instead)
+    if not args.copy:
+        print("🔗 Testing database connection...")
+        try:
+            supabase = get_supabase_client()
+            result = supabase.table('marketplace_plans').select('count').execute()
+            current_count = len(result.data) if result.data else 0
+            print(f"✅ Database connection successful! Current records in table: {current_count}")
+        except Exception as e:
+            print(f"❌ Database connection failed: {e}")
+            print("Please check your Supabase credentials and ensure the service is running.")
+            return
 
-    if not validated_records:
-        print("❌ No valid records to upload. Exiting.")
+    # Step 2: Open the checkpoint journal
+    try:
+        journal = open_journal(args.journal or f"{json_file_path}.journal.sqlite", json_file_path, args.resume)
+    except ValueError as e:
+        print(f"❌ {e}")
         return
 
-    # Step 4: Prepare records for database
-    print("🔧 Preparing records for database...")
-    db_records: List[Dict[str, Any]] = []
+    try:
+        upload_from_file(args, json_file_path, test_limit, batch_size, journal)
+    finally:
+        if journal is not None:
+            journal.close()
+
+
+def iter_upload_records(raw_records: Iterable[Dict[str, Any]], offset: int, stats: Dict[str, int],
+                        upsert: bool = False, committed_keys: Optional[Set[Tuple[Any, ...]]] = None,
+                        existing_hashes: Optional[Dict[Tuple[Any, ...], Optional[str]]] = None,
+                        journal: Optional[UploadJournal] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Validate and serialize records as they are read, yielding (file position, database record) pairs.
+
+    Records committed by an earlier run (committed_keys) are skipped without
+    validating them, invalid records are reported and skipped, and with
+    existing_hashes records whose content hash is unchanged are skipped.
+    Invalid and unchanged positions are recorded in the journal as they go.
+    Counters are kept in stats.
+    """
+    for counter in ('loaded', 'already_uploaded', 'validated', 'validation_errors', 'unchanged', 'new'):
+        stats.setdefault(counter, 0)
+    invalid_positions: List[int] = []
+    unchanged_positions: List[int] = []
+
+    def flush_journal() -> None:
+        if journal is not None and invalid_positions:
+            journal.mark_invalid(invalid_positions)
+        if journal is not None and unchanged_positions:
+            journal.commit_batch(unchanged_positions, [])
+        invalid_positions.clear()
+        unchanged_positions.clear()
 
-    for validated_record in validated_records:
-        try:
-            db_record = prepare_record_for_db(validated_record)
-            db_records.append(db_record)
-        except Exception as e:
-            print(f"  ⚠️ Error preparing record: {e}")
-            continue
+    try:
+        for position, record_data in enumerate(raw_records, start=offset):
+            stats['loaded'] += 1
+            if len(invalid_positions) + len(unchanged_positions) >= JOURNAL_FLUSH_SIZE:
+                flush_journal()
 
-    print(f"✅ Prepared {len(db_records)} records for upload")
+            # Records committed out of order by an earlier run are skipped without validating them
+            if committed_keys and business_key(record_data) in committed_keys:
+                stats['already_uploaded'] += 1
+                continue
 
-    # Step 5: Show sample record
-    if db_records:
+            try:
+                db_record = serialize_record(record_data, upsert)
+            except ValidationError as e:
+                stats['validation_errors'] += 1
+                invalid_positions.append(position)
+                if stats['validation_errors'] <= 5:  # Show first 5 errors
+                    print(f"  ❌ Record {position + 1} failed validation: {e}")
+                continue
+            stats['validated'] += 1
+
+            # Only rows that are new or whose content changed need to be sent
+            if existing_hashes is not None:
+                key = business_key(db_record)
+                if existing_hashes.get(key) == db_record['content_hash']:
+                    stats['unchanged'] += 1
+                    unchanged_positions.append(position)
+                    continue
+                if key not in existing_hashes:
+                    stats['new'] += 1
+
+            yield position, db_record
+    finally:
+        flush_journal()
+
+
+def upload_from_file(args: argparse.Namespace, json_file_path: str, test_limit: Optional[int],
+                     batch_size: int, journal: Optional[UploadJournal]) -> None:
+    """
+    Stream the records from the file through validation and serialization into the upload.
+
+    Records are validated and serialized one at a time as the upload pulls
+    batches, so neither the raw, the validated nor the prepared records are
+    held in memory beyond the batches in flight. Progress is recorded in the
+    journal.
+    """
+    offset = args.offset
+    committed_keys: Set[Tuple[Any, ...]] = set()
+    if journal is not None and args.resume:
+        summary = journal.summary()
+        offset = max(offset, journal.done_prefix())
+        committed_keys = journal.committed_keys()
+        print(f"⏯️ Resuming from {journal.path}: {summary['committed']} records already uploaded, "
+              f"{summary['invalid']} invalid; starting at record {offset + 1}")
+
+    # Step 3: Fetch the content hashes to compare against when upserting
+    existing_hashes = None
+    if args.upsert:
+        print("🔁 Fetching content hashes from the database...")
+        try:
+            existing_hashes = fetch_content_hashes(get_supabase_client())
+        except Exception as e:
+            print(f"❌ Could not fetch existing content hashes: {e}")
+            return
+        print(f"✅ {len(existing_hashes)} rows in the table")
+
+    # Step 4: Stream, validate and prepare records
+    print("🔍 Validating and preparing records as they are read...")
+    stats: Dict[str, int] = {}
+    prepared = iter_upload_records(iter_json_data(json_file_path, limit=test_limit, offset=offset), offset, stats,
+                                   upsert=args.upsert, committed_keys=committed_keys,
+                                   existing_hashes=existing_hashes, journal=journal)
+    try:
+        first = next(prepared, None)
+        if first is None:
+            if not stats['loaded']:
+                print("❌ No JSON data loaded. Exiting.")
+            elif stats['unchanged']:
+                print(f"\n🎉 Database is already up to date; {stats['unchanged']} records unchanged, "
+                      f"nothing to upload.")
+            elif stats['already_uploaded']:
+                print(f"⏭️ All {stats['already_uploaded']} remaining records were uploaded by a previous run.")
+            else:
+                print("❌ No valid records to upload. Exiting.")
+            return
+
+        # Step 5: Show sample record
         print("\n📋 Sample record to be uploaded:")
-        sample_record = db_records[0]
-        for key, value in list(sample_record.items())[:10]:  # Show first 10 fields
+        for key, value in list(first[1].items())[:10]:  # Show first 10 fields
             print(f"  {key}: {value}")
         print("  ...")
 
-    # Step 6: Upload to Supabase
-    success = upload_records_to_supabase(db_records, batch_size)
-
+        # Step 6: Upload to Supabase
+        stream = chain([first], prepared)
+        if args.copy:
+            success = copy_record_stream(stream, args.database_url, args.copy_format, journal=journal)
+        else:
+            sizer = None
+            if args.adaptive:
+                sizer = BatchSizer(batch_size, args.min_batch_size, args.max_batch_size, args.max_payload_kb * 1024)
+            success = upload_record_stream(stream, None, batch_size, max_in_flight=args.max_in_flight, sizer=sizer,
+                                           journal=journal, upsert=args.upsert)
+    finally:
+        # Records the invalid and unchanged positions seen so far, even if the upload stopped early
+        prepared.close()
+
+    uploaded = stats['validated'] - stats['unchanged']
+    if success and args.refresh_lookup:
+        refresh_state_county_lookup(args.copy, args.database_url)
+    # Cached query results are stale even after a failed upload, which may have committed some batches
+    invalidate_cached_queries(LOADED_TABLES)
     if success:
         print("\n🎉 Upload completed successfully!")
         print("📊 Summary:")
-        print(f"   • Total records loaded: {len(json_data)}")
-        print(f"   • Successfully validated: {len(validated_records)}")
-        print(f"   • Successfully uploaded: {len(db_records)}")
-        print(f"   • Validation errors: {validation_errors}")
+        print(f"   • Total records loaded: {stats['loaded']}")
+        print(f"   • Successfully validated: {stats['validated']}")
+        print(f"   • Successfully uploaded: {uploaded}")
+        print(f"   • Validation errors: {stats['validation_errors']}")
+        if stats['already_uploaded']:
+            print(f"   • Skipped (uploaded by a previous run): {stats['already_uploaded']}")
+        if args.upsert:
+            print(f"   • Unchanged (skipped): {stats['unchanged']}; new: {stats['new']}, "
+                  f"updated: {uploaded - stats['new']}")
     else:
         print("\n❌ Upload failed. Please check the error messages above.")
+        if journal is not None:
+            print(f"⏯️ Committed batches are recorded in {journal.path}; rerun with --resume to continue")
 
 
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1:])
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Shared helpers for the test suite.
+
+plan_record builds a complete MarketplacePlanJSON record; test modules import
+it with ``from conftest import plan_record`` and override only the fields
+their tests are about.
+"""
+
+import os
+from typing import Any, Dict
+
+# Add the src directory to the path
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.plan_files import plan_columns
+
+
+def plan_record(premium: float = 300.0, **fields: Any) -> Dict[str, Any]:
+    """
+    Build a complete, valid MarketplacePlanJSON record.
+
+    Float columns hold premium, integer columns 1, text columns their own
+    name and nullable columns None; the plan is P0 in CA county 6001.
+    Keyword arguments override any field.
+    """
+    values = {"float": premium, "int": 1, "null": None}
+    record = {name: values.get(kind, name) for name, kind in plan_columns()}
+    record.update(state_code="CA", fips_county_code=6001, plan_id_standard_component="P0")
+    record.update(fields)
+    return record
@@ -14,8 +14,10 @@ import tempfile
 import os
 import json
 import csv
+import io
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 
 # Add the src directory to the path
 import sys
@@ -27,8 +29,43 @@ from scripts.create_json import (
     save_json_data,
     generate_transformation_report,
     load_csv_data,
-    transform_csv_record
+    transform_csv_record,
+    iter_csv_records,
+    iter_transformed_records,
+    stream_json_data,
+    run_streaming_conversion,
+    snake_case_headers,
+    header_cache_stats,
+    infer_column_kinds,
+    parse_column,
+    transform_csv_batch,
+    NUMERIC_COLUMN,
+    TEXT_COLUMN,
+    find_csv_chunks,
+    convert_csv_chunk,
+    run_parallel_conversion,
+    CHUNKS_IN_FLIGHT_PER_WORKER,
+    validate_csv_row,
+    transform_csv_row,
+    write_ndjson,
+    write_records,
+    parse_args
 )
+from models.model import MarketplacePlanCSV
+from utils import plan_files
+from utils.plan_files import detect_format, iter_plan_records
+
+
+def write_full_csv(file_path: str, rows: int) -> None:
+    """Write a CSV containing every MarketplacePlanCSV column with simple values."""
+    headers = [field.alias or name for name, field in MarketplacePlanCSV.model_fields.items()]
+    with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(headers)
+        for i in range(rows):
+            row = ['$1,234.50' if 'Premium' in header else f'value {i}' for header in headers]
+            row[headers.index('FIPS County Code')] = str(1000 + i)
+            writer.writerow(row)
 
 
 class TestConvertToSnakeCase:
@@ -89,6 +126,41 @@ class TestConvertToSnakeCase:
         assert convert_to_snake_case("Medical Deductible - Individual - Standard") == "medical_deductible_individual_standard"
 
 
+class TestSnakeCaseHeaders:
+    """Test the memoized header mapping used by transform_csv_record."""
+
+    def setup_method(self):
+        """Start each test with an empty cache."""
+        snake_case_headers.cache_clear()
+
+    def test_mapping_matches_convert_to_snake_case(self):
+        """Test that the cached mapping matches per-key conversion."""
+        headers = tuple(field.alias or name for name, field in MarketplacePlanCSV.model_fields.items())
+
+        assert snake_case_headers(headers) == tuple(convert_to_snake_case(h) for h in headers)
+
+    def test_mapping_computed_once_per_header_set(self):
+        """Test that repeated rows hit the cache instead of recomputing."""
+        mock_model = Mock()
+        mock_model.model_dump.return_value = {'State Code': 'CA', 'Premium Child Age 0-14': '$100.50'}
+
+        for _ in range(10):
+            assert transform_csv_record(mock_model) == {'state_code': 'CA', 'premium_child_age_0_14': 100.50}
+
+        stats = header_cache_stats()
+        assert stats['misses'] == 1
+        assert stats['hits'] == 9
+        assert stats['size'] == 1
+
+    def test_cache_is_bounded(self):
+        """Test that distinct header sets do not grow the cache without limit."""
+        for i in range(200):
+            snake_case_headers((f"Column {i}",))
+
+        stats = header_cache_stats()
+        assert stats['size'] <= stats['max_size']
+
+
 class TestParseValue:
     """Test the parse_value function."""
 
@@ -156,6 +228,90 @@ class TestParseValue:
         assert parse_value("$-100.50") == -100.50     # Also valid negative monetary format
 
 
+class TestColumnParsing:
+    """Test the column-wise parsing engine against parse_value."""
+
+    TRICKY_VALUES = [
+        "$100.50", "$1,234.56", "-$100.50", "$-100.50", "$", "$invalid", "$$5", "$1-00", "100$",
+        "123", "-456", "0", "007", "1,234", "1,234,567", "123.45", "-0.0", ".5", "5.", "-.",
+        "12.34.56", "123abc", "1.23e-4", "1e5", "50%", "$5%", "", "   ", "  $100.50  ", "  123  ",
+        "+5", "1_000", "١٢", "١.٢", ",inf", ", 5", "$ 5", "1_0.5", "$-0.00", "-$-5", "$.-5",
+        "€100.50", "Bronze", "12345678901234567890", "999999999999999.5", "--5", "5-", None
+    ]
+
+    @pytest.mark.parametrize("kind", [NUMERIC_COLUMN, TEXT_COLUMN])
+    def test_matches_parse_value_exactly(self, kind: str):
+        """Test that every cell parses exactly like parse_value, including its type."""
+        result = parse_column(self.TRICKY_VALUES, kind)
+        expected = [parse_value(v) if v is not None else None for v in self.TRICKY_VALUES]
+
+        assert [(type(v), str(v)) for v in result] == [(type(v), str(v)) for v in expected]
+
+    def test_outliers_use_fallback(self):
+        """Test that only outlier cells go through the per-cell path."""
+        stats: Dict[str, int] = {}
+        result = parse_column(["$1.00", "$2.00", "3", "See Medical Deductible", "1e5"], NUMERIC_COLUMN, stats)
+
+        assert result == [1.0, 2.0, 3, "See Medical Deductible", "1e5"]
+        assert stats == {'vectorized_cells': 4, 'fallback_cells': 1}
+
+    def test_text_column_skips_number_parsing(self):
+        """Test that text cells never reach the int()/float() exception path."""
+        stats: Dict[str, int] = {}
+        result = parse_column(["  No Charge ", "Coinsurance", "40%", "123"], TEXT_COLUMN, stats)
+
+        assert result == ["No Charge", "Coinsurance", "40%", 123]
+        assert stats == {'vectorized_cells': 3, 'fallback_cells': 1}
+
+    def test_without_numpy(self):
+        """Test that the engine still works when numpy is not installed."""
+        with patch('scripts.create_json.np', None):
+            stats: Dict[str, int] = {}
+            result = parse_column(["$1,000", "x", ""], NUMERIC_COLUMN, stats)
+
+        assert result == [1000.0, "x", None]
+        assert stats['fallback_cells'] == 3
+
+    def test_infer_column_kinds(self):
+        """Test inferring numeric and text columns from a sample."""
+        columns = [
+            ("$1.00", "$2.00", "No Charge"),
+            ("Bronze", "Silver", "Gold"),
+            ("", None, "  "),
+        ]
+
+        assert infer_column_kinds(columns) == [NUMERIC_COLUMN, TEXT_COLUMN, TEXT_COLUMN]
+
+    def test_transform_batch_matches_per_record(self):
+        """Test that batch transformation matches transform_csv_record."""
+        records = []
+        for values in [('CA', '$100.50', '85%'), ('NY', 'Not Covered', '90%'), ('TX', '', '1,234')]:
+            mock_model = Mock()
+            mock_model.model_dump.return_value = {
+                'State Code': values[0],
+                'Premium Child Age 0-14': values[1],
+                'EHB Percent of Total Premium': values[2]
+            }
+            records.append(mock_model)
+
+        assert transform_csv_batch(records) == [transform_csv_record(r) for r in records]
+        assert transform_csv_batch([]) == []
+
+    def test_batched_streaming_matches_per_record(self):
+        """Test that the batched pipeline writes the same records as the per-record one."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            csv_path = os.path.join(temp_dir, 'plans.csv')
+            write_full_csv(csv_path, rows=7)
+
+            per_record = list(iter_transformed_records(iter_csv_records(csv_path)))
+            stats: Dict[str, int] = {}
+            batched = list(iter_transformed_records(iter_csv_records(csv_path), stats, batch_size=3))
+
+        assert batched == per_record
+        assert stats['transformed'] == 7
+        assert stats['vectorized_cells'] > 0
+
+
 class TestTransformCSVRecord:
     """Test the transform_csv_record function with mock models."""
 
@@ -361,6 +517,310 @@ class TestFileOperations:
                 os.unlink(temp_path)
 
 
+class TestStreamingConversion:
+    """Test the generator-based streaming conversion pipeline."""
+
+    def test_stream_json_matches_save_json(self):
+        """Test that streamed output is byte-identical to save_json_data."""
+        test_data: List[Dict[str, str | float | None]] = [
+            {'state_code': 'CA', 'plan_name': 'Aetna® Health Plan', 'premium': 100.50},
+            {'state_code': 'NY', 'plan_name': None, 'premium': 150.75}
+        ]
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            saved_path = os.path.join(temp_dir, 'saved.json')
+            streamed_path = os.path.join(temp_dir, 'streamed.json')
+
+            assert save_json_data(test_data, saved_path) is True
+            assert stream_json_data(iter(test_data), streamed_path) == 2
+
+            with open(saved_path, encoding='utf-8') as saved, open(streamed_path, encoding='utf-8') as streamed:
+                assert streamed.read() == saved.read()
+
+    def test_stream_empty_records(self):
+        """Test that streaming no records writes an empty JSON array."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_path = os.path.join(temp_dir, 'empty.json')
+
+            assert stream_json_data(iter([]), output_path) == 0
+
+            with open(output_path, encoding='utf-8') as f:
+                assert json.load(f) == []
+
+    def test_stream_to_invalid_path(self):
+        """Test streaming to an invalid file path."""
+        assert stream_json_data(iter([{'a': 1}]), '/invalid/path/file.json') is None
+
+    def test_iter_csv_records_is_lazy(self):
+        """Test that rows are validated one at a time and counted."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            csv_path = os.path.join(temp_dir, 'plans.csv')
+            write_full_csv(csv_path, rows=3)
+
+            stats: Dict[str, int] = {}
+            records = iter_csv_records(csv_path, stats)
+            first = next(records)
+
+            assert first.State_Code == 'value 0'
+            assert stats == {'loaded': 1, 'validation_errors': 0}
+            assert len(list(records)) == 2
+            assert stats['loaded'] == 3
+
+    def test_iter_transformed_records_skips_failures(self):
+        """Test that records failing transformation are skipped and counted."""
+        good = Mock()
+        good.model_dump.return_value = {'State Code': 'CA'}
+        bad = Mock()
+        bad.model_dump.side_effect = Exception("Model error")
+
+        stats: Dict[str, int] = {}
+        result = list(iter_transformed_records([good, bad, good], stats))
+
+        assert result == [{'state_code': 'CA'}, {'state_code': 'CA'}]
+        assert stats['transformed'] == 2
+
+    def test_run_streaming_conversion_end_to_end(self):
+        """Test converting a full CSV in streaming mode."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            csv_path = os.path.join(temp_dir, 'plans.csv')
+            json_path = os.path.join(temp_dir, 'plans.json')
+            report_path = os.path.join(temp_dir, 'report.json')
+            write_full_csv(csv_path, rows=5)
+
+            stats = run_streaming_conversion(csv_path, json_path, report_path)
+
+            assert stats is not None
+            assert stats['written'] == 5
+            with open(json_path, encoding='utf-8') as f:
+                data = json.load(f)
+            assert len(data) == 5
+            assert data[4]['fips_county_code'] == 1004
+            assert data[0]['premium_child_age_0_14'] == 1234.5
+            with open(report_path, encoding='utf-8') as f:
+                assert json.load(f)['transformation_info']['total_records'] == 5
+
+    def test_run_streaming_conversion_missing_file(self):
+        """Test streaming conversion with a missing input file."""
+        assert run_streaming_conversion('/path/that/does/not/exist.csv', '/tmp/x.json', '/tmp/r.json') is None
+
+
+class TestNDJSONOutput:
+    """Test the newline-delimited JSON output format."""
+
+    def test_write_ndjson_one_record_per_line(self):
+        """Test that each record is written as a single compact line."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_path = os.path.join(temp_dir, 'plans.ndjson')
+
+            assert write_records(iter([{'a': 1, 'b': 'x\ny'}, {'a': 2, 'b': None}]), output_path, 'ndjson') == 2
+
+            with open(output_path, encoding='utf-8') as f:
+                assert f.read() == '{"a":1,"b":"x\\ny"}\n{"a":2,"b":null}\n'
+
+    def test_write_ndjson_to_invalid_path(self):
+        """Test writing NDJSON to an invalid file path."""
+        assert write_ndjson(iter(['{}']), '/invalid/path/file.ndjson') is None
+
+    @pytest.mark.parametrize("file_name", [
+        'plans.ndjson',
+        'plans.ndjson.gz',
+        pytest.param('plans.ndjson.zst', marks=pytest.mark.skipif(plan_files.zstandard is None,
+                                                                  reason="zstandard is not installed")),
+        'plans.json.gz',
+        pytest.param('plans.parquet', marks=pytest.mark.skipif(plan_files.pa is None,
+                                                               reason="pyarrow is not installed")),
+    ])
+    def test_streaming_conversion_round_trip(self, file_name: str):
+        """Test that every output format reads back to the plain JSON records."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            csv_path = os.path.join(temp_dir, 'plans.csv')
+            write_full_csv(csv_path, rows=5)
+            json_path = os.path.join(temp_dir, 'plans.json')
+            output_path = os.path.join(temp_dir, file_name)
+            output_format = detect_format(file_name)
+
+            run_streaming_conversion(csv_path, json_path, os.path.join(temp_dir, 'a.json'))
+            stats = run_streaming_conversion(csv_path, output_path, os.path.join(temp_dir, 'b.json'),
+                                             output_format=output_format)
+
+            assert stats is not None and stats['written'] == 5
+            assert list(iter_plan_records(output_path)) == list(iter_plan_records(json_path))
+
+    def test_parquet_rejects_compression_flag(self):
+        """Test that Parquet output does not take an outer compression suffix."""
+        with pytest.raises(SystemExit):
+            parse_args(['--format', 'parquet', '--compression', 'gzip'])
+        assert parse_args(['--format', 'parquet']).format == 'parquet'
+
+    def test_parallel_ndjson_matches_streaming(self):
+        """Test that the worker pool writes the same NDJSON file as the sequential pipeline."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            csv_path = os.path.join(temp_dir, 'plans.csv')
+            write_full_csv(csv_path, rows=12)
+
+            run_streaming_conversion(csv_path, os.path.join(temp_dir, 'a.ndjson'),
+                                     os.path.join(temp_dir, 'a_report.json'), output_format='ndjson')
+            run_parallel_conversion(csv_path, os.path.join(temp_dir, 'b.ndjson'),
+                                    os.path.join(temp_dir, 'b_report.json'), workers=2, output_format='ndjson')
+
+            with open(os.path.join(temp_dir, 'a.ndjson'), encoding='utf-8') as a, \
+                 open(os.path.join(temp_dir, 'b.ndjson'), encoding='utf-8') as b:
+                assert a.read() == b.read()
+
+
+class TestFastValidation:
+    """Test the TypeAdapter fast path that skips the model round-trip."""
+
+    def full_row(self) -> Dict[str, str]:
+        """Build a raw row with every MarketplacePlanCSV column, in reverse order."""
+        aliases = [field.alias or name for name, field in MarketplacePlanCSV.model_fields.items()]
+        return {alias: f'${i},000.50' if i % 3 == 0 else f'Value {i}' for i, alias in enumerate(reversed(aliases))}
+
+    def test_matches_model_dump(self):
+        """Test that the validated row equals the model dump, including key order."""
+        row = self.full_row()
+        row['Unknown Column'] = 'ignored'
+
+        validated = validate_csv_row(row)
+        expected = MarketplacePlanCSV(**row).model_dump(by_alias=True)
+
+        assert validated == expected
+        assert list(validated) == list(expected)
+        assert transform_csv_row(validated) == transform_csv_record(MarketplacePlanCSV(**row))
+
+    def test_rejects_the_same_rows_as_the_model(self):
+        """Test that missing columns, None values and surplus values are rejected."""
+        missing = self.full_row()
+        del missing['State Code']
+        none_value = self.full_row()
+        none_value['County Name'] = None  # type: ignore[assignment]
+        surplus = self.full_row()
+        surplus[None] = ['extra']  # type: ignore[index]
+
+        for row in (missing, none_value, surplus):
+            with pytest.raises(Exception):
+                MarketplacePlanCSV(**row)
+            with pytest.raises(Exception):
+                validate_csv_row(row)
+
+    def test_fast_streaming_matches_default(self):
+        """Test that the fast path writes exactly the same records."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            csv_path = os.path.join(temp_dir, 'plans.csv')
+            write_full_csv(csv_path, rows=6)
+            with open(csv_path, 'a', encoding='utf-8') as f:
+                f.write('CA,missing,columns\n')
+
+            default_stats: Dict[str, int] = {}
+            fast_stats: Dict[str, int] = {}
+            default = list(iter_transformed_records(iter_csv_records(csv_path, default_stats)))
+            fast = list(iter_transformed_records(iter_csv_records(csv_path, fast_stats, fast_validate=True)))
+            fast_batched = list(iter_transformed_records(iter_csv_records(csv_path, fast_validate=True),
+                                                         batch_size=4))
+
+        assert fast == default == fast_batched
+        assert fast_stats['validation_errors'] == default_stats['validation_errors'] == 1
+
+
+class TestParallelConversion:
+    """Test the multiprocess sharded conversion."""
+
+    def test_chunks_cover_file_on_row_boundaries(self):
+        """Test that chunks are contiguous and never split a quoted newline."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            csv_path = os.path.join(temp_dir, 'plans.csv')
+            with open(csv_path, 'w', newline='', encoding='utf-8') as csvfile:
+                writer = csv.writer(csvfile)
+                writer.writerow(['Name', 'Notes'])
+                for i in range(50):
+                    writer.writerow([f'Plan {i}', f'line one\nline "two" for {i}'])
+
+            fieldnames, chunks = find_csv_chunks(csv_path, 7)
+
+            assert fieldnames == ['Name', 'Notes']
+            assert len(chunks) >= 2
+            for (_, end, _), (start, _, _) in zip(chunks, chunks[1:]):
+                assert end == start
+            assert chunks[-1][1] == os.path.getsize(csv_path)
+
+            rows = []
+            with open(csv_path, 'rb') as f:
+                for start, end, first_row in chunks:
+                    f.seek(start)
+                    chunk_rows = list(csv.reader(io.StringIO(f.read(end - start).decode('utf-8'))))
+                    assert chunk_rows[0][0] == f'Plan {first_row - 2}'
+                    rows.extend(chunk_rows)
+
+            assert [row[0] for row in rows] == [f'Plan {i}' for i in range(50)]
+
+    def test_convert_csv_chunk(self):
+        """Test converting a single chunk in-process."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            csv_path = os.path.join(temp_dir, 'plans.csv')
+            write_full_csv(csv_path, rows=6)
+            fieldnames, chunks = find_csv_chunks(csv_path, 3)
+            start, end, first_row = chunks[1]
+
+            result = convert_csv_chunk((csv_path, fieldnames, start, end, first_row, None, True, 'json'))
+
+            assert result['stats']['loaded'] == len(result['encoded'])
+            assert result['first_record']['fips_county_code'] == 1000 + first_row - 2
+            assert json.loads(result['encoded'][0]) == result['first_record']
+
+    def test_parallel_output_matches_streaming(self):
+        """Test that the worker pool writes the same file as the sequential pipeline."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            csv_path = os.path.join(temp_dir, 'plans.csv')
+            write_full_csv(csv_path, rows=25)
+
+            sequential = run_streaming_conversion(csv_path, os.path.join(temp_dir, 'a.json'),
+                                                  os.path.join(temp_dir, 'a_report.json'))
+            parallel = run_parallel_conversion(csv_path, os.path.join(temp_dir, 'b.json'),
+                                               os.path.join(temp_dir, 'b_report.json'), workers=2)
+
+            assert sequential is not None and parallel is not None
+            assert parallel['written'] == sequential['written'] == 25
+            with open(os.path.join(temp_dir, 'a.json'), encoding='utf-8') as a, \
+                 open(os.path.join(temp_dir, 'b.json'), encoding='utf-8') as b:
+                assert a.read() == b.read()
+
+    def test_parallel_chunks_in_flight_are_bounded(self):
+        """Test that only a few chunks per worker are submitted ahead of the writer."""
+        outstanding: List[int] = []
+        max_outstanding: List[int] = []
+
+        class RecordingExecutor(ThreadPoolExecutor):
+            def submit(self, fn, *args):
+                future = super().submit(fn, *args)
+                outstanding.append(1)
+                result = future.result
+
+                def taken():
+                    outstanding.pop()
+                    return result()
+
+                future.result = taken
+                max_outstanding.append(len(outstanding))
+                return future
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            csv_path = os.path.join(temp_dir, 'plans.csv')
+            write_full_csv(csv_path, rows=60)
+
+            with patch('scripts.create_json.ProcessPoolExecutor', RecordingExecutor):
+                stats = run_parallel_conversion(csv_path, os.path.join(temp_dir, 'b.json'),
+                                                os.path.join(temp_dir, 'b_report.json'), workers=2)
+
+        assert stats is not None and stats['written'] == 60
+        # More chunks were submitted than the window holds, so the window was exercised
+        assert len(max_outstanding) > 2 * CHUNKS_IN_FLIGHT_PER_WORKER
+        assert max(max_outstanding) <= 2 * CHUNKS_IN_FLIGHT_PER_WORKER
+
+    def test_parallel_missing_file(self):
+        """Test parallel conversion with a missing input file."""
+        assert run_parallel_conversion('/path/that/does/not/exist.csv', '/tmp/x.json', '/tmp/r.json', 2) is None
+
+
 class TestGenerateTransformationReport:
     """Test the generate_transformation_report function."""
 
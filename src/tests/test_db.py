@@ -6,9 +6,18 @@ This module tests the Supabase connection manager and related functions in db.py
 including singleton behavior, client creation, error handling, and utility functions.
 """
 
+import asyncio
 import os
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
 from unittest.mock import patch, Mock
+import httpx
 import pytest
+from postgrest import SyncPostgrestClient
+from postgrest.exceptions import APIError
+from pydantic import BaseModel
 
 # Add the src directory to the path
 import sys
@@ -16,16 +25,27 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 # Import test functions but not the class - we'll import that within tests
 from utils.db import (
+    BUSINESS_KEY,
+    QueryCache,
+    SupabaseClientPool,
+    cached_select,
+    invalidate_cached_queries,
+    on_invalidate,
+    query_key,
+    create_http_client,
+    create_keepalive_client,
     get_supabase_client,
     test_connection as db_test_connection,  # Renamed to avoid pytest confusion
-    get_table
+    get_table,
+    key_ranges,
+    stream_table,
 )
 
 
 class TestSupabaseConnection:
     """Tests for the SupabaseConnection class."""
 
-    @patch('utils.db.create_client')
+    @patch('utils.db.KeepAliveClient.create')
     def test_singleton_pattern(self, mock_create_client: Mock) -> None:
         """Test that SupabaseConnection follows the singleton pattern."""
         # Import the class here to avoid global import
@@ -47,7 +67,7 @@ class TestSupabaseConnection:
             # Both should be the same object
             assert instance1 is instance2
 
-    @patch('utils.db.create_client')
+    @patch('utils.db.KeepAliveClient.create')
     def test_create_client_success(self, mock_create_client: Mock) -> None:
         """Test successful client creation with valid credentials."""
         # Import the class here to avoid global import
@@ -66,8 +86,9 @@ class TestSupabaseConnection:
             connection = SupabaseConnection()
             client = connection.client
 
-            # Verify the client was created with the correct parameters
+            # Verify the client was created with the correct parameters and a keep-alive HTTP client
             mock_create_client.assert_called_with("https://example.com", "test-key")
+            assert isinstance(client.postgrest_http_client, httpx.Client)
             assert client == mock_client
 
     def test_create_client_missing_env_vars(self) -> None:
@@ -80,7 +101,7 @@ class TestSupabaseConnection:
              patch.object(SupabaseConnection, '_client', None), \
              patch.object(SupabaseConnection, '__init__', return_value=None), \
              patch.dict(os.environ, {}, clear=True), \
-             patch('utils.db.create_client', side_effect=Exception("This should not be called")):
+             patch('utils.db.KeepAliveClient.create', side_effect=Exception("This should not be called")):
 
             # Create instance without calling __init__
             connection = SupabaseConnection.__new__(SupabaseConnection)
@@ -102,7 +123,7 @@ class TestSupabaseConnection:
              patch.object(SupabaseConnection, '_client', None), \
              patch.object(SupabaseConnection, '__init__', return_value=None), \
              patch.dict(os.environ, {"SUPABASE_URL": "https://example.com"}, clear=True), \
-             patch('utils.db.create_client', side_effect=Exception("This should not be called")):
+             patch('utils.db.KeepAliveClient.create', side_effect=Exception("This should not be called")):
 
             # Create instance without calling __init__
             connection = SupabaseConnection.__new__(SupabaseConnection)
@@ -124,7 +145,7 @@ class TestSupabaseConnection:
              patch.object(SupabaseConnection, '_client', None), \
              patch.object(SupabaseConnection, '__init__', return_value=None), \
              patch.dict(os.environ, {"SUPABASE_KEY": "test-key"}, clear=True), \
-             patch('utils.db.create_client', side_effect=Exception("This should not be called")):
+             patch('utils.db.KeepAliveClient.create', side_effect=Exception("This should not be called")):
 
             # Create instance without calling __init__
             connection = SupabaseConnection.__new__(SupabaseConnection)
@@ -204,5 +225,398 @@ class TestClientFunctions:
         mock_client.table.assert_called_once_with('test_table')
 
 
+CREDENTIALS = {"SUPABASE_URL": "https://example.com", "SUPABASE_KEY": "test-key"}
+
+
+class TestSupabaseClientPool:
+    """Tests for the pooled keep-alive clients."""
+
+    def test_http_client_keeps_connections_alive(self) -> None:
+        """Test that the HTTP client is configured with the keep-alive limits."""
+        http_client = create_http_client(max_connections=3, keepalive_expiry=5.0)
+        pool = http_client._transport._pool
+
+        assert pool._max_connections == 3
+        assert pool._max_keepalive_connections == 3
+        assert pool._keepalive_expiry == 5.0
+        assert pool._http2 is True
+        http_client.close()
+
+    def test_keepalive_client_is_only_used_by_postgrest(self) -> None:
+        """Test that touching storage and functions does not move PostgREST requests to another base URL."""
+        requests: List[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(200, json=[])
+
+        http_client = httpx.Client(transport=httpx.MockTransport(handler))
+        client = create_keepalive_client("https://example.supabase.co", "header.payload.signature", http_client)
+
+        storage, functions = client.storage, client.functions
+        client.table('marketplace_plans').select('*').execute()
+
+        assert client.postgrest.session is http_client
+        assert requests[0].url.path == "/rest/v1/marketplace_plans"
+        assert requests[0].url.host == "example.supabase.co"
+        assert storage.session is not http_client
+        assert functions._client is not http_client
+
+    @patch('utils.db.KeepAliveClient.create')
+    def test_clients_are_created_lazily_and_reused(self, mock_create_client: Mock) -> None:
+        """Test that a released client is handed out again instead of creating another."""
+        mock_create_client.side_effect = lambda url, key: Mock()
+
+        with patch.dict(os.environ, CREDENTIALS), SupabaseClientPool(size=2) as pool:
+            assert mock_create_client.call_count == 0
+            with pool.client() as first:
+                with pool.client() as second:
+                    assert first is not second
+                    assert first.postgrest_http_client is not second.postgrest_http_client
+            with pool.client() as again:
+                assert again is first or again is second
+
+        assert mock_create_client.call_count == 2
+
+    @patch('utils.db.KeepAliveClient.create')
+    def test_acquire_waits_for_a_free_client(self, mock_create_client: Mock) -> None:
+        """Test that checking out from a full pool waits for a release, or times out."""
+        mock_create_client.return_value = Mock()
+
+        with patch.dict(os.environ, CREDENTIALS), SupabaseClientPool(size=1) as pool:
+            client = pool.acquire()
+            with pytest.raises(TimeoutError):
+                pool.acquire(timeout=0.01)
+
+            threading.Timer(0.05, pool.release, args=(client,)).start()
+            assert pool.acquire(timeout=5) is client
+
+    @patch('utils.db.KeepAliveClient.create')
+    def test_async_client(self, mock_create_client: Mock) -> None:
+        """Test checking clients out from concurrent asyncio tasks."""
+        mock_create_client.side_effect = lambda url, key: Mock()
+
+        async def use(pool: SupabaseClientPool) -> int:
+            async with pool.async_client() as client:
+                await asyncio.sleep(0.01)
+                return id(client)
+
+        async def run(pool: SupabaseClientPool) -> list:
+            return await asyncio.gather(*(use(pool) for _ in range(4)))
+
+        with patch.dict(os.environ, CREDENTIALS), SupabaseClientPool(size=2) as pool:
+            used = asyncio.run(run(pool))
+
+        assert len(set(used)) == 2
+
+    def test_closed_pool_and_invalid_size(self) -> None:
+        """Test that a closed pool refuses new clients and the size is checked."""
+        pool = SupabaseClientPool(size=1)
+        pool.close()
+
+        with pytest.raises(ValueError, match="closed"):
+            pool.acquire()
+        with pytest.raises(ValueError, match="at least 1"):
+            SupabaseClientPool(size=0)
+
+    @patch('utils.db.SupabaseConnection')
+    def test_connection_is_created_on_first_use(self, mock_connection_class: Mock) -> None:
+        """Test that the shared client is only created when first requested."""
+        with patch('utils.db._supabase_connection', None):
+            assert mock_connection_class.call_count == 0
+            client = get_supabase_client()
+            assert get_supabase_client() is client
+
+        mock_connection_class.assert_called_once_with()
+
+
+class FakeClock:
+    """A clock that only moves when told to."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestQueryCache:
+    """Tests for the query result cache."""
+
+    def test_hits_misses_and_lru_eviction(self) -> None:
+        """Test that the least recently used result is evicted first."""
+        cache = QueryCache(max_entries=2)
+        cache.put(('t', 'a'), [1])
+        cache.put(('t', 'b'), [2])
+        assert cache.get(('t', 'a')) == [1]
+
+        cache.put(('t', 'c'), [3])
+
+        assert cache.get(('t', 'b')) is None
+        assert cache.get(('t', 'c')) == [3]
+        stats = cache.stats()
+        assert (stats['hits'], stats['misses'], stats['evictions'], stats['entries']) == (2, 1, 1, 2)
+        assert stats['hit_rate'] == pytest.approx(2 / 3)
+
+    def test_ttl_expiry(self) -> None:
+        """Test that results expire after their time-to-live."""
+        clock = FakeClock()
+        cache = QueryCache(ttl=10, clock=clock)
+        cache.put(('t', 'a'), [1])
+        cache.put(('t', 'b'), [2], ttl=100)
+
+        clock.now = 11
+
+        assert cache.get(('t', 'a')) is None
+        assert cache.get(('t', 'b')) == [2]
+        assert cache.stats()['expirations'] == 1
+
+    def test_row_limit(self) -> None:
+        """Test that the total number of cached rows is bounded."""
+        cache = QueryCache(max_rows=5)
+        cache.put(('t', 'a'), [1, 2, 3])
+        cache.put(('t', 'b'), [4, 5, 6])
+        cache.put(('t', 'huge'), list(range(6)))
+
+        assert cache.get(('t', 'a')) is None
+        assert cache.get(('t', 'b')) == [4, 5, 6]
+        assert cache.get(('t', 'huge')) is None
+        assert cache.stats()['rows'] == 3
+
+    def test_invalidate_by_table(self) -> None:
+        """Test dropping the results of one table."""
+        cache = QueryCache()
+        cache.put(('plans', 'a'), [1])
+        cache.put(('counties', 'a'), [2])
+
+        assert cache.invalidate('plans') == 1
+        assert cache.get(('plans', 'a')) is None
+        assert cache.get(('counties', 'a')) == [2]
+        assert cache.invalidate() == 1
+
+    def test_query_key_is_normalized(self) -> None:
+        """Test that equivalent queries share a key."""
+        first = query_key('plans', 'state_code, county_name', {'state_code': 'CA', 'metal_level': ['Gold', 'Silver']})
+        second = query_key('plans', 'state_code,county_name', {'metal_level': ('Silver', 'Gold'), 'state_code': 'CA'})
+
+        assert first == second
+        assert query_key('plans', filters={'state_code': 'NV'}) != query_key('plans', filters={'state_code': 'CA'})
+
+
+class TestCachedSelect:
+    """Tests for cached queries and invalidation hooks."""
+
+    @patch('utils.db.get_table')
+    def test_second_query_is_served_from_cache(self, mock_get_table: Mock) -> None:
+        """Test that a repeated query makes one round trip and builds the filters."""
+        query = mock_get_table.return_value.select.return_value
+        query.eq.return_value = query
+        query.in_.return_value = query
+        query.order.return_value = query
+        query.execute.return_value = Mock(data=[{'county_name': 'Alameda'}])
+        cache = QueryCache()
+
+        for _ in range(2):
+            rows = cached_select('state_county_lookup', 'county_name',
+                                 filters={'state_code': 'CA', 'fips_county_code': [6001, 6003]},
+                                 order='-county_name', cache=cache)
+
+        assert rows == [{'county_name': 'Alameda'}]
+        query.execute.assert_called_once()
+        query.eq.assert_called_once_with('state_code', 'CA')
+        query.in_.assert_called_once_with('fips_county_code', [6001, 6003])
+        query.order.assert_called_once_with('county_name', desc=True)
+        assert cache.stats()['hits'] == 1
+
+    def test_invalidation_runs_hooks(self) -> None:
+        """Test that invalidating drops the table's results and calls the registered hooks."""
+        cache = QueryCache()
+        cache.put(query_key('marketplace_plans'), [1])
+        seen = []
+
+        with patch('utils.db._query_cache', cache), patch('utils.db._invalidation_hooks', []):
+            on_invalidate(seen.append)
+            on_invalidate(Mock(side_effect=Exception("hook error"), __name__='broken'))
+
+            dropped = invalidate_cached_queries(['marketplace_plans', 'state_county_lookup'])
+
+        assert dropped == 1
+        assert seen == ['marketplace_plans', 'state_county_lookup']
+        assert cache.get(query_key('marketplace_plans')) is None
+
+
+def split_terms(text: str) -> List[str]:
+    """Split a PostgREST logical filter on the commas outside parentheses and quotes."""
+    terms, depth, quoted, escaped, current = [], 0, False, False, ''
+    for char in text:
+        if escaped:
+            escaped = False
+        elif char == '\\':
+            escaped = True
+        elif char == '"':
+            quoted = not quoted
+        elif not quoted and char in '()':
+            depth += 1 if char == '(' else -1
+        elif not quoted and depth == 0 and char == ',':
+            terms.append(current)
+            current = ''
+            continue
+        current += char
+    return terms + [current]
+
+
+def matches(row: Dict[str, Any], column: str, operator: str, operand: str) -> bool:
+    """Evaluate one column filter against a row, casting the operand to the column's type."""
+    if operand.startswith('"'):
+        operand = operand[1:-1].replace('\\"', '"').replace('\\\\', '\\')
+    actual = row[column]
+    value = type(actual)(operand)
+    return {'eq': actual == value, 'gt': actual > value, 'gte': actual >= value, 'lt': actual < value}[operator]
+
+
+def condition(row: Dict[str, Any], term: str) -> bool:
+    """Evaluate a term of an or() filter."""
+    if term.startswith('and('):
+        return all(condition(row, part) for part in split_terms(term[4:-1]))
+    column, operator, operand = term.split('.', 2)
+    return matches(row, column, operator, operand)
+
+
+def postgrest_table(rows: List[Dict[str, Any]], requests: List[httpx.Request], row_cap: Optional[int] = None,
+                    fail_below: Optional[str] = None) -> SyncPostgrestClient:
+    """A PostgREST client answered from rows, supporting the filters stream_table sends."""
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        selected = rows
+        for name, value in request.url.params.multi_items():
+            if name in ('select', 'order', 'limit'):
+                continue
+            if name == 'or':
+                selected = [row for row in selected if any(condition(row, term) for term in split_terms(value[1:-1]))]
+            else:
+                operator, operand = value.split('.', 1)
+                selected = [row for row in selected if matches(row, name, operator, operand)]
+        if fail_below is not None and any(row['id'] < fail_below for row in selected):
+            return httpx.Response(500, json={"message": "range failed", "code": "XX000"})
+        order = [item.split('.')[0] for item in request.url.params['order'].split(',')]
+        selected = sorted(selected, key=lambda row: [row[column] for column in order])
+        limit = int(request.url.params['limit'])
+        selected = selected[:min(limit, row_cap or limit)]
+        if request.url.params['select'] != '*':
+            columns = request.url.params['select'].split(',')
+            selected = [{column: row[column] for column in columns} for row in selected]
+        return httpx.Response(200, json=selected)
+
+    http_client = httpx.Client(base_url="http://postgrest.test", transport=httpx.MockTransport(handler))
+    return SyncPostgrestClient("http://postgrest.test", http_client=http_client)
+
+
+def fake_pool(client: SyncPostgrestClient) -> Mock:
+    """A client pool that hands out the same client."""
+    @contextmanager
+    def checkout() -> Iterator[SyncPostgrestClient]:
+        yield client
+
+    pool = Mock()
+    pool.client.side_effect = checkout
+    return pool
+
+
+ROWS = [{'id': str(uuid.UUID(int=(index * 0x9E3779B97F4A7C15 % 2 ** 64) << 64)), 'state_code': state,
+         'fips_county_code': county, 'plan_id_standard_component': plan_id, 'value': index}
+        for index, (state, county, plan_id) in enumerate([
+            ('CA', 6001, 'P1'), ('CA', 6001, 'P,2'), ('CA', 6001, 'P"3'), ('CA', 6003, 'P1'),
+            ('NV', 32003, 'P1'), ('TX', 48001, 'P1'), ('AK', 2013, 'P1'), ('WY', 56001, 'P1')])]
+
+
+class TestStreamTable:
+    """Tests for keyset-paginated table streaming."""
+
+    def test_pages_by_id(self) -> None:
+        """Test that pages continue after the last id read, until an empty page."""
+        requests: List[httpx.Request] = []
+        client = postgrest_table(ROWS, requests)
+
+        rows = list(stream_table('plans', page_size=3, client=client))
+
+        assert rows == sorted(ROWS, key=lambda row: row['id'])
+        assert len(requests) == 4
+        assert 'id' not in requests[0].url.params
+        assert requests[1].url.params['id'] == f"gt.{rows[2]['id']}"
+        assert 'offset' not in requests[1].url.params
+
+    def test_pages_by_business_key(self) -> None:
+        """Test composite keysets, including key values with commas and quotes."""
+        client = postgrest_table(ROWS, [])
+
+        rows = list(stream_table('plans', columns='value', key=BUSINESS_KEY, page_size=2, client=client))
+
+        assert [row['value'] for row in rows] == [6, 2, 1, 0, 3, 4, 5, 7]
+        assert set(rows[0]) == {'value', *BUSINESS_KEY}
+
+    def test_row_cap_does_not_end_stream(self) -> None:
+        """Test that a server returning fewer rows than asked for does not truncate the stream."""
+        client = postgrest_table(ROWS, [], row_cap=2)
+
+        assert len(list(stream_table('plans', page_size=5, client=client))) == len(ROWS)
+
+    def test_filters_and_models(self) -> None:
+        """Test that filters are applied and rows can be validated into a model."""
+        class Plan(BaseModel):
+            state_code: str
+            value: int
+
+        client = postgrest_table(ROWS, [])
+
+        plans = list(stream_table('plans', filters={'state_code': 'CA'}, model=Plan, client=client))
+
+        assert all(isinstance(plan, Plan) for plan in plans)
+        assert sorted(plan.value for plan in plans) == [0, 1, 2, 3]
+
+    @pytest.mark.parametrize("key", [('id',), BUSINESS_KEY])
+    def test_parallel_ranges_read_every_row_once(self, key) -> None:
+        """Test that parallel key ranges are disjoint and together cover the table."""
+        requests: List[httpx.Request] = []
+        pool = fake_pool(postgrest_table(ROWS, requests))
+
+        rows = list(stream_table('plans', key=key, page_size=1, partitions=3, pool=pool))
+
+        assert sorted(row['value'] for row in rows) == list(range(len(ROWS)))
+        assert pool.client.call_count == 3
+
+    def test_parallel_range_error_is_raised(self) -> None:
+        """Test that a failing range stops the stream with its error."""
+        pool = fake_pool(postgrest_table(ROWS, [], fail_below='4'))
+
+        with pytest.raises(APIError):
+            list(stream_table('plans', page_size=1, partitions=3, pool=pool))
+
+    def test_stopping_early_stops_threads(self) -> None:
+        """Test that closing the stream stops the range threads."""
+        pool = fake_pool(postgrest_table(ROWS, []))
+        stream = stream_table('plans', page_size=1, partitions=2, pool=pool)
+
+        next(stream)
+        stream.close()
+
+        assert not [thread for thread in threading.enumerate() if thread.name.startswith('stream_table')]
+
+    def test_key_ranges(self) -> None:
+        """Test splitting UUIDs evenly and text keys by first letter."""
+        assert key_ranges(('id',), 2) == [(None, '80000000-0000-0000-0000-000000000000'),
+                                          ('80000000-0000-0000-0000-000000000000', None)]
+        assert key_ranges(BUSINESS_KEY, 1) == [(None, None)]
+        assert len(key_ranges(BUSINESS_KEY, 40)) == 26
+
+    def test_invalid_arguments(self) -> None:
+        """Test that bad arguments are rejected before anything is fetched."""
+        with pytest.raises(ValueError, match="page_size"):
+            stream_table(page_size=0)
+        with pytest.raises(ValueError, match="partitions"):
+            stream_table(partitions=0)
+        with pytest.raises(ValueError, match="key"):
+            stream_table(key=())
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
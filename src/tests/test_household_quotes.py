@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Tests for the vectorized household quotes in household_quotes.py.
+
+This module tests the age-curve weights, the child charging rule, missing
+premiums and quoting households against the plans of their county.
+"""
+
+import gc
+import os
+import weakref
+from typing import Any, Dict
+
+import pytest
+
+# Add the src directory to the path
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.household_quotes import (
+    PREMIUM_POINTS,
+    age_weights,
+    household_weights,
+    premium_matrix,
+    quote_households,
+    slcsp_premiums,
+)
+from utils.plan_store import PlanStore, build_snapshot
+
+from conftest import plan_record
+
+np = pytest.importorskip("numpy")
+
+PUBLISHED = {14: 200.0, 18: 240.0, 21: 260.0, 27: 272.0, 30: 295.0, 40: 332.0, 50: 464.0, 60: 705.0}
+
+
+def priced_plan(plan_id: str, fips_county_code: int, scale: float = 1.0,
+                metal_level: str = 'Silver') -> Dict[str, Any]:
+    """Build a plan record with the published premiums scaled by scale."""
+    premiums = {column: PUBLISHED[age] * scale for column, age in PREMIUM_POINTS}
+    return plan_record(plan_id_standard_component=plan_id, fips_county_code=fips_county_code,
+                       metal_level=metal_level, **premiums)
+
+
+class TestAgeWeights:
+    """Test interpolation weights along the age curve."""
+
+    def test_published_ages_use_one_point(self) -> None:
+        """Test that a published age takes that point's premium exactly."""
+        weights = age_weights(np.array([age for _, age in PREMIUM_POINTS]))
+
+        assert np.allclose(weights, np.eye(len(PREMIUM_POINTS)))
+
+    def test_young_children_use_the_0_14_premium(self) -> None:
+        """Test that every age up to 14 is priced as 0-14."""
+        assert np.allclose(age_weights(np.array([0, 5, 14])), age_weights(np.array([14, 14, 14])))
+
+    def test_interpolation_follows_curve(self) -> None:
+        """Test that 45 sits between 40 and 50 where the federal curve puts it."""
+        weights = age_weights(np.array([45]))[0]
+
+        t = (1.444 - 1.278) / (1.786 - 1.278)
+        assert weights[5] == pytest.approx(1 - t)
+        assert weights[6] == pytest.approx(t)
+        assert weights.sum() == pytest.approx(1.0)
+
+    def test_ages_above_60_extrapolate(self) -> None:
+        """Test that ages above 60 continue the 50-60 segment and stop at 64."""
+        premiums = np.array([PUBLISHED[age] for _, age in PREMIUM_POINTS])
+        quoted = age_weights(np.array([60, 64, 80])) @ premiums
+
+        assert quoted[0] == pytest.approx(705.0)
+        assert quoted[1] == pytest.approx(705.0 + (705.0 - 464.0) * (3.0 - 2.714) / (2.714 - 1.786))
+        assert quoted[2] == pytest.approx(quoted[1])
+
+    def test_flat_premiums_stay_flat(self) -> None:
+        """Test that community-rated plans are not age-rated by the extrapolation."""
+        flat = np.full(len(PREMIUM_POINTS), 500.0)
+
+        assert np.allclose(age_weights(np.array([0, 45, 63])) @ flat, 500.0)
+
+
+class TestHouseholdWeights:
+    """Test summing members into household weights."""
+
+    def test_only_three_oldest_children_are_charged(self) -> None:
+        """Test the child charging rule."""
+        weights = household_weights([[40, 38, 19, 10, 8, 4], [40, 38, 19, 10, 8]])
+
+        assert np.allclose(weights[0], weights[1])
+        assert np.allclose(weights[0], age_weights(np.array([40, 38, 19, 10, 8])).sum(axis=0))
+
+    def test_adults_under_21_are_children(self) -> None:
+        """Test that a household of young members is only charged for the three oldest."""
+        weights = household_weights([[20, 20, 20, 20]])
+
+        assert np.allclose(weights[0], 3 * age_weights(np.array([20]))[0])
+
+
+class TestQuoteHouseholds:
+    """Test quoting households against county plans."""
+
+    def test_quotes_match_published_household_premiums(self) -> None:
+        """Test that published household shapes are reproduced from the per-age premiums."""
+        snapshot = build_snapshot([priced_plan('A', 6001), priced_plan('B', 6001, 1.5)])
+
+        couple, family = quote_households(snapshot, [('CA', 6001, [40, 40]), ('CA', '6001', [30, 30, 8, 6])])
+
+        assert list(couple.rows) == [0, 1]
+        assert couple.premiums == pytest.approx([664.0, 996.0])
+        assert family.premiums == pytest.approx([2 * 295.0 + 2 * 200.0, 1.5 * (2 * 295.0 + 2 * 200.0)])
+
+    def test_households_in_different_counties(self) -> None:
+        """Test that each household only gets the plans of its own county, in input order."""
+        snapshot = build_snapshot([priced_plan('A', 6001), priced_plan('B', 6075), priced_plan('C', 6075)])
+
+        quotes = quote_households(snapshot, [('CA', 6075, [21]), ('CA', 6001, [21]), ('NV', 32003, [21])])
+
+        assert [list(quote.rows) for quote in quotes] == [[1, 2], [0], []]
+        assert quotes[1].premiums == pytest.approx([260.0])
+        assert quotes[2].premiums.size == 0
+
+    def test_missing_premium_only_affects_ages_that_need_it(self) -> None:
+        """Test that a missing published point makes only the quotes that use it NaN."""
+        record = priced_plan('A', 6001)
+        record['premium_child_age_0_14'] = None
+        snapshot = build_snapshot([record])
+
+        adult, with_child = quote_households(snapshot, [('CA', 6001, [40]), ('CA', 6001, [40, 5])])
+
+        assert np.isnan(premium_matrix(snapshot)[0, 0])
+        assert adult.premiums == pytest.approx([332.0])
+        assert np.isnan(with_child.premiums[0])
+
+    def test_negative_age_raises(self) -> None:
+        """Test that negative ages are rejected."""
+        snapshot = build_snapshot([priced_plan('A', 6001)])
+
+        with pytest.raises(ValueError, match="negative"):
+            quote_households(snapshot, [('CA', 6001, [40, -1])])
+
+
+class TestSlcspPremiums:
+    """Test the second-lowest-cost silver plan benchmarks."""
+
+    def test_second_lowest_silver_plan(self) -> None:
+        """Test that the benchmark is the second cheapest Silver plan, ignoring other metal levels."""
+        snapshot = build_snapshot([priced_plan('A', 6001, 1.2), priced_plan('B', 6001, 0.5, 'Bronze'),
+                                   priced_plan('C', 6001, 1.0), priced_plan('D', 6001, 1.5)])
+
+        benchmarks = slcsp_premiums(snapshot)
+
+        assert benchmarks[('CA', 6001)] == pytest.approx([1.2 * PUBLISHED[age] for _, age in PREMIUM_POINTS])
+
+    def test_single_silver_plan_is_the_benchmark(self) -> None:
+        """Test that a county with one Silver plan uses it, and counties without one are left out."""
+        snapshot = build_snapshot([priced_plan('A', 6001), priced_plan('B', 6075, metal_level='Gold')])
+
+        benchmarks = slcsp_premiums(snapshot)
+
+        assert list(benchmarks) == [('CA', 6001)]
+        assert benchmarks[('CA', 6001)] == pytest.approx([PUBLISHED[age] for _, age in PREMIUM_POINTS])
+
+    def test_points_are_ranked_separately(self) -> None:
+        """Test that missing premiums are skipped at their own point only."""
+        cheap = priced_plan('A', 6001)
+        cheap['premium_child_age_0_14'] = None
+        snapshot = build_snapshot([cheap, priced_plan('B', 6001, 2.0), priced_plan('C', 6001, 3.0)])
+
+        benchmark = slcsp_premiums(snapshot)[('CA', 6001)]
+
+        assert benchmark[0] == pytest.approx(3.0 * PUBLISHED[14])
+        assert benchmark[1:] == pytest.approx([2.0 * PUBLISHED[age] for _, age in PREMIUM_POINTS[1:]])
+
+
+class TestSnapshotCache:
+    """Test that derived arrays live exactly as long as their snapshot."""
+
+    def test_derived_arrays_are_reused(self) -> None:
+        """Test that a snapshot's matrix and benchmarks are built once."""
+        snapshot = build_snapshot([priced_plan('A', 6001)])
+
+        assert premium_matrix(snapshot) is premium_matrix(snapshot)
+        assert slcsp_premiums(snapshot) is slcsp_premiums(snapshot)
+
+    def test_refreshed_snapshot_is_freed(self) -> None:
+        """Test that a snapshot swapped out by PlanStore.refresh() is not kept alive by the cache."""
+        store = PlanStore(lambda: [priced_plan('A', 6001), priced_plan('B', 6001, 1.5)])
+        quote_households(store.snapshot, [('CA', 6001, [40])])
+        slcsp_premiums(store.snapshot)
+        old = weakref.ref(store.snapshot)
+
+        store.refresh()
+        gc.collect()
+
+        assert old() is None
+        assert ('CA', 6001) in slcsp_premiums(store.snapshot)
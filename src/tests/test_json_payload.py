@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Tests for the pre-serialized request bodies in json_payload.py.
+
+This module tests encoding rows, joining them into a batch body and sending
+that body through a real postgrest-py client over a mock HTTP transport.
+"""
+
+import json
+import os
+from typing import Any, Dict, List
+
+import httpx
+import pytest
+from postgrest import SyncPostgrestClient
+from postgrest.exceptions import APIError
+
+# Add the src directory to the path
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from utils import json_payload
+from utils.json_payload import encode_row, encode_rows, execute_with_payload, join_rows
+
+RECORDS = [
+    {"state_code": "CA", "fips_county_code": 6001, "premium": 312.5, "url": None},
+    {"state_code": "NV", "fips_county_code": 32003, "premium": 280.0, "url": "café"},
+]
+
+
+def postgrest_client(requests: List[httpx.Request], status_code: int = 201,
+                     body: Any = None) -> SyncPostgrestClient:
+    """Build a postgrest-py client whose requests are recorded and answered locally."""
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(status_code, json=body if body is not None else json.loads(request.content))
+
+    http_client = httpx.Client(base_url="http://postgrest.test", transport=httpx.MockTransport(handler))
+    return SyncPostgrestClient("http://postgrest.test", http_client=http_client)
+
+
+class TestEncodeRows:
+    """Test encoding records as JSON."""
+
+    def test_rows_round_trip(self) -> None:
+        """Test that encoded rows decode back to the records."""
+        rows, cpu_seconds = encode_rows(RECORDS)
+
+        assert [json.loads(row) for row in rows] == RECORDS
+        assert cpu_seconds >= 0.0
+
+    def test_join_rows_makes_array(self) -> None:
+        """Test that joined rows form the JSON array of the batch, and halves reuse them."""
+        rows, _ = encode_rows(RECORDS)
+
+        assert json.loads(join_rows(rows)) == RECORDS
+        assert json.loads(join_rows(rows[1:])) == RECORDS[1:]
+        assert join_rows([]) == b"[]"
+
+    def test_stdlib_fallback(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test that rows are compact JSON without orjson."""
+        monkeypatch.setattr(json_payload, "orjson", None)
+
+        assert encode_row({"a": 1, "b": "é"}) == '{"a":1,"b":"é"}'.encode("utf-8")
+
+    @pytest.mark.parametrize("encoder", ["orjson", "stdlib"])
+    @pytest.mark.parametrize("value", [float("nan"), float("inf"), -float("inf"), [1.0, float("nan")]])
+    def test_non_finite_floats_are_rejected(self, monkeypatch: pytest.MonkeyPatch, encoder: str,
+                                            value: Any) -> None:
+        """Test that NaN and Infinity are rejected the same way with and without orjson."""
+        if encoder == "orjson":
+            pytest.importorskip("orjson")
+        else:
+            monkeypatch.setattr(json_payload, "orjson", None)
+
+        with pytest.raises(ValueError):
+            encode_row({"premium": value})
+
+
+class TestExecuteWithPayload:
+    """Test sending a pre-serialized body through postgrest-py."""
+
+    def test_insert_sends_payload_bytes(self) -> None:
+        """Test that the body is sent as is, with the headers and parameters postgrest-py sets."""
+        requests: List[httpx.Request] = []
+        client = postgrest_client(requests)
+        payload = join_rows(encode_rows(RECORDS)[0])
+
+        response = execute_with_payload(client.table("marketplace_plans").insert(RECORDS), payload)
+
+        assert response.data == RECORDS
+        request = requests[0]
+        assert request.method == "POST"
+        assert request.content == payload
+        assert request.headers["content-type"] == "application/json"
+        assert "return=representation" in request.headers["prefer"]
+        assert request.url.params["columns"]
+
+    def test_upsert_keeps_conflict_target(self) -> None:
+        """Test that upserts keep their on_conflict parameter and merge preference."""
+        requests: List[httpx.Request] = []
+        client = postgrest_client(requests)
+        request = client.table("marketplace_plans").upsert(RECORDS, on_conflict="state_code,fips_county_code")
+
+        execute_with_payload(request, join_rows(encode_rows(RECORDS)[0]))
+
+        assert requests[0].url.params["on_conflict"] == "state_code,fips_county_code"
+        assert "resolution=merge-duplicates" in requests[0].headers["prefer"]
+
+    def test_error_is_raised_as_api_error(self) -> None:
+        """Test that an error response is raised like postgrest-py raises it."""
+        requests: List[httpx.Request] = []
+        error: Dict[str, Any] = {"message": "duplicate key", "code": "23505", "hint": None, "details": None}
+        client = postgrest_client(requests, status_code=409, body=error)
+
+        with pytest.raises(APIError) as raised:
+            execute_with_payload(client.table("marketplace_plans").insert(RECORDS), b"[]")
+
+        assert raised.value.code == "23505"
+
+    def test_non_json_error_keeps_status_code(self) -> None:
+        """Test that an error page from a proxy is raised with its HTTP status as the code."""
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(503, text="<html>Service Unavailable</html>")
+
+        http_client = httpx.Client(base_url="http://postgrest.test", transport=httpx.MockTransport(handler))
+        client = SyncPostgrestClient("http://postgrest.test", http_client=http_client)
+
+        with pytest.raises(APIError) as raised:
+            execute_with_payload(client.table("marketplace_plans").insert(RECORDS), b"[]")
+
+        assert raised.value.code == "503"
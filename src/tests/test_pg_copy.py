@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Tests for the PostgreSQL COPY loader in pg_copy.py.
+
+This module tests the column list, the per-column conversions for binary
+COPY, the CSV encoding and the COPY statement, using a fake connection in
+place of a database.
+"""
+
+import csv
+import io
+import os
+from decimal import Decimal
+from typing import Any, List, Optional
+from unittest.mock import MagicMock
+
+import pytest
+
+# Add the src directory to the path
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from models.model import MarketplacePlanJSON
+from utils import pg_copy
+from utils.pg_copy import (
+    binary_converter,
+    call_function,
+    copy_columns,
+    copy_records,
+    copy_statement,
+)
+
+requires_psycopg = pytest.mark.skipif(pg_copy.psycopg is None, reason="psycopg is not installed")
+
+COLUMNS = ['state_code', 'fips_county_code', 'premium_adult_individual_age_21', 'plan_brochure_url']
+TYPES = {'state_code': 'character varying', 'fips_county_code': 'integer',
+         'premium_adult_individual_age_21': 'numeric', 'plan_brochure_url': 'text', 'id': 'uuid'}
+
+
+class FakeCopy:
+    """Collect what is written to a COPY."""
+
+    def __init__(self) -> None:
+        self.types: Optional[List[str]] = None
+        self.rows: List[List[Any]] = []
+        self.data = ''
+
+    def __enter__(self) -> 'FakeCopy':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        pass
+
+    def set_types(self, types: List[str]) -> None:
+        self.types = types
+
+    def write_row(self, row: List[Any]) -> None:
+        self.rows.append(row)
+
+    def write(self, data: str) -> None:
+        self.data += data
+
+
+def fake_connection(copy: FakeCopy) -> MagicMock:
+    """Build a connection whose cursor reports the column types and hands out the fake COPY."""
+    connection = MagicMock()
+    cursor = connection.cursor.return_value.__enter__.return_value
+    cursor.fetchall.return_value = list(TYPES.items())
+    cursor.copy.return_value = copy
+    return connection
+
+
+class TestCopyColumns:
+    """Test the column list and statement."""
+
+    def test_copy_columns_follow_model(self) -> None:
+        """Test that the columns are the model fields in order, without id."""
+        columns = copy_columns()
+
+        assert columns == list(MarketplacePlanJSON.model_fields)
+        assert 'id' not in columns
+
+    @requires_psycopg
+    def test_copy_statement(self) -> None:
+        """Test that identifiers are quoted and the format is set."""
+        statement = copy_statement(['state_code', 'county_name'], 'csv').as_string(None)
+
+        assert statement == 'COPY "marketplace_plans" ("state_code", "county_name") FROM STDIN (FORMAT CSV)'
+
+
+class TestBinaryConverter:
+    """Test the conversions applied before binary COPY."""
+
+    def test_numeric_converts_floats_to_decimal(self) -> None:
+        """Test that floats become exact decimals for numeric columns."""
+        convert = binary_converter('numeric')
+
+        assert convert(312.5) == Decimal('312.5')
+        assert isinstance(convert(312.5), Decimal)
+        assert convert(3) == 3
+
+    def test_text_converts_to_str(self) -> None:
+        """Test that numbers in text columns are sent as text."""
+        assert binary_converter('character varying')(45.0) == '45.0'
+        assert binary_converter('text')('x') == 'x'
+
+    def test_integer_and_unknown_types(self) -> None:
+        """Test integer conversion and that other types are left alone."""
+        assert binary_converter('integer')(6001.0) == 6001
+        assert binary_converter('uuid') is None
+
+
+@requires_psycopg
+class TestCopyRecords:
+    """Test streaming records through a COPY."""
+
+    def test_binary_copy_converts_values(self) -> None:
+        """Test that binary COPY sets the column types and converts each value."""
+        copy = FakeCopy()
+        records = [
+            {'state_code': 'CA', 'fips_county_code': 6001, 'premium_adult_individual_age_21': 312.5,
+             'plan_brochure_url': None},
+            {'state_code': 'NV', 'fips_county_code': 32003.0, 'premium_adult_individual_age_21': 280.0,
+             'plan_brochure_url': 7},
+        ]
+
+        count = copy_records(fake_connection(copy), iter(records), 'binary', columns=COLUMNS)
+
+        assert count == 2
+        assert copy.types == ['character varying', 'integer', 'numeric', 'text']
+        assert copy.rows == [['CA', 6001, Decimal('312.5'), None], ['NV', 32003, Decimal('280.0'), '7']]
+
+    def test_csv_copy_distinguishes_null_and_empty(self) -> None:
+        """Test that None is written as NULL and an empty string stays empty."""
+        copy = FakeCopy()
+        records = [{'state_code': 'CA', 'fips_county_code': 6001, 'premium_adult_individual_age_21': 312.5,
+                    'plan_brochure_url': None},
+                   {'state_code': 'Say "hi", NV', 'fips_county_code': 1,
+                    'premium_adult_individual_age_21': 1.0, 'plan_brochure_url': ''}]
+
+        count = copy_records(fake_connection(copy), records, 'csv', columns=COLUMNS)
+
+        assert count == 2
+        assert copy.types is None
+        lines = copy.data.splitlines()
+        assert lines[0] == '"CA","6001","312.5",'
+        assert lines[1].endswith(',""')
+        assert list(csv.reader(io.StringIO(lines[1])))[0][0] == 'Say "hi", NV'
+
+    def test_missing_column_raises(self) -> None:
+        """Test that a column missing from the table is reported before copying."""
+        copy = FakeCopy()
+
+        with pytest.raises(ValueError, match="missing"):
+            copy_records(fake_connection(copy), [], 'binary', columns=['state_code', 'no_such_column'])
+
+    def test_unknown_format_raises(self) -> None:
+        """Test that only binary and csv are accepted."""
+        with pytest.raises(ValueError, match="Unknown COPY format"):
+            copy_records(MagicMock(), [], 'text')
+
+
+@requires_psycopg
+class TestCallFunction:
+    """Test calling a database function over a direct connection."""
+
+    def test_call_function(self) -> None:
+        """Test that the function name is quoted and called in its own connection."""
+        connection = MagicMock()
+        with pytest.MonkeyPatch.context() as monkeypatch:
+            monkeypatch.setattr(pg_copy.psycopg, 'connect', MagicMock(return_value=connection))
+            call_function('postgresql://localhost/test', 'refresh_state_county_lookup')
+
+        statement = connection.__enter__.return_value.execute.call_args.args[0]
+        assert statement.as_string(None) == 'SELECT "refresh_state_county_lookup"()'
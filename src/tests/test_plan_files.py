@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Tests for the plan file readers and writers in plan_files.py.
+
+This module tests format and compression detection from file names and reading
+JSON array and NDJSON files, both plain and compressed.
+"""
+
+import gzip
+import json
+import os
+import tempfile
+from typing import Any, Dict, List
+
+import pytest
+
+# Add the src directory to the path
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from utils import plan_files
+from utils.plan_files import (
+    detect_compression,
+    detect_format,
+    plan_file_name,
+    open_text,
+    encode_ndjson_record,
+    iter_plan_records,
+    iter_parquet_batches,
+    plan_arrow_schema,
+    records_to_record_batch,
+    write_parquet_records,
+    OVERFLOW_SUFFIX,
+)
+
+requires_zstandard = pytest.mark.skipif(plan_files.zstandard is None, reason="zstandard is not installed")
+requires_pyarrow = pytest.mark.skipif(plan_files.pa is None, reason="pyarrow is not installed")
+
+RECORDS: List[Dict[str, Any]] = [
+    {'state_code': 'CA', 'plan_marketing_name': 'Gold Ⓡ Plan', 'premium_adult_individual_age_21': 312.5},
+    {'state_code': 'NY', 'plan_marketing_name': None, 'premium_adult_individual_age_21': 401},
+]
+
+
+class TestFileNames:
+    """Test format and compression detection."""
+
+    @pytest.mark.parametrize("file_name,output_format,compression", [
+        ('marketplace_plans.json', 'json', 'none'),
+        ('marketplace_plans.json.gz', 'json', 'gzip'),
+        ('marketplace_plans.ndjson', 'ndjson', 'none'),
+        ('marketplace_plans.jsonl', 'ndjson', 'none'),
+        ('marketplace_plans.ndjson.zst', 'ndjson', 'zstd'),
+        ('marketplace_plans.parquet', 'parquet', 'none'),
+    ])
+    def test_detect(self, file_name: str, output_format: str, compression: str) -> None:
+        """Test detecting the format and compression from a file name."""
+        assert detect_format(file_name) == output_format
+        assert detect_compression(file_name) == compression
+
+    def test_plan_file_name(self) -> None:
+        """Test building file names that round-trip through detection."""
+        assert plan_file_name('marketplace_plans') == 'marketplace_plans.json'
+        name = plan_file_name('marketplace_plans', 'ndjson', 'gzip')
+        assert name == 'marketplace_plans.ndjson.gz'
+        assert (detect_format(name), detect_compression(name)) == ('ndjson', 'gzip')
+        assert plan_file_name('marketplace_plans', 'parquet', 'zstd') == 'marketplace_plans.parquet'
+
+
+class TestIterPlanRecords:
+    """Test reading records from every supported file type."""
+
+    @pytest.mark.parametrize("file_name", [
+        'plans.ndjson', 'plans.ndjson.gz', pytest.param('plans.ndjson.zst', marks=requires_zstandard), 'plans.jsonl'
+    ])
+    def test_read_ndjson(self, file_name: str) -> None:
+        """Test reading plain and compressed NDJSON files."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, file_name)
+            with open_text(file_path, 'wt') as f:
+                for record in RECORDS:
+                    f.write(encode_ndjson_record(record) + '\n')
+                f.write('\n')
+
+            assert list(iter_plan_records(file_path)) == RECORDS
+
+    def test_read_gzipped_json_array(self) -> None:
+        """Test reading a gzip-compressed JSON array."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, 'plans.json.gz')
+            with gzip.open(file_path, 'wt', encoding='utf-8') as f:
+                json.dump(RECORDS, f)
+
+            assert list(iter_plan_records(file_path)) == RECORDS
+
+    def test_ndjson_is_read_lazily(self) -> None:
+        """Test that records before a corrupt line are available."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, 'plans.ndjson')
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.write(encode_ndjson_record(RECORDS[0]) + '\n{broken\n')
+
+            records = iter_plan_records(file_path)
+            assert next(records) == RECORDS[0]
+            with pytest.raises(json.JSONDecodeError):
+                next(records)
+
+    def test_missing_file(self) -> None:
+        """Test that a missing file raises FileNotFoundError."""
+        with pytest.raises(FileNotFoundError):
+            list(iter_plan_records('/path/that/does/not/exist.ndjson'))
+
+    def test_zstd_requires_zstandard(self) -> None:
+        """Test the error when zstandard is not installed."""
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr('utils.plan_files.zstandard', None)
+            with pytest.raises(ValueError, match='zstandard'):
+                open_text('plans.ndjson.zst')
+
+
+class TestJsonArrayReader:
+    """Test the memory-mapped JSON array reader."""
+
+    @pytest.mark.parametrize("indent", [None, 2, 4])
+    @pytest.mark.parametrize("window", [7, 1024])
+    def test_layouts_and_windows(self, indent: Any, window: int) -> None:
+        """Test that every layout reads back, even when values straddle decode windows."""
+        records = RECORDS * 20
+        with tempfile.TemporaryDirectory() as temp_dir, pytest.MonkeyPatch.context() as mp:
+            mp.setattr('utils.plan_files.JSON_READ_WINDOW', window)
+            file_path = os.path.join(temp_dir, 'plans.json')
+            with open(file_path, 'w', encoding='utf-8') as f:
+                json.dump(records, f, indent=indent, ensure_ascii=False)
+
+            assert list(iter_plan_records(file_path)) == records
+            assert list(iter_plan_records(file_path, offset=37)) == records[37:]
+            assert list(iter_plan_records(file_path, offset=100)) == []
+
+    @pytest.mark.parametrize("content", ['', '[', '{"a": 1}', '[1 2]', '[1,]'])
+    def test_invalid_arrays(self, content: str) -> None:
+        """Test that malformed files raise JSONDecodeError."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, 'plans.json')
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+
+            with pytest.raises(json.JSONDecodeError):
+                list(iter_plan_records(file_path))
+
+    @pytest.mark.parametrize("file_name", ['plans.ndjson', 'plans.json.gz'])
+    def test_offset_for_other_formats(self, file_name: str) -> None:
+        """Test that the offset applies to NDJSON and compressed JSON too."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, file_name)
+            with open_text(file_path, 'wt') as f:
+                if file_name.endswith('.ndjson'):
+                    f.writelines(encode_ndjson_record(record) + '\n' for record in RECORDS)
+                else:
+                    json.dump(RECORDS, f)
+
+            assert list(iter_plan_records(file_path, offset=1)) == RECORDS[1:]
+
+
+@requires_pyarrow
+class TestParquetFiles:
+    """Test the columnar Parquet plan files."""
+
+    def test_schema_follows_model(self) -> None:
+        """Test that repeated strings are dictionary-encoded and premiums are floats."""
+        schema = plan_arrow_schema()
+
+        assert str(schema.field('state_code').type) == 'dictionary<values=string, indices=int32, ordered=0>'
+        assert str(schema.field('premium_adult_individual_age_21').type) == 'double'
+        assert str(schema.field('fips_county_code').type) == 'int64'
+        assert 'state_code' + OVERFLOW_SUFFIX in schema.names
+
+    def test_round_trip_keeps_values_that_do_not_fit_the_column(self) -> None:
+        """Test that strings in numeric columns and numbers in text columns read back unchanged."""
+        records: List[Dict[str, Any]] = [
+            {'state_code': 'CA', 'fips_county_code': 6001, 'medical_deductible_individual_standard': 1500.0},
+            {'state_code': 'CA', 'fips_county_code': 6003,
+             'medical_deductible_individual_standard': 'Included in Medical', 'plan_type': 42},
+            {'state_code': None, 'fips_county_code': '06005', 'medical_deductible_individual_standard': None},
+        ]
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, 'plans.parquet')
+            assert write_parquet_records(iter(records), file_path, batch_size=2) == 3
+
+            batches = list(iter_parquet_batches(file_path, batch_size=2))
+            result = list(iter_plan_records(file_path))
+            resumed = list(iter_plan_records(file_path, offset=2))
+
+        assert [batch.num_rows for batch in batches] == [2, 1]
+        assert resumed == result[2:]
+        assert len(result) == 3
+        for record, read_back in zip(records, result):
+            assert {key: read_back[key] for key in record} == record
+            assert type(read_back['fips_county_code']) is type(record['fips_county_code'])
+            assert read_back['metal_level'] is None
+
+    def test_unknown_columns_are_rejected(self) -> None:
+        """Test that keys outside MarketplacePlanJSON are not silently dropped."""
+        with pytest.raises(ValueError, match='not_a_column'):
+            records_to_record_batch([{'state_code': 'CA', 'not_a_column': 1}])
+
+    def test_missing_file(self) -> None:
+        """Test that a missing Parquet file raises FileNotFoundError."""
+        with pytest.raises(FileNotFoundError):
+            list(iter_plan_records('/path/that/does/not/exist.parquet'))
+
+    def test_requires_pyarrow(self) -> None:
+        """Test the error when pyarrow is not installed."""
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr('utils.plan_files.pa', None)
+            with pytest.raises(ValueError, match='pyarrow'):
+                plan_arrow_schema()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
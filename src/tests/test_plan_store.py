@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-memory plan store in plan_store.py.
+
+This module tests building column-oriented snapshots, indexed lookups with
+filters and projections, loading from plan files and Supabase pages, and
+swapping snapshots on refresh.
+"""
+
+import json
+import os
+from array import array
+from typing import Any, Dict, List
+from unittest.mock import Mock, patch
+
+import pytest
+
+# Add the src directory to the path
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.plan_store import PlanStore, build_snapshot, iter_supabase_plans
+
+from conftest import plan_record
+
+
+RECORDS = [
+    plan_record(premium, plan_id_standard_component=plan_id, state_code=state_code, fips_county_code=county,
+                hios_issuer_id=issuer, metal_level=metal_level, issuer_name=f"Issuer {issuer}")
+    for plan_id, state_code, county, issuer, metal_level, premium in [
+        ('11111CA0010001', 'CA', 6001, 11111, 'Silver', 300.0),
+        ('11111CA0010002', 'CA', 6001, 11111, 'Gold', 400.0),
+        ('22222CA0010001', 'CA', 6001, 22222, 'Silver', 310.0),
+        ('11111CA0010001', 'CA', 6075, 11111, 'Silver', 350.0),
+        ('33333NV0010001', 'NV', 32003, 33333, 'Bronze', 250.0),
+    ]
+]
+
+
+class TestBuildSnapshot:
+    """Test the column-oriented snapshot."""
+
+    def test_columns_are_packed(self) -> None:
+        """Test that numeric columns become arrays and strings are shared."""
+        snapshot = build_snapshot(RECORDS)
+
+        assert snapshot.row_count == 5
+        assert isinstance(snapshot.columns['premium_adult_individual_age_40'], array)
+        assert isinstance(snapshot.columns['fips_county_code'], array)
+        assert isinstance(snapshot.columns['state_code'], list)
+        names = snapshot.columns['issuer_name']
+        assert names[0] is names[1] is names[3]
+
+    def test_rows_round_trip(self) -> None:
+        """Test that rows are rebuilt as the model fields of the input records."""
+        records = [dict(record, id='x', content_hash='y') for record in RECORDS]
+
+        snapshot = build_snapshot(records)
+
+        assert snapshot.rows(range(5)) == RECORDS
+
+    def test_columns_with_nulls_stay_lists(self) -> None:
+        """Test that a numeric column with a null keeps its values as they are."""
+        records = [dict(RECORDS[0], premium_adult_individual_age_40=None), RECORDS[1]]
+
+        snapshot = build_snapshot(records)
+
+        assert snapshot.columns['premium_adult_individual_age_40'] == [None, 400.0]
+
+
+class TestLookup:
+    """Test indexed lookups."""
+
+    @pytest.fixture
+    def store(self) -> PlanStore:
+        return PlanStore(lambda: RECORDS)
+
+    def test_county_plans(self, store: PlanStore) -> None:
+        """Test finding the plans offered in a county."""
+        plans = store.county_plans('CA', 6001, columns=['plan_id_standard_component'])
+
+        assert plans == [{'plan_id_standard_component': '11111CA0010001'},
+                         {'plan_id_standard_component': '11111CA0010002'},
+                         {'plan_id_standard_component': '22222CA0010001'}]
+
+    def test_indexes_are_intersected_and_filtered(self, store: PlanStore) -> None:
+        """Test combining the county and issuer indexes with a column filter."""
+        plans = store.lookup(state_code='CA', fips_county_code='6001', hios_issuer_id=11111, metal_level='Silver',
+                             columns=['plan_id_standard_component', 'premium_adult_individual_age_40'])
+
+        assert plans == [{'plan_id_standard_component': '11111CA0010001', 'premium_adult_individual_age_40': 300.0}]
+
+    def test_plan_id_lookup(self, store: PlanStore) -> None:
+        """Test that a plan is found in every county it is offered in."""
+        assert store.row_ids(plan_id_standard_component='11111CA0010001') == [0, 3]
+        assert store.row_ids(hios_issuer_id=33333) == [4]
+        assert store.lookup(plan_id_standard_component='missing') == []
+
+    def test_invalid_arguments(self, store: PlanStore) -> None:
+        """Test that half a county key and unknown columns are rejected."""
+        with pytest.raises(ValueError, match="together"):
+            store.lookup(state_code='CA')
+        with pytest.raises(ValueError, match="Unknown column"):
+            store.lookup(no_such_column=1)
+        with pytest.raises(ValueError, match="Unknown column"):
+            store.lookup(hios_issuer_id=11111, columns=['no_such_column'])
+
+
+class TestLoadAndRefresh:
+    """Test loading the store and swapping snapshots."""
+
+    def test_from_file(self, tmp_path) -> None:
+        """Test loading an NDJSON plan file."""
+        path = tmp_path / "plans.ndjson"
+        path.write_text(''.join(json.dumps(record) + '\n' for record in RECORDS))
+
+        store = PlanStore.from_file(str(path))
+
+        assert len(store) == 5
+        assert store.snapshot.source == str(path)
+
+    def test_refresh_swaps_snapshot(self) -> None:
+        """Test that a refresh replaces the snapshot and leaves the old one intact."""
+        loads = [RECORDS[:2], RECORDS]
+        store = PlanStore(lambda: loads.pop(0))
+        old = store.snapshot
+
+        store.refresh()
+
+        assert len(store) == 5
+        assert old.row_count == 2
+        assert store.snapshot is not old
+
+    def test_failed_refresh_keeps_snapshot(self) -> None:
+        """Test that the store keeps answering from the old snapshot when loading fails."""
+        loads: List[Any] = [RECORDS, OSError("unreadable")]
+
+        def load() -> List[Dict[str, Any]]:
+            result = loads.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        store = PlanStore(load)
+        with pytest.raises(OSError):
+            store.refresh()
+
+        assert len(store.county_plans('CA', 6001)) == 3
+
+    @patch('utils.plan_store.stream_table', return_value=iter(RECORDS))
+    def test_iter_supabase_plans_streams_table(self, mock_stream: Mock) -> None:
+        """Test reading the table with the keyset-paginated reader."""
+        client = Mock()
+
+        rows = list(iter_supabase_plans(client, ['state_code', 'fips_county_code'], page_size=2))
+
+        assert rows == RECORDS
+        mock_stream.assert_called_once_with('marketplace_plans', 'state_code,fips_county_code', page_size=2,
+                                            client=client)
+
+    @patch('utils.plan_store.stream_table')
+    @patch('utils.plan_store.get_client_pool')
+    def test_from_supabase_uses_pooled_client(self, mock_get_pool: Mock, mock_stream: Mock) -> None:
+        """Test that loading from Supabase checks a client out of the pool."""
+        client = Mock()
+        mock_stream.return_value = iter(RECORDS)
+        mock_get_pool.return_value.client.return_value.__enter__ = Mock(return_value=client)
+        mock_get_pool.return_value.client.return_value.__exit__ = Mock(return_value=None)
+
+        store = PlanStore.from_supabase()
+
+        assert len(store) == 5
+        assert mock_stream.call_args.kwargs['client'] is client
+        assert store.snapshot.source == 'supabase:marketplace_plans'
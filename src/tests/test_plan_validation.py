@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Tests for the bulk plan validation in plan_validation.py.
+
+This module tests that whole batches are checked against the
+MarketplacePlanJSON field types and that failures are reported with their
+row numbers.
+"""
+
+import os
+from typing import Any, Dict, List
+
+# Add the src directory to the path
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from pydantic import ValidationError
+
+from models.model import MarketplacePlanJSON
+from utils.plan_validation import validate_plan_batch
+
+from conftest import plan_record
+
+
+class TestValidatePlanBatch:
+    """Test the validate_plan_batch function."""
+
+    def test_valid_batch(self) -> None:
+        """Test that a valid batch reports nothing."""
+        assert validate_plan_batch([plan_record(plan_id_standard_component="P0"), plan_record(plan_id_standard_component="P1")]) == (set(), [])
+
+    def test_reports_every_failure_with_row_numbers(self) -> None:
+        """Test that all failing records and fields are reported, numbered from first_row."""
+        records: List[Dict[str, Any]] = [plan_record(plan_id_standard_component=f"P{i}") for i in range(4)]
+        records[1]["fips_county_code"] = "not a number"
+        records[3]["premium_child_age_0_14"] = None
+        del records[3]["state_code"]
+
+        invalid, messages = validate_plan_batch(records, first_row=101)
+
+        assert invalid == {1, 3}
+        assert len(messages) == 3
+        assert messages[0].startswith("Row 102: fips_county_code: ")
+        assert any(message.startswith("Row 104: state_code: Field required") for message in messages)
+        assert any(message.startswith("Row 104: premium_child_age_0_14: ") for message in messages)
+
+    def test_agrees_with_model(self) -> None:
+        """Test that the batch check rejects the same records as the model."""
+        records: List[Dict[str, Any]] = [plan_record(plan_id_standard_component="P0"), {**plan_record(plan_id_standard_component="P1"), "hios_issuer_id": "12.5"},
+                                         {**plan_record(plan_id_standard_component="P2"), "hios_issuer_id": "12345"}]
+        rejected_by_model = set()
+        for i, record in enumerate(records):
+            try:
+                MarketplacePlanJSON(**record)
+            except ValidationError:
+                rejected_by_model.add(i)
+
+        invalid, _ = validate_plan_batch(records)
+
+        assert invalid == rejected_by_model
+
+    def test_non_dict_record(self) -> None:
+        """Test that a record that is not an object is reported."""
+        invalid, messages = validate_plan_batch([plan_record(plan_id_standard_component="P0"), ["not", "a", "record"]])
+
+        assert invalid == {1}
+        assert messages[0].startswith("Row 2: record: ")
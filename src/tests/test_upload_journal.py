@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Tests for the upload checkpoint journal in upload_journal.py.
+
+This module tests recording committed and invalid batches, computing the
+resumable prefix, and refusing to resume against a changed input file.
+"""
+
+import os
+from pathlib import Path
+
+import pytest
+
+# Add the src directory to the path
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.upload_journal import (
+    UploadJournal,
+    business_key,
+    open_journal,
+    position_ranges,
+)
+
+
+def plan(position: int) -> dict:
+    """Build a record with a unique business key."""
+    return {"state_code": "CA", "fips_county_code": 6001, "plan_id_standard_component": f"P{position}"}
+
+
+@pytest.fixture
+def source(tmp_path: Path) -> Path:
+    """An input file for the journal to fingerprint."""
+    path = tmp_path / "plans.json"
+    path.write_text("[]", encoding='utf-8')
+    return path
+
+
+class TestPositionRanges:
+    """Test grouping positions into ranges."""
+
+    def test_groups_consecutive_positions(self) -> None:
+        """Test that gaps start a new range."""
+        assert position_ranges([5, 1, 2, 3, 7, 8]) == [(1, 3, 3), (5, 5, 1), (7, 8, 2)]
+        assert position_ranges([]) == []
+
+
+class TestUploadJournal:
+    """Test the SQLite checkpoint journal."""
+
+    def test_done_prefix_and_keys(self, tmp_path: Path, source: Path) -> None:
+        """Test that the prefix stops at the first position not yet done."""
+        journal_path = str(tmp_path / "journal.sqlite")
+        with UploadJournal(journal_path, str(source)) as journal:
+            journal.commit_batch([0, 1, 2], [plan(0), plan(1), plan(2)])
+            journal.mark_invalid([3])
+            journal.commit_batch([4, 6], [plan(4), plan(6)])
+
+        with UploadJournal(journal_path, str(source), resume=True) as journal:
+            assert journal.done_prefix() == 5
+            assert business_key(plan(6)) in journal.committed_keys()
+            assert business_key(plan(5)) not in journal.committed_keys()
+            assert journal.summary() == {"committed": 5, "invalid": 1}
+
+    def test_new_run_starts_over(self, tmp_path: Path, source: Path) -> None:
+        """Test that opening without resume clears earlier progress."""
+        journal_path = str(tmp_path / "journal.sqlite")
+        with UploadJournal(journal_path, str(source)) as journal:
+            journal.commit_batch([0], [plan(0)])
+
+        with UploadJournal(journal_path, str(source)) as journal:
+            assert journal.done_prefix() == 0
+            assert journal.committed_keys() == set()
+
+    def test_resume_refuses_changed_file(self, tmp_path: Path, source: Path) -> None:
+        """Test that resuming after the input file changed raises ValueError."""
+        journal_path = str(tmp_path / "journal.sqlite")
+        UploadJournal(journal_path, str(source)).close()
+        source.write_text('[{"changed": true}]', encoding='utf-8')
+
+        with pytest.raises(ValueError, match="changed"):
+            UploadJournal(journal_path, str(source), resume=True)
+
+    def test_open_journal_without_directory(self, tmp_path: Path, source: Path) -> None:
+        """Test that an unusable journal only disables resuming for a new run."""
+        journal_path = str(tmp_path / "missing" / "journal.sqlite")
+
+        assert open_journal(journal_path, str(source), resume=False) is None
+        with pytest.raises(ValueError):
+            open_journal(journal_path, str(source), resume=True)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
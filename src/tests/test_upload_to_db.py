@@ -6,10 +6,15 @@ This module contains tests for the Supabase upload functions in upload_to_db.py,
 testing data loading, validation, record preparation, and database uploads.
 """
 
+import gzip
 import json
 import os
+import threading
+import time
 import uuid
-from unittest.mock import Mock, patch, mock_open
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Set
+from unittest.mock import Mock, patch
 
 import pytest
 
@@ -17,43 +22,104 @@ import pytest
 import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
+from scripts import upload_to_db
 from scripts.upload_to_db import (
     load_json_data,
     validate_record,
     prepare_record_for_db,
     upload_records_to_supabase,
+    BatchSizer,
+    is_payload_error,
+    content_hash,
+    fetch_content_hashes,
+    insert_batch,
+    copy_record_stream,
+    serialize_record,
+    upload_record_stream,
+    refresh_state_county_lookup,
+    parse_args,
     main
 )
+from postgrest.exceptions import APIError
+from pydantic import TypeAdapter, ValidationError
 from models.model import MarketplacePlanJSON
+from utils.json_payload import encode_rows
+from utils.plan_files import write_parquet_records
+from utils.upload_journal import UploadJournal
+
+from conftest import plan_record
+
+
+class SharedClientPool:
+    """A stand-in for SupabaseClientPool that checks out the (patched) get_supabase_client client."""
+
+    size = 8
+
+    def __init__(self) -> None:
+        self.checkouts = 0
+
+    @contextmanager
+    def client(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        self.checkouts += 1
+        yield upload_to_db.get_supabase_client()
+
+
+@pytest.fixture(autouse=True)
+def client_pool(monkeypatch: pytest.MonkeyPatch) -> SharedClientPool:
+    """Check upload clients out of a stand-in pool, so tests can keep patching get_supabase_client."""
+    pool = SharedClientPool()
+    monkeypatch.setattr(upload_to_db, 'get_client_pool', lambda: pool)
+    return pool
 
 
 class TestLoadJsonData:
     """Test the load_json_data function."""
 
-    def test_load_json_data_success(self) -> None:
+    def test_load_json_data_success(self, tmp_path) -> None:
         """Test loading JSON data successfully."""
         test_data = [{"state_code": "CA", "county_name": "Alameda"}]
+        file_path = tmp_path / "plans.json"
+        file_path.write_text(json.dumps(test_data), encoding='utf-8')
 
-        with patch('builtins.open', mock_open(read_data=json.dumps(test_data))):
-            result = load_json_data("dummy/path.json")
+        result = load_json_data(str(file_path))
 
         assert len(result) == 1
         assert result[0]["state_code"] == "CA"
         assert result[0]["county_name"] == "Alameda"
 
-    def test_load_json_data_with_limit(self) -> None:
+    def test_load_json_data_with_limit(self, tmp_path) -> None:
         """Test loading JSON data with a limit."""
         test_data = [
             {"state_code": "CA", "county_name": "Alameda"},
             {"state_code": "NY", "county_name": "Kings"}
         ]
+        file_path = tmp_path / "plans.json"
+        file_path.write_text(json.dumps(test_data), encoding='utf-8')
 
-        with patch('builtins.open', mock_open(read_data=json.dumps(test_data))):
-            result = load_json_data("dummy/path.json", limit=1)
+        result = load_json_data(str(file_path), limit=1)
 
         assert len(result) == 1
         assert result[0]["state_code"] == "CA"
 
+    @pytest.mark.parametrize("indent", [None, 2])
+    def test_load_json_data_with_offset(self, tmp_path, indent) -> None:
+        """Test resuming from an offset in compact and indented JSON arrays."""
+        test_data = [{"state_code": "CA", "fips_county_code": i} for i in range(5)]
+        file_path = tmp_path / "plans.json"
+        file_path.write_text(json.dumps(test_data, indent=indent), encoding='utf-8')
+
+        result = load_json_data(str(file_path), limit=2, offset=3)
+
+        assert result == test_data[3:5]
+
+    def test_load_json_data_offset_skips_without_parsing(self, tmp_path) -> None:
+        """Test that records before the offset in create_json.py output are never parsed."""
+        file_path = tmp_path / "plans.json"
+        file_path.write_text('[\n  {\n    "broken": \n  },\n  {\n    "id": 2\n  }\n]', encoding='utf-8')
+
+        assert load_json_data(str(file_path), offset=1) == [{"id": 2}]
+        assert load_json_data(str(file_path)) == []
+
     def test_load_json_data_file_not_found(self) -> None:
         """Test handling of file not found error."""
         with patch('builtins.open', side_effect=FileNotFoundError()):
@@ -61,11 +127,12 @@ class TestLoadJsonData:
 
         assert result == []
 
-    def test_load_json_data_invalid_json(self) -> None:
+    def test_load_json_data_invalid_json(self, tmp_path) -> None:
         """Test handling of invalid JSON format."""
-        with patch('builtins.open', mock_open(read_data="invalid json")):
-            with patch('json.load', side_effect=json.JSONDecodeError("Invalid JSON", "", 0)):
-                result = load_json_data("dummy/path.json")
+        file_path = tmp_path / "plans.json"
+        file_path.write_text("invalid json", encoding='utf-8')
+
+        result = load_json_data(str(file_path))
 
         assert result == []
 
@@ -76,6 +143,35 @@ class TestLoadJsonData:
 
         assert result == []
 
+    def test_load_ndjson_data_gzip(self, tmp_path) -> None:
+        """Test loading a gzip-compressed NDJSON file."""
+        file_path = tmp_path / "plans.ndjson.gz"
+        with gzip.open(file_path, 'wt', encoding='utf-8') as f:
+            f.write('{"id": 1, "name": "Test 1"}\n{"id": 2, "name": "Test 2"}\n')
+
+        result = load_json_data(str(file_path))
+
+        assert result == [{"id": 1, "name": "Test 1"}, {"id": 2, "name": "Test 2"}]
+
+    def test_load_parquet_data_with_limit(self, tmp_path) -> None:
+        """Test loading the first records from a Parquet file."""
+        pytest.importorskip("pyarrow")
+        file_path = tmp_path / "plans.parquet"
+        write_parquet_records(({"state_code": "CA", "fips_county_code": i} for i in range(5)), str(file_path))
+
+        result = load_json_data(str(file_path), limit=2)
+
+        assert [(record["state_code"], record["fips_county_code"]) for record in result] == [("CA", 0), ("CA", 1)]
+
+    def test_load_ndjson_data_limit_stops_reading(self, tmp_path) -> None:
+        """Test that a limit on NDJSON input never parses the remaining lines."""
+        file_path = tmp_path / "plans.ndjson"
+        file_path.write_text('{"id": 1}\n{"id": 2}\nnot json\n', encoding='utf-8')
+
+        result = load_json_data(str(file_path), limit=2)
+
+        assert result == [{"id": 1}, {"id": 2}]
+
 
 class TestValidateRecord:
     """Test the validate_record function."""
@@ -315,53 +411,474 @@ class TestUploadRecordsToSupabase:
         assert result is False
 
 
-class TestMainFunction:
-    """Test the main function."""
+class FakeInsertClient:
+    """A thread-safe stand-in for the Supabase client that records concurrent inserts."""
+
+    def __init__(self, delays: Dict[int, float], fail_on: Optional[int] = None) -> None:
+        self.delays = delays
+        self.fail_on = fail_on
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.sent: List[int] = []
+        self.lock = threading.Lock()
+
+    def table(self, name: str) -> "FakeInsertClient":
+        return self
+
+    def insert(self, batch: List[Dict[str, Any]]) -> Mock:
+        first_id = batch[0]["id"]
+
+        def execute() -> Mock:
+            with self.lock:
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+                self.sent.append(first_id)
+            time.sleep(self.delays.get(first_id, 0.01))
+            with self.lock:
+                self.in_flight -= 1
+            if first_id == self.fail_on:
+                raise Exception("Upload error")
+            return Mock(data=batch)
+
+        return Mock(execute=execute)
+
+
+class TestConcurrentUpload:
+    """Test uploading several batches in flight at once."""
 
-    @patch('scripts.upload_to_db.prepare_record_for_db')
     @patch('scripts.upload_to_db.get_supabase_client')
-    @patch('scripts.upload_to_db.load_json_data')
-    @patch('scripts.upload_to_db.validate_record')
-    def test_main_prepare_record_error(self,
-                                    mock_validate: Mock,
-                                    mock_load: Mock,
-                                    mock_get_client: Mock,
-                                    mock_prepare: Mock) -> None:
-        """Test main function when there's an error preparing a record."""
-        # Setup mock for successful DB connection
+    def test_in_flight_limit(self, mock_get_client: Mock) -> None:
+        """Test that no more than max_in_flight batches are sent at once."""
+        client = FakeInsertClient(delays={})
+        mock_get_client.return_value = client
+        records = [{"id": i} for i in range(40)]
+
+        assert upload_records_to_supabase(records, batch_size=2, max_in_flight=3) is True
+        assert client.max_in_flight == 3
+        assert sorted(client.sent) == list(range(0, 40, 2))
+
+    @patch('scripts.upload_to_db.get_supabase_client')
+    def test_progress_is_reported_in_order(self, mock_get_client: Mock, capsys) -> None:
+        """Test that batches finishing out of order are still reported in order."""
+        # The first batch is the slowest, so later batches finish before it
+        mock_get_client.return_value = FakeInsertClient(delays={0: 0.1, 1: 0.05, 2: 0.0})
+        records = [{"id": i} for i in range(4)]
+
+        assert upload_records_to_supabase(records, batch_size=1, max_in_flight=4) is True
+
+        reported = [line.split()[2] for line in capsys.readouterr().out.splitlines() if "uploaded successfully" in line]
+        assert reported == ["1", "2", "3", "4"]
+
+    @patch('scripts.upload_to_db.get_supabase_client')
+    def test_no_batches_sent_after_failure(self, mock_get_client: Mock) -> None:
+        """Test that a failed batch stops new batches while in-flight ones finish."""
+        client = FakeInsertClient(delays={}, fail_on=2)
+        mock_get_client.return_value = client
+        records = [{"id": i} for i in range(20)]
+
+        assert upload_records_to_supabase(records, batch_size=1, max_in_flight=2) is False
+        assert max(client.sent) <= 4
+
+    def test_batches_in_flight_use_separate_clients(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test that each batch is sent on a client checked out of the pool, never on one in use."""
+        in_use: Set[int] = set()
+        overlaps: List[int] = []
+        used: Set[int] = set()
+        lock = threading.Lock()
+
+        class Pool:
+            size = 3
+
+            def __init__(self) -> None:
+                self.clients = [FakeInsertClient(delays={}) for _ in range(3)]
+
+            @contextmanager
+            def client(self, timeout: Optional[float] = None) -> Iterator[Any]:
+                with lock:
+                    free = [client for client in self.clients if id(client) not in in_use]
+                    if not free:
+                        overlaps.append(1)
+                    client = free[0] if free else self.clients[0]
+                    in_use.add(id(client))
+                    used.add(id(client))
+                try:
+                    yield client
+                finally:
+                    with lock:
+                        in_use.discard(id(client))
+
+        pool = Pool()
+        monkeypatch.setattr(upload_to_db, 'get_client_pool', lambda: pool)
+        records = [{"id": i} for i in range(30)]
+
+        assert upload_records_to_supabase(records, batch_size=2, max_in_flight=3) is True
+        assert not overlaps
+        assert len(used) > 1
+        assert sorted(sent for client in pool.clients for sent in client.sent) == list(range(0, 30, 2))
+
+    @patch('scripts.upload_to_db.SupabaseClientPool')
+    @patch('scripts.upload_to_db.get_supabase_client')
+    def test_larger_in_flight_limit_gets_own_pool(self, mock_get_client: Mock, mock_pool_class: Mock,
+                                                  client_pool: SharedClientPool) -> None:
+        """Test that an upload with more batches in flight than the shared pool has clients uses its own pool."""
+        mock_pool_class.return_value = client_pool
+        client_pool.close = Mock()
+        mock_get_client.return_value = FakeInsertClient(delays={})
+
+        assert upload_records_to_supabase([{"id": i} for i in range(4)], batch_size=1, max_in_flight=16) is True
+
+        mock_pool_class.assert_called_once_with(size=16)
+        assert client_pool.checkouts == 4
+        client_pool.close.assert_called_once()
+
+
+class TestAdaptiveBatchSize:
+    """Test adaptive batch sizing and splitting of oversized batches."""
+
+    def test_sizer_grows_while_throughput_improves(self) -> None:
+        """Test that the size keeps growing while throughput rises and reverses when it drops."""
+        sizer = BatchSizer(initial_size=100, min_size=10, max_size=1000)
+
+        sizer.record(100, 1.0)
+        assert sizer.next_size() == 150
+        sizer.record(150, 1.0)
+        assert sizer.next_size() == 225
+        sizer.record(225, 3.0)
+        assert sizer.next_size() == 150
+
+    def test_sizer_respects_bounds_and_payload_limit(self) -> None:
+        """Test that sizes stay within bounds and under the payload limit."""
+        sizer = BatchSizer(initial_size=900, min_size=10, max_size=1000, max_payload_bytes=50_000)
+        for _ in range(5):
+            sizer.record(sizer.size, 0.1)
+        assert sizer.size == 1000
+
+        sizer.estimate_row_bytes([{"plan": "x" * 480}] * 10)
+        assert 490 < sizer.row_bytes < 500
+        assert sizer.next_size() == int(50_000 // sizer.row_bytes)
+
+        sizer.payload_rejected(40)
+        assert sizer.next_size() == 20
+
+    @pytest.mark.parametrize("error,expected", [
+        (APIError({"message": "JSON could not be generated", "code": 413}), True),
+        (Exception("Request Entity Too Large"), True),
+        (APIError({"message": "duplicate key value violates unique constraint", "code": "23505"}), False),
+        (Exception("Upload error"), False),
+        (APIError({"message": "invalid JSON payload", "code": "PGRST102"}), False),
+        (Exception("Empty or invalid json payload"), False),
+    ])
+    def test_is_payload_error(self, error: Exception, expected: bool) -> None:
+        """Test recognizing payload size errors."""
+        assert is_payload_error(error) is expected
+
+    @patch('scripts.upload_to_db.get_supabase_client')
+    def test_oversized_batch_is_split(self, mock_get_client: Mock, capsys) -> None:
+        """Test that a batch rejected as too large is split until it fits."""
         mock_client = Mock()
         mock_get_client.return_value = mock_client
+        inserted: List[List[Dict[str, Any]]] = []
 
-        mock_result = Mock()
-        mock_result.data = [{"count": 0}]
-        mock_client.table().select().execute.return_value = mock_result
+        def insert(batch: List[Dict[str, Any]]) -> Mock:
+            def execute() -> Mock:
+                if len(batch) > 3:
+                    raise APIError({"message": "Payload Too Large", "code": 413})
+                inserted.append(batch)
+                return Mock(data=batch)
+            return Mock(execute=execute)
 
-        # Mock load_json_data to return test data
-        test_data = [{"state_code": "CA"}]
-        mock_load.return_value = test_data
+        mock_client.table.return_value.insert.side_effect = insert
+        records = [{"id": i} for i in range(10)]
+        sizer = BatchSizer(initial_size=10, min_size=1, max_size=10)
 
-        # Mock validate_record to return a validated record
-        mock_validated_record = Mock()
-        mock_validate.return_value = mock_validated_record
+        assert upload_records_to_supabase(records, max_in_flight=2, sizer=sizer) is True
 
-        # Mock prepare_record_for_db to raise an exception
-        mock_prepare.side_effect = Exception("Error preparing record")
+        assert sorted(record["id"] for batch in inserted for record in batch) == list(range(10))
+        assert all(len(batch) <= 3 for batch in inserted)
+        assert sizer.max_size <= 3
+        reported = [line for line in capsys.readouterr().out.splitlines() if "uploaded successfully" in line]
+        assert reported[0].split("records ")[1].startswith("1-")
 
-        # Run the main function
-        main()
 
-        # Verify prepare_record_for_db was called
-        mock_prepare.assert_called_once_with(mock_validated_record)
+class TestBatchPayload:
+    """Test the pre-serialized batch bodies sent by insert_batch."""
+
+    @patch('scripts.upload_to_db.time.sleep')
+    @patch('scripts.upload_to_db.execute_with_payload')
+    def test_transient_error_resends_same_payload(self, mock_execute: Mock, mock_sleep: Mock) -> None:
+        """Test that a batch turned away with 429 is sent again with the same bytes."""
+        mock_execute.side_effect = [APIError({"message": "Too Many Requests", "code": "429"}),
+                                    Mock(data=[{"id": 1}])]
+
+        outcome = insert_batch(Mock(), [{"id": 1}])
+
+        assert outcome["error"] is None
+        assert outcome["data"] == [{"id": 1}]
+        first, second = (call.args[1] for call in mock_execute.call_args_list)
+        assert first is second
+        assert json.loads(first) == [{"id": 1}]
+        assert outcome["payload_bytes"] == len(first)
+        assert outcome["cpu_seconds"] >= 0.0
+
+    @patch('scripts.upload_to_db.time.sleep')
+    @patch('scripts.upload_to_db.execute_with_payload')
+    def test_503_is_only_retried_for_upserts(self, mock_execute: Mock, mock_sleep: Mock) -> None:
+        """Test that a 503, which may follow a committed insert, is only resent for upserts."""
+        unavailable = APIError({"message": "Service Unavailable", "code": "503"})
+        mock_execute.side_effect = [unavailable, Mock(data=[{"id": 1}])]
+
+        outcome = insert_batch(Mock(), [{"id": 1}])
+
+        assert outcome["error"] is unavailable
+        assert mock_execute.call_count == 1
+
+        mock_execute.reset_mock()
+        mock_execute.side_effect = [unavailable, Mock(data=[{"id": 1}])]
+
+        outcome = insert_batch(Mock(), [{"id": 1}], upsert=True)
+
+        assert outcome["error"] is None
+        assert mock_execute.call_count == 2
+
+    @patch('scripts.upload_to_db.execute_with_payload')
+    def test_other_errors_are_not_retried(self, mock_execute: Mock) -> None:
+        """Test that errors PostgREST may have acted on are returned without resending."""
+        mock_execute.side_effect = APIError({"message": "duplicate key", "code": "23505"})
+
+        outcome = insert_batch(Mock(), [{"id": 1}])
+
+        assert isinstance(outcome["error"], APIError)
+        assert mock_execute.call_count == 1
+
+    @patch('scripts.upload_to_db.encode_rows', wraps=encode_rows)
+    @patch('scripts.upload_to_db.get_supabase_client')
+    def test_split_batch_reuses_encoded_rows(self, mock_get_client: Mock, mock_encode: Mock, capsys) -> None:
+        """Test that the halves of a split batch are sent without encoding their rows again."""
+        mock_get_client.return_value = Mock()
+        payloads: List[bytes] = []
+
+        def execute(request: Mock, payload: bytes) -> Mock:
+            rows = json.loads(payload)
+            if len(rows) > 2:
+                raise APIError({"message": "Payload Too Large", "code": 413})
+            payloads.append(payload)
+            return Mock(data=rows)
+
+        with patch('scripts.upload_to_db.execute_with_payload', side_effect=execute):
+            assert upload_records_to_supabase([{"id": i} for i in range(4)], batch_size=4) is True
+
+        assert mock_encode.call_count == 1
+        assert [json.loads(payload) for payload in payloads] == [[{"id": 0}, {"id": 1}], [{"id": 2}, {"id": 3}]]
+        assert "ms CPU" in capsys.readouterr().out
+
+
+class TestResumableUpload:
+    """Test resuming an upload from the checkpoint journal."""
+
+    @patch('scripts.upload_to_db.serialize_record', side_effect=lambda record, upsert: dict(record)
+           if record["valid"] else TypeAdapter(int).validate_python("invalid"))
+    @patch('scripts.upload_to_db.get_supabase_client')
+    def test_resume_sends_only_unfinished_records(self, mock_get_client: Mock, mock_validate: Mock,
+                                                  tmp_path) -> None:
+        """Test that a resumed run skips committed and invalid records without validating them."""
+        records = [{"state_code": "CA", "fips_county_code": 6001, "plan_id_standard_component": f"P{i}",
+                    "valid": i != 1} for i in range(10)]
+        input_file = tmp_path / "plans.json"
+        input_file.write_text(json.dumps(records), encoding='utf-8')
+        sent: List[str] = []
+        fail_on = {"P6"}
+
+        def insert(batch: List[Dict[str, Any]]) -> Mock:
+            def execute() -> Mock:
+                if any(record["plan_id_standard_component"] in fail_on for record in batch):
+                    raise Exception("Upload error")
+                sent.extend(record["plan_id_standard_component"] for record in batch)
+                return Mock(data=batch)
+            return Mock(execute=execute)
+
+        mock_get_client.return_value.table.return_value.insert.side_effect = insert
+        argv = ["--input", str(input_file), "--no-adaptive", "--batch-size", "2", "--max-in-flight", "1"]
+
+        main(argv)
+        assert sent == ["P0", "P2", "P3", "P4"]
+        assert (tmp_path / "plans.json.journal.sqlite").exists()
+
+        fail_on.clear()
+        sent.clear()
+        mock_validate.reset_mock()
+        main(argv + ["--resume"])
+
+        assert sent == ["P5", "P6", "P7", "P8", "P9"]
+        assert mock_validate.call_count == 5
+
+    def test_resume_refuses_changed_input(self, tmp_path, capsys) -> None:
+        """Test that --resume stops when the input file changed since the journal was written."""
+        input_file = tmp_path / "plans.json"
+        input_file.write_text("[]", encoding='utf-8')
+        journal_path = tmp_path / "journal.sqlite"
+        UploadJournal(str(journal_path), str(input_file)).close()
+        input_file.write_text("[{}]", encoding='utf-8')
+
+        with patch('scripts.upload_to_db.get_supabase_client'), \
+             patch('scripts.upload_to_db.load_json_data') as mock_load:
+            main(["--input", str(input_file), "--journal", str(journal_path), "--resume"])
+
+        mock_load.assert_not_called()
+        assert "run without --resume" in capsys.readouterr().out
+
+
+class TestUpsertMode:
+    """Test the --upsert mode that only sends changed rows."""
+
+    def test_content_hash_ignores_id_and_key_order(self) -> None:
+        """Test that the content hash depends only on the record values."""
+        record = {"state_code": "CA", "premium": 300.5, "id": "a"}
+        reordered = {"id": "b", "premium": 300.5, "state_code": "CA"}
+
+        assert content_hash(record) == content_hash(reordered)
+        assert content_hash(record) != content_hash({**record, "premium": 301.0})
+        assert len(content_hash(record)) == 32
+
+    def test_insert_batch_upserts_on_business_key(self) -> None:
+        """Test that upsert batches conflict on the business key."""
+        client = Mock()
+        client.table.return_value.upsert.return_value.execute.return_value = Mock(data=[{}])
+
+        outcome = insert_batch(client, [{}], upsert=True)
+
+        assert outcome["error"] is None
+        client.table.return_value.upsert.assert_called_once_with(
+            [{}], on_conflict="state_code,fips_county_code,plan_id_standard_component")
+        client.table.return_value.insert.assert_not_called()
+
+    @patch('scripts.upload_to_db.stream_table')
+    def test_fetch_content_hashes_pages(self, mock_stream: Mock) -> None:
+        """Test that existing hashes are streamed in business key order."""
+        mock_stream.return_value = iter([{"state_code": "CA", "fips_county_code": 1,
+                                          "plan_id_standard_component": f"P{i}", "content_hash": f"h{i}"}
+                                         for i in range(3)])
+        client = Mock()
+
+        hashes = fetch_content_hashes(client, page_size=2)
+
+        assert hashes == {("CA", 1, "P0"): "h0", ("CA", 1, "P1"): "h1", ("CA", 1, "P2"): "h2"}
+        mock_stream.assert_called_once_with(
+            'marketplace_plans', 'state_code,fips_county_code,plan_id_standard_component,content_hash',
+            key=("state_code", "fips_county_code", "plan_id_standard_component"), page_size=2, client=client)
+
+    @patch('scripts.upload_to_db.fetch_content_hashes')
+    @patch('scripts.upload_to_db.get_supabase_client')
+    def test_main_sends_only_changed_rows(self, mock_get_client: Mock, mock_fetch: Mock, tmp_path) -> None:
+        """Test that unchanged rows are skipped and the rest are upserted."""
+        records = [plan_record(300.0 + i, plan_id_standard_component=f"P{i}") for i in range(4)]
+        input_file = tmp_path / "plans.json"
+        input_file.write_text(json.dumps(records), encoding='utf-8')
+        prepared = [serialize_record(record, upsert=True) for record in records]
+        mock_fetch.return_value = {
+            ("CA", 6001, "P0"): prepared[0]["content_hash"],
+            ("CA", 6001, "P1"): "stale",
+        }
+        table = mock_get_client.return_value.table.return_value
+        table.upsert.return_value.execute.side_effect = lambda: Mock(data=table.upsert.call_args.args[0])
+
+        main(["--input", str(input_file), "--upsert", "--no-adaptive", "--max-in-flight", "1"])
+
+        sent = [row["plan_id_standard_component"] for call in table.upsert.call_args_list for row in call.args[0]]
+        assert sent == ["P1", "P2", "P3"]
+        table.insert.assert_not_called()
+
+
+class TestCopyUpload:
+    """Test loading with PostgreSQL COPY instead of PostgREST."""
+
+    @patch('scripts.upload_to_db.call_function')
+    @patch('scripts.upload_to_db.copy_records_to_postgres')
+    @patch('scripts.upload_to_db.get_supabase_client')
+    def test_main_copies_records(self, mock_get_client: Mock, mock_copy: Mock, mock_call: Mock, tmp_path) -> None:
+        """Test that --copy streams every prepared record into one COPY and journals them."""
+        input_file = tmp_path / "plans.json"
+        input_file.write_text(json.dumps([plan_record(plan_id_standard_component=f"P{i}") for i in range(3)]), encoding='utf-8')
+        copied: List[Dict[str, Any]] = []
+        mock_copy.side_effect = lambda records, database_url, copy_format: len(copied.extend(records) or copied)
+
+        main(["--input", str(input_file), "--copy", "--copy-format", "csv",
+              "--database-url", "postgresql://localhost/test"])
+
+        _, database_url, copy_format = mock_copy.call_args.args
+        assert [record["plan_id_standard_component"] for record in copied] == ["P0", "P1", "P2"]
+        assert (database_url, copy_format) == ("postgresql://localhost/test", "csv")
+        mock_get_client.assert_not_called()
+        mock_call.assert_called_once_with("postgresql://localhost/test", "refresh_state_county_lookup")
+        with UploadJournal(str(tmp_path / "plans.json.journal.sqlite"), str(input_file), resume=True) as journal:
+            assert journal.done_prefix() == 3
+
+    @patch('scripts.upload_to_db.copy_records_to_postgres', side_effect=Exception("connection refused"))
+    def test_copy_failure_is_reported(self, mock_copy: Mock, capsys) -> None:
+        """Test that a failed COPY returns False."""
+        assert copy_record_stream(enumerate([{"id": 1}]), "postgresql://localhost/test") is False
+        assert "connection refused" in capsys.readouterr().out
+
+    def test_copy_rejects_upsert(self) -> None:
+        """Test that --copy cannot be combined with --upsert."""
+        with pytest.raises(SystemExit):
+            parse_args(["--copy", "--upsert"])
+
+
+class TestRefreshLookup:
+    """Test refreshing the state_county_lookup view after a load."""
+
+    @patch('scripts.upload_to_db.get_supabase_client')
+    def test_refresh_through_rpc(self, mock_get_client: Mock) -> None:
+        """Test that a PostgREST load refreshes the view through RPC."""
+        assert refresh_state_county_lookup() is True
+
+        mock_get_client.return_value.rpc.assert_called_once_with('refresh_state_county_lookup')
 
     @patch('scripts.upload_to_db.get_supabase_client')
-    @patch('scripts.upload_to_db.load_json_data')
-    @patch('scripts.upload_to_db.validate_record')
-    @patch('scripts.upload_to_db.prepare_record_for_db')
-    @patch('scripts.upload_to_db.upload_records_to_supabase')
+    def test_refresh_failure_is_a_warning(self, mock_get_client: Mock, capsys) -> None:
+        """Test that a failed refresh is reported without raising."""
+        mock_get_client.return_value.rpc.return_value.execute.side_effect = Exception("permission denied")
+
+        assert refresh_state_county_lookup() is False
+        assert "permission denied" in capsys.readouterr().out
+
+    @patch('scripts.upload_to_db.refresh_state_county_lookup')
+    @patch('scripts.upload_to_db.copy_records_to_postgres', side_effect=lambda records, *args: len(list(records)))
+    def test_no_refresh_lookup(self, mock_copy: Mock, mock_refresh: Mock, tmp_path) -> None:
+        """Test that --no-refresh-lookup leaves the view alone."""
+        input_file = tmp_path / "plans.json"
+        input_file.write_text(json.dumps([plan_record(plan_id_standard_component="P0")]), encoding='utf-8')
+
+        main(["--input", str(input_file), "--copy", "--no-refresh-lookup"])
+
+        mock_copy.assert_called_once()
+        mock_refresh.assert_not_called()
+
+    @patch('scripts.upload_to_db.invalidate_cached_queries')
+    @patch('scripts.upload_to_db.refresh_state_county_lookup')
+    @patch('scripts.upload_to_db.copy_records_to_postgres', side_effect=lambda records, *args: len(list(records)))
+    def test_load_invalidates_cached_queries(self, mock_copy: Mock, mock_refresh: Mock, mock_invalidate: Mock,
+                                             tmp_path) -> None:
+        """Test that cached results for the loaded tables are dropped after the view is refreshed."""
+        input_file = tmp_path / "plans.json"
+        input_file.write_text(json.dumps([plan_record(plan_id_standard_component="P0")]), encoding='utf-8')
+
+        main(["--input", str(input_file), "--copy"])
+
+        mock_refresh.assert_called_once()
+        mock_invalidate.assert_called_once_with(('marketplace_plans', 'state_county_lookup', 'slcsp_benchmarks'))
+
+
+class TestMainFunction:
+    """Test the main function."""
+
+    @patch('scripts.upload_to_db.get_supabase_client')
+    @patch('scripts.upload_to_db.iter_json_data')
+    @patch('scripts.upload_to_db.serialize_record')
+    @patch('scripts.upload_to_db.upload_record_stream')
     def test_main_success_path(self,
                             mock_upload: Mock,
-                            mock_prepare: Mock,
-                            mock_validate: Mock,
+                            mock_serialize: Mock,
                             mock_load: Mock,
                             mock_get_client: Mock) -> None:
         """Test the main function's happy path."""
@@ -373,30 +890,28 @@ class TestMainFunction:
         mock_result.data = [{"count": 0}]
         mock_client.table().select().execute.return_value = mock_result
 
-        # Mock load_json_data to return test data
+        # Mock iter_json_data to stream test data
         test_data = [{"state_code": "CA"}, {"state_code": "NY"}]
-        mock_load.return_value = test_data
-
-        # Mock validate_record to return a validated record
-        mock_validated_record = Mock()
-        mock_validate.return_value = mock_validated_record
+        mock_load.return_value = iter(test_data)
 
-        # Mock prepare_record_for_db to return a prepared record
-        mock_prepared_record = {"id": "test-uuid", "state_code": "CA"}
-        mock_prepare.return_value = mock_prepared_record
+        # Mock serialize_record to return a prepared record
+        mock_serialize.side_effect = lambda record, upsert: {"id": "test-uuid", **record}
 
-        # Mock upload_records_to_supabase to return success
-        mock_upload.return_value = True
+        # Mock upload_record_stream to consume the stream and return success
+        uploaded: List[Any] = []
+        mock_upload.side_effect = lambda stream, *args, **kwargs: uploaded.extend(stream) or True
 
         # Run the main function
         main()
 
-        # Verify the expected flow
-        mock_get_client.assert_called_once()
+        # Verify the expected flow: the client is used for the connection test and the lookup refresh
+        assert mock_get_client.call_count == 2
+        mock_client.rpc.assert_any_call('refresh_state_county_lookup')
         mock_load.assert_called_once()
-        assert mock_validate.call_count == 2  # Called for each record
-        assert mock_prepare.call_count == 2  # Called for each validated record
+        assert mock_serialize.call_count == 2  # Called for each record
         mock_upload.assert_called_once()
+        assert uploaded == [(0, {"id": "test-uuid", "state_code": "CA"}),
+                            (1, {"id": "test-uuid", "state_code": "NY"})]
 
     @patch('scripts.upload_to_db.get_supabase_client')
     def test_main_db_connection_failure(self, mock_get_client: Mock) -> None:
@@ -410,8 +925,9 @@ class TestMainFunction:
         # No need for assertions as we're just testing it doesn't raise exceptions
 
     @patch('scripts.upload_to_db.get_supabase_client')
-    @patch('scripts.upload_to_db.load_json_data')
-    def test_main_no_json_data(self, mock_load: Mock, mock_get_client: Mock) -> None:
+    @patch('scripts.upload_to_db.iter_json_data')
+    @patch('scripts.upload_to_db.upload_record_stream')
+    def test_main_no_json_data(self, mock_upload: Mock, mock_load: Mock, mock_get_client: Mock, capsys) -> None:
         """Test main function when no JSON data is loaded."""
         # Setup mock for successful DB connection
         mock_client = Mock()
@@ -421,19 +937,22 @@ class TestMainFunction:
         mock_result.data = [{"count": 0}]
         mock_client.table().select().execute.return_value = mock_result
 
-        # Mock load_json_data to return empty list
-        mock_load.return_value = []
+        # Mock iter_json_data to stream nothing
+        mock_load.return_value = iter([])
 
         # Run the main function
         main()
 
-        # Verify load_json_data was called but not other functions
+        # Verify iter_json_data was called but nothing was uploaded
         mock_load.assert_called_once()
+        mock_upload.assert_not_called()
+        assert "No JSON data loaded" in capsys.readouterr().out
 
     @patch('scripts.upload_to_db.get_supabase_client')
-    @patch('scripts.upload_to_db.load_json_data')
-    @patch('scripts.upload_to_db.validate_record')
-    def test_main_validation_failure(self, mock_validate: Mock, mock_load: Mock, mock_get_client: Mock) -> None:
+    @patch('scripts.upload_to_db.iter_json_data')
+    @patch('scripts.upload_to_db.upload_record_stream')
+    def test_main_validation_failure(self, mock_upload: Mock, mock_load: Mock, mock_get_client: Mock,
+                                     capsys) -> None:
         """Test main function when all records fail validation."""
         # Setup mock for successful DB connection
         mock_client = Mock()
@@ -443,30 +962,29 @@ class TestMainFunction:
         mock_result.data = [{"count": 0}]
         mock_client.table().select().execute.return_value = mock_result
 
-        # Mock load_json_data to return test data
-        test_data = [{"state_code": "CA"}, {"state_code": "NY"}]
-        mock_load.return_value = test_data
-
-        # Mock validate_record to return None (validation failure)
-        mock_validate.return_value = None
+        # Mock iter_json_data to stream records missing most required fields
+        mock_load.return_value = iter([{"state_code": "CA"}, {"state_code": "NY"}])
 
         # Run the main function
         main()
 
-        # Verify validate_record was called but later functions weren't
-        assert mock_validate.call_count == 2
+        # Verify both records were reported and nothing was uploaded
+        out = capsys.readouterr().out
+        assert "Record 1 failed validation" in out
+        assert "Record 2 failed validation" in out
+        assert "No valid records to upload" in out
+        mock_upload.assert_not_called()
 
     @patch('scripts.upload_to_db.get_supabase_client')
-    @patch('scripts.upload_to_db.load_json_data')
-    @patch('scripts.upload_to_db.validate_record')
-    @patch('scripts.upload_to_db.prepare_record_for_db')
-    @patch('scripts.upload_to_db.upload_records_to_supabase')
+    @patch('scripts.upload_to_db.iter_json_data')
+    @patch('scripts.upload_to_db.serialize_record')
+    @patch('scripts.upload_to_db.upload_record_stream')
     def test_main_upload_failure(self,
                               mock_upload: Mock,
-                              mock_prepare: Mock,
-                              mock_validate: Mock,
+                              mock_serialize: Mock,
                               mock_load: Mock,
-                              mock_get_client: Mock) -> None:
+                              mock_get_client: Mock,
+                              capsys) -> None:
         """Test main function when upload fails."""
         # Setup mock for successful DB connection
         mock_client = Mock()
@@ -476,19 +994,13 @@ class TestMainFunction:
         mock_result.data = [{"count": 0}]
         mock_client.table().select().execute.return_value = mock_result
 
-        # Mock load_json_data to return test data
-        test_data = [{"state_code": "CA"}]
-        mock_load.return_value = test_data
+        # Mock iter_json_data to stream test data
+        mock_load.return_value = iter([{"state_code": "CA"}])
 
-        # Mock validate_record to return a validated record
-        mock_validated_record = Mock()
-        mock_validate.return_value = mock_validated_record
+        # Mock serialize_record to return a prepared record
+        mock_serialize.return_value = {"id": "test-uuid", "state_code": "CA"}
 
-        # Mock prepare_record_for_db to return a prepared record
-        mock_prepared_record = {"id": "test-uuid", "state_code": "CA"}
-        mock_prepare.return_value = mock_prepared_record
-
-        # Mock upload_records_to_supabase to return failure
+        # Mock upload_record_stream to return failure
         mock_upload.return_value = False
 
         # Run the main function
@@ -496,6 +1008,60 @@ class TestMainFunction:
 
         # Verify the expected flow
         mock_upload.assert_called_once()
+        assert "Upload failed" in capsys.readouterr().out
+
+
+class TestSerializeRecord:
+    """Test the single-pass serialize_record function."""
+
+    def test_matches_validate_and_prepare(self) -> None:
+        """Test that serializing gives the same record as validating and preparing."""
+        record = {**plan_record(plan_id_standard_component="P0"), "hios_issuer_id": "12345", "premium_child_age_0_14": 300, "extra": 1}
+
+        serialized = serialize_record(record)
+        prepared = prepare_record_for_db(validate_record(record))
+
+        assert serialized.pop("id") != prepared.pop("id")
+        assert serialized == prepared
+        assert list(serialized) == list(prepared)
+
+    def test_upsert_adds_content_hash(self) -> None:
+        """Test that upsert records get a content hash instead of an id."""
+        serialized = serialize_record(plan_record(plan_id_standard_component="P0"), upsert=True)
+
+        assert "id" not in serialized
+        assert serialized["content_hash"] == content_hash(serialized)
+        assert serialized == {**MarketplacePlanJSON(**plan_record(plan_id_standard_component="P0")).model_dump(),
+                              "content_hash": serialized["content_hash"]}
+
+    def test_invalid_record_raises(self) -> None:
+        """Test that an invalid record raises ValidationError."""
+        with pytest.raises(ValidationError):
+            serialize_record({"state_code": "CA"})
+
+
+class TestUploadRecordStream:
+    """Test uploading a stream of records without materializing it."""
+
+    @patch('scripts.upload_to_db.get_supabase_client')
+    def test_stream_is_read_one_batch_at_a_time(self, mock_get_client: Mock) -> None:
+        """Test that only the batches in flight have been pulled from the stream."""
+        pulled: List[int] = []
+        sent_when_pulled: List[int] = []
+        client = FakeInsertClient(delays={})
+        mock_get_client.return_value = client
+
+        def stream() -> Any:
+            for i in range(10):
+                pulled.append(i)
+                sent_when_pulled.append(len(client.sent))
+                yield i, {"id": i}
+
+        assert upload_record_stream(stream(), batch_size=2, max_in_flight=1) is True
+
+        assert sorted(client.sent) == [0, 2, 4, 6, 8]
+        # Record 8 is only read after the first three batches were sent
+        assert sent_when_pulled[8] >= 3
 
 
 if __name__ == "__main__":
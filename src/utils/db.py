@@ -1,11 +1,118 @@
 import os
-from typing import Optional
-from supabase import create_client, Client
+import asyncio
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from typing import (Any, AsyncIterator, Callable, Dict, Hashable, Iterator, List, Optional, Sequence, Tuple, Type,
+                    TypeVar, Union)
+import httpx
+from pydantic import BaseModel
+from postgrest import SyncPostgrestClient
+from supabase import Client
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Keep-alive connections each client keeps open (concurrent requests on one client share them)
+DEFAULT_MAX_CONNECTIONS = 10
+# Idle connections are closed after this many seconds
+DEFAULT_KEEPALIVE_EXPIRY = 60.0
+# Matches supabase-py's PostgREST timeout
+DEFAULT_TIMEOUT = 120.0
+# Clients handed out by a SupabaseClientPool
+DEFAULT_POOL_SIZE = 4
+
+# Query cache limits: cached results expire after an hour, and the least recently
+# used results are evicted beyond this many queries or rows in total
+DEFAULT_CACHE_TTL = 3600.0
+DEFAULT_CACHE_ENTRIES = 1024
+DEFAULT_CACHE_ROWS = 200_000
+
+# Keys stream_table() can page by: the primary key, or the business key of marketplace_plans
+ID_KEY = ('id',)
+BUSINESS_KEY = ('state_code', 'fips_county_code', 'plan_id_standard_component')
+# Supabase's default cap on the rows one request returns
+DEFAULT_STREAM_PAGE_SIZE = 1000
+# Pages each parallel key range may fetch ahead of the consumer
+STREAM_PAGES_AHEAD = 2
+
+ModelT = TypeVar('ModelT', bound=BaseModel)
+
+
+def supabase_credentials() -> Tuple[str, str]:
+    """
+    Read the Supabase URL and key from the environment.
+
+    Raises:
+        ValueError: If either is missing
+    """
+    url = os.getenv('SUPABASE_URL')
+    key = os.getenv('SUPABASE_KEY')
+
+    if not url or not key:
+        raise ValueError(
+            "Missing Supabase credentials. Please set SUPABASE_URL and SUPABASE_ANON_KEY "
+            "environment variables in your .env file or system environment."
+        )
+    return url, key
+
+
+def create_http_client(max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                       keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+                       timeout: float = DEFAULT_TIMEOUT, http2: bool = True) -> httpx.Client:
+    """
+    Create the httpx client a Supabase client sends its requests through.
+
+    Up to max_connections connections are kept alive between requests, so
+    only the first requests pay for connection setup. HTTP/2 is used when
+    the server offers it over TLS (plain http:// stays on HTTP/1.1).
+    """
+    return httpx.Client(
+        http2=http2,
+        timeout=timeout,
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections,
+                            keepalive_expiry=keepalive_expiry),
+    )
+
+
+class KeepAliveClient(Client):
+    """
+    A Supabase client whose PostgREST requests go through a keep-alive httpx client.
+
+    The httpx client is given to the PostgREST client only: postgrest-py,
+    storage3 and supafunc each set base_url on the client they are handed,
+    so sharing one would send table requests to the storage or functions
+    URL. Auth, storage and functions keep their own httpx clients.
+    """
+
+    postgrest_http_client: Optional[httpx.Client] = None
+
+    @property
+    def postgrest(self) -> SyncPostgrestClient:
+        # Recreated, like the default one, after the auth token changes
+        if self._postgrest is None and self.postgrest_http_client is not None:
+            self._postgrest = SyncPostgrestClient(
+                str(self.rest_url),
+                headers=self.options.headers,
+                schema=self.options.schema,
+                http_client=self.postgrest_http_client,
+            )
+        return super().postgrest
+
+
+def create_keepalive_client(url: str, key: str, http_client: Optional[httpx.Client] = None) -> Client:
+    """Create a Supabase client whose PostgREST requests reuse the connections of one keep-alive httpx client."""
+    client = KeepAliveClient.create(url, key)
+    client.postgrest_http_client = http_client or create_http_client()
+    return client
+
+
 class SupabaseConnection:
     """Supabase database connection manager."""
 
@@ -25,16 +132,8 @@ class SupabaseConnection:
 
     def _create_client(self) -> Client:
         """Create and return a Supabase client."""
-        url = os.getenv('SUPABASE_URL')
-        key = os.getenv('SUPABASE_KEY')
-
-        if not url or not key:
-            raise ValueError(
-                "Missing Supabase credentials. Please set SUPABASE_URL and SUPABASE_ANON_KEY "
-                "environment variables in your .env file or system environment."
-            )
-
-        return create_client(url, key)
+        url, key = supabase_credentials()
+        return create_keepalive_client(url, key)
 
     @property
     def client(self) -> Client:
@@ -43,8 +142,118 @@ class SupabaseConnection:
             self._client = self._create_client()
         return self._client
 
-# Singleton instance
-_supabase_connection = SupabaseConnection()
+
+class SupabaseClientPool:
+    """
+    A fixed number of Supabase clients, each with its own keep-alive connections.
+
+    Callers check a client out for as long as they need it, so parallel
+    uploaders and query callers do not share one client's connections, and a
+    client returned to the pool keeps its connections open for the next
+    caller. Clients are created on first use, up to size. Checking out is
+    thread-safe; asyncio code uses async_client(), which waits for a free
+    client without blocking the event loop.
+    """
+
+    def __init__(self, size: int = DEFAULT_POOL_SIZE, max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                 keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY, timeout: float = DEFAULT_TIMEOUT,
+                 http2: bool = True):
+        """Initialize an empty pool; no client is created until one is checked out."""
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.size = size
+        self.max_connections = max_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self.http2 = http2
+        # Most recently returned first, so warm connections are reused
+        self._idle: "queue.LifoQueue[Client]" = queue.LifoQueue()
+        self._http_clients: List[httpx.Client] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _create_client(self) -> Optional[Client]:
+        """Create a client if the pool is not full yet."""
+        with self._lock:
+            if self._closed:
+                raise ValueError("The client pool is closed")
+            if len(self._http_clients) >= self.size:
+                return None
+            url, key = supabase_credentials()
+            http_client = create_http_client(self.max_connections, self.keepalive_expiry, self.timeout, self.http2)
+            self._http_clients.append(http_client)
+        return create_keepalive_client(url, key, http_client)
+
+    def acquire(self, timeout: Optional[float] = None) -> Client:
+        """
+        Check out a client, waiting for one to be released if all are in use.
+
+        Raises:
+            TimeoutError: If no client became free within timeout seconds
+            ValueError: If the pool is closed or credentials are missing
+        """
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        client = self._create_client()
+        if client is not None:
+            return client
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No Supabase client became free within {timeout}s") from None
+
+    def release(self, client: Client) -> None:
+        """Return a checked-out client to the pool."""
+        self._idle.put(client)
+
+    @contextmanager
+    def client(self, timeout: Optional[float] = None) -> Iterator[Client]:
+        """Check out a client for the duration of a with block."""
+        client = self.acquire(timeout)
+        try:
+            yield client
+        finally:
+            self.release(client)
+
+    @asynccontextmanager
+    async def async_client(self, timeout: Optional[float] = None) -> AsyncIterator[Client]:
+        """
+        Check out a client from asyncio code.
+
+        The client is synchronous; run its queries with asyncio.to_thread so
+        they do not block the event loop either.
+        """
+        try:
+            client = self._idle.get_nowait()
+        except queue.Empty:
+            client = await asyncio.to_thread(self.acquire, timeout)
+        try:
+            yield client
+        finally:
+            self.release(client)
+
+    def close(self) -> None:
+        """Close every client's connections; the pool cannot be used afterwards."""
+        with self._lock:
+            self._closed = True
+            http_clients, self._http_clients = self._http_clients, []
+        for http_client in http_clients:
+            http_client.close()
+
+    def __enter__(self) -> 'SupabaseClientPool':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+# Created on first use, so importing this module needs no credentials
+_supabase_connection: Optional[SupabaseConnection] = None
+_client_pool: Optional[SupabaseClientPool] = None
+_init_lock = threading.Lock()
+
 
 def get_supabase_client() -> Client:
     """
@@ -61,8 +270,33 @@ def get_supabase_client() -> Client:
         >>> supabase = get_supabase_client()
         >>> result = supabase.table('your_table').select('*').execute()
     """
+    global _supabase_connection
+    if _supabase_connection is None:
+        with _init_lock:
+            if _supabase_connection is None:
+                _supabase_connection = SupabaseConnection()
     return _supabase_connection.client
 
+
+def get_client_pool() -> SupabaseClientPool:
+    """
+    Get the process-wide Supabase client pool.
+
+    Returns:
+        SupabaseClientPool: Pool of DEFAULT_POOL_SIZE clients, created on first call
+
+    Example:
+        >>> from src.utils.db import get_client_pool
+        >>> with get_client_pool().client() as supabase:
+        ...     result = supabase.table('your_table').select('*').execute()
+    """
+    global _client_pool
+    if _client_pool is None:
+        with _init_lock:
+            if _client_pool is None:
+                _client_pool = SupabaseClientPool()
+    return _client_pool
+
 def test_connection() -> bool:
     """
     Test the Supabase connection.
@@ -96,3 +330,378 @@ def get_table(table_name: str):
     """
     client = get_supabase_client()
     return client.table(table_name)
+
+
+class QueryCache:
+    """
+    Thread-safe LRU cache of query results with a time-to-live.
+
+    Entries are keyed by query_key() tuples, whose first element is the table
+    name, so a table's entries can be invalidated together. The cache holds
+    at most max_entries results and max_rows rows in total; the least
+    recently used results are evicted first. Counters for hits, misses,
+    evictions, expirations and invalidations are available from stats().
+    """
+
+    def __init__(self, ttl: float = DEFAULT_CACHE_TTL, max_entries: int = DEFAULT_CACHE_ENTRIES,
+                 max_rows: int = DEFAULT_CACHE_ROWS, clock: Callable[[], float] = time.monotonic):
+        """Initialize an empty cache."""
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self._clock = clock
+        # key -> (expires at, rows, result)
+        self._entries: "OrderedDict[Tuple[Any, ...], Tuple[float, int, Any]]" = OrderedDict()
+        self._rows = 0
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+    def get(self, key: Tuple[Any, ...]) -> Optional[Any]:
+        """Return the cached result for key, or None if it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= self._clock():
+                self._remove(key)
+                self._counters['expirations'] += 1
+                entry = None
+            if entry is None:
+                self._counters['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters['hits'] += 1
+            return entry[2]
+
+    def put(self, key: Tuple[Any, ...], result: Any, ttl: Optional[float] = None) -> None:
+        """
+        Cache a result, evicting the least recently used results if over the limits.
+
+        A result with more rows than max_rows on its own is not cached.
+        """
+        rows = len(result) if isinstance(result, list) else 1
+        if rows > self.max_rows:
+            return
+        expires_at = self._clock() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (expires_at, rows, result)
+            self._rows += rows
+            while len(self._entries) > self.max_entries or self._rows > self.max_rows:
+                self._remove(next(iter(self._entries)))
+                self._counters['evictions'] += 1
+
+    def invalidate(self, table: Optional[str] = None) -> int:
+        """Drop the cached results of one table (default: all tables). Returns the number dropped."""
+        with self._lock:
+            keys = [key for key in self._entries if table is None or key[0] == table]
+            for key in keys:
+                self._remove(key)
+            self._counters['invalidations'] += len(keys)
+            return len(keys)
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """Return the counters, the current size and the hit rate."""
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['misses']
+            return {**self._counters, 'entries': len(self._entries), 'rows': self._rows,
+                    'hit_rate': self._counters['hits'] / lookups if lookups else 0.0}
+
+    def _remove(self, key: Tuple[Any, ...]) -> None:
+        _, rows, _ = self._entries.pop(key)
+        self._rows -= rows
+
+
+def _freeze(value: Any) -> Hashable:
+    """Make a filter value hashable, treating lists and tuples alike."""
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(sorted((_freeze(item) for item in value), key=repr))
+    return value
+
+
+def query_key(table_name: str, columns: str = '*', filters: Optional[Dict[str, Any]] = None,
+              order: Optional[str] = None, limit: Optional[int] = None) -> Tuple[Any, ...]:
+    """
+    Build the cache key of a select query.
+
+    Whitespace in the column list and the order of the filters do not
+    change the key, so equivalent queries share one cache entry.
+    """
+    normalized_columns = ','.join(column.strip() for column in columns.split(','))
+    normalized_filters = tuple(sorted((column, _freeze(value)) for column, value in (filters or {}).items()))
+    return (table_name, normalized_columns, normalized_filters, order, limit)
+
+
+# Created on first use, like the client
+_query_cache: Optional[QueryCache] = None
+_invalidation_hooks: List[Callable[[Optional[str]], None]] = []
+
+
+def get_query_cache() -> QueryCache:
+    """Get the process-wide query cache used by cached_select."""
+    global _query_cache
+    if _query_cache is None:
+        with _init_lock:
+            if _query_cache is None:
+                _query_cache = QueryCache()
+    return _query_cache
+
+
+def apply_filters(query: Any, filters: Optional[Dict[str, Any]]) -> Any:
+    """Add equality filters to a query; a list or tuple value matches any of its items."""
+    for column, value in (filters or {}).items():
+        query = query.in_(column, list(value)) if isinstance(value, (list, tuple)) else query.eq(column, value)
+    return query
+
+
+def cached_select(table_name: str, columns: str = '*', filters: Optional[Dict[str, Any]] = None,
+                  order: Optional[str] = None, limit: Optional[int] = None, ttl: Optional[float] = None,
+                  cache: Optional[QueryCache] = None) -> List[Dict[str, Any]]:
+    """
+    Run a select query, answering from the query cache when possible.
+
+    Meant for reference data that only changes when plans are loaded
+    (county lists, plans per county, issuer lists); loaders call
+    invalidate_cached_queries() afterwards. The returned rows are shared
+    with the cache and should not be modified.
+
+    Args:
+        table_name (str): Table or view to query
+        columns (str): Columns to select, as for select()
+        filters (Optional[Dict[str, Any]]): Equality filters; a list or tuple value matches any of its items
+        order (Optional[str]): Column to order by, prefixed with '-' for descending order
+        limit (Optional[int]): Maximum number of rows
+        ttl (Optional[float]): Seconds to keep this result (default: the cache's TTL)
+        cache (Optional[QueryCache]): Cache to use (default: the process-wide cache)
+
+    Returns:
+        List[Dict[str, Any]]: The rows returned by the query
+
+    Example:
+        >>> from src.utils.db import cached_select
+        >>> counties = cached_select('state_county_lookup', filters={'state_code': 'CA'}, order='county_name')
+    """
+    cache = cache or get_query_cache()
+    key = query_key(table_name, columns, filters, order, limit)
+    rows = cache.get(key)
+    if rows is not None:
+        return rows
+
+    query = apply_filters(get_table(table_name).select(columns), filters)
+    if order:
+        query = query.order(order.lstrip('-'), desc=order.startswith('-'))
+    if limit is not None:
+        query = query.limit(limit)
+    rows = query.execute().data or []
+    cache.put(key, rows, ttl)
+    return rows
+
+
+def on_invalidate(hook: Callable[[Optional[str]], None]) -> Callable[[Optional[str]], None]:
+    """
+    Register a function to call with the table name whenever cached queries are invalidated.
+
+    Can be used as a decorator; returns the hook.
+    """
+    _invalidation_hooks.append(hook)
+    return hook
+
+
+def invalidate_cached_queries(tables: Optional[Sequence[str]] = None) -> int:
+    """
+    Drop cached query results after the data changed, and run the invalidation hooks.
+
+    Args:
+        tables (Optional[Sequence[str]]): Tables whose results to drop (default: all)
+
+    Returns:
+        int: Number of cached results dropped
+    """
+    cache = get_query_cache()
+    dropped = 0
+    for table in (tables if tables is not None else [None]):
+        dropped += cache.invalidate(table)
+        for hook in list(_invalidation_hooks):
+            try:
+                hook(table)
+            except Exception as e:
+                print(f"Cache invalidation hook {getattr(hook, '__name__', hook)} failed: {e}")
+    return dropped
+
+
+def _filter_value(value: Any) -> str:
+    """Quote a value for a PostgREST logical filter, so commas and parentheses in it are kept."""
+    text = str(value).replace('\\', '\\\\').replace('"', '\\"')
+    return f'"{text}"'
+
+
+def keyset_filter(key: Sequence[str], after: Sequence[Any]) -> str:
+    """
+    Build the PostgREST or() condition matching rows whose key sorts after the given values.
+
+    (a, b, c) > (x, y, z) is spelled out as
+    a > x, or a = x and b > y, or a = x and b = y and c > z.
+    """
+    terms = []
+    for index, column in enumerate(key):
+        conditions = [f"{name}.eq.{_filter_value(value)}" for name, value in zip(key[:index], after)]
+        conditions.append(f"{column}.gt.{_filter_value(after[index])}")
+        terms.append(conditions[0] if len(conditions) == 1 else f"and({','.join(conditions)})")
+    return ','.join(terms)
+
+
+def key_ranges(key: Sequence[str], partitions: int) -> List[Tuple[Optional[str], Optional[str]]]:
+    """
+    Split the leading key column into disjoint [lower, upper) ranges covering every value.
+
+    Random UUIDs (id) are split evenly; text keys such as state_code are
+    split by first letter, into at most 26 ranges. None means unbounded.
+    """
+    if partitions < 1:
+        raise ValueError("partitions must be at least 1")
+    if key[0] == 'id':
+        bounds = [str(uuid.UUID(int=(index << 128) // partitions)) for index in range(1, partitions)]
+    else:
+        partitions = min(partitions, 26)
+        bounds = [chr(ord('A') + index * 26 // partitions) for index in range(1, partitions)]
+    return list(zip([None, *bounds], [*bounds, None]))
+
+
+def iter_key_range(client: Client, table_name: str, columns: str, key: Sequence[str], page_size: int,
+                   filters: Optional[Dict[str, Any]] = None, lower: Optional[str] = None,
+                   upper: Optional[str] = None) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Yield the pages of rows in one key range, in key order.
+
+    Each page asks for the rows after the last key of the previous one, so
+    every request is an index range scan however deep into the table it is.
+    Reading stops at the first empty page rather than the first short one,
+    so a server-side row cap below page_size cannot end the stream early.
+    """
+    after: Optional[List[Any]] = None
+    while True:
+        query = apply_filters(client.table(table_name).select(columns), filters)
+        if lower is not None:
+            query = query.gte(key[0], lower)
+        if upper is not None:
+            query = query.lt(key[0], upper)
+        if after is not None:
+            query = query.gt(key[0], after[0]) if len(key) == 1 else query.or_(keyset_filter(key, after))
+        for column in key:
+            query = query.order(column)
+        rows = query.limit(page_size).execute().data or []
+        if not rows:
+            return
+        yield rows
+        after = [rows[-1][column] for column in key]
+
+
+def _iter_parallel(pool: SupabaseClientPool, ranges: Sequence[Tuple[Optional[str], Optional[str]]],
+                   fetch: Callable[..., Iterator[List[Dict[str, Any]]]]) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Fetch each key range in its own thread with a pooled client, yielding pages as they arrive.
+
+    At most STREAM_PAGES_AHEAD pages per range wait for the consumer; the
+    threads are stopped when the consumer stops iterating or a range fails.
+    """
+    pages: "queue.Queue[Any]" = queue.Queue(maxsize=len(ranges) * STREAM_PAGES_AHEAD)
+    stop = threading.Event()
+    done = object()
+
+    def put(item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def read_range(lower: Optional[str], upper: Optional[str]) -> None:
+        try:
+            with pool.client() as client:
+                for page in fetch(client, lower=lower, upper=upper):
+                    if not put(page):
+                        return
+        except Exception as e:
+            put(e)
+            return
+        put(done)
+
+    with ThreadPoolExecutor(max_workers=len(ranges), thread_name_prefix='stream_table') as executor:
+        for lower, upper in ranges:
+            executor.submit(read_range, lower, upper)
+        try:
+            remaining = len(ranges)
+            while remaining:
+                item = pages.get()
+                if item is done:
+                    remaining -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield item
+        finally:
+            stop.set()
+
+
+def stream_table(table_name: str = 'marketplace_plans', columns: str = '*', key: Sequence[str] = ID_KEY,
+                 page_size: int = DEFAULT_STREAM_PAGE_SIZE, partitions: int = 1,
+                 filters: Optional[Dict[str, Any]] = None, model: Optional[Type[ModelT]] = None,
+                 client: Optional[Client] = None,
+                 pool: Optional[SupabaseClientPool] = None) -> Iterator[Union[Dict[str, Any], ModelT]]:
+    """
+    Read a whole table lazily, one keyset-paginated page at a time.
+
+    A plain select stops at the PostgREST row cap and offset pagination
+    gets slower with every page; here each page continues after the last
+    key read, so only about one page per key range is held in memory.
+
+    Args:
+        table_name (str): Table or view to read
+        columns (str): Columns to select, as for select(); the key columns are added if missing
+        key (Sequence[str]): Unique key to page by, ID_KEY or BUSINESS_KEY
+        page_size (int): Rows per request
+        partitions (int): Disjoint ranges of the leading key column to fetch in parallel,
+            each with a client from the pool; rows from different ranges are interleaved
+        filters (Optional[Dict[str, Any]]): Equality filters; a list or tuple value matches any of its items
+        model (Optional[Type[BaseModel]]): Validate each row into this model, e.g. MarketplacePlanJSON
+        client (Optional[Client]): Client for a single range (default: the shared client)
+        pool (Optional[SupabaseClientPool]): Pool for parallel ranges (default: the shared pool)
+
+    Returns:
+        Iterator: Rows as dicts, or model instances; with one partition, in key order
+
+    Raises:
+        ValueError: If the key is empty or page_size or partitions is below 1
+
+    Example:
+        >>> from src.utils.db import BUSINESS_KEY, stream_table
+        >>> for plan in stream_table(key=BUSINESS_KEY, partitions=4, model=MarketplacePlanJSON):
+        ...     print(plan.plan_id_standard_component)
+    """
+    if not key:
+        raise ValueError("key must name at least one column")
+    if page_size < 1:
+        raise ValueError("page_size must be at least 1")
+    ranges = key_ranges(key, partitions)
+
+    if columns.strip() != '*':
+        selected = [column.strip() for column in columns.split(',')]
+        columns = ','.join(selected + [column for column in key if column not in selected])
+
+    def fetch(range_client: Client, lower: Optional[str] = None,
+              upper: Optional[str] = None) -> Iterator[List[Dict[str, Any]]]:
+        return iter_key_range(range_client, table_name, columns, key, page_size, filters, lower, upper)
+
+    def rows() -> Iterator[Union[Dict[str, Any], ModelT]]:
+        if len(ranges) == 1:
+            pages = fetch(client or get_supabase_client())
+        else:
+            pages = _iter_parallel(pool or get_client_pool(), ranges, fetch)
+        for page in pages:
+            if model is None:
+                yield from page
+            else:
+                yield from map(model.model_validate, page)
+
+    return rows()
@@ -0,0 +1,257 @@
+"""
+Vectorized premium quotes for households against the plans in their county.
+
+MarketplacePlanJSON publishes each plan's monthly premium at a few ages only
+(0-14, 18, 21, 27, 30, 40, 50 and 60). The premium at any other age is
+interpolated between the two surrounding published points along the CMS
+default federal age curve, so a 45 year old is priced where the curve puts
+45 between the plan's own 40 and 50 premiums. Ages above 60 are extrapolated
+along the 50-60 segment, so plans with flat (community-rated) premiums stay
+flat. As under ACA rating rules, only the three oldest children under 21 in
+a household are charged.
+
+Interpolation is linear in the published premiums, so every household is
+reduced to one weight per published point (the sum over its members), and a
+county's households are priced against all of its plans with a single
+matrix product: (households x points) @ (points x plans).
+
+slcsp_premiums() derives the second-lowest-cost silver plan benchmark of
+each county from the same matrix, with the rule the slcsp_benchmarks table
+is built with.
+
+Requires NumPy (``uv sync --extra fast``).
+"""
+
+from functools import wraps
+from typing import Any, Callable, Dict, List, NamedTuple, Sequence, Tuple, TypeVar
+from weakref import WeakKeyDictionary
+
+try:
+    import numpy as np
+except ImportError:  # numpy is an optional dependency
+    np = None
+
+from utils.plan_store import PlanSnapshot
+
+# Published premium columns and the age each one is quoted at
+PREMIUM_POINTS = (
+    ('premium_child_age_0_14', 14),
+    ('premium_child_age_18', 18),
+    ('premium_adult_individual_age_21', 21),
+    ('premium_adult_individual_age_27', 27),
+    ('premium_adult_individual_age_30', 30),
+    ('premium_adult_individual_age_40', 40),
+    ('premium_adult_individual_age_50', 50),
+    ('premium_adult_individual_age_60', 60),
+)
+
+# CMS default federal standard age curve, ages 14 (covering 0-14) through 64 (covering 64 and older)
+DEFAULT_AGE_CURVE = (
+    0.765, 0.833, 0.859, 0.885, 0.913, 0.941, 0.970,                                     # 14-20
+    1.000, 1.000, 1.000, 1.000, 1.004, 1.024, 1.048, 1.087, 1.119,                       # 21-29
+    1.135, 1.159, 1.183, 1.198, 1.214, 1.222, 1.230, 1.238, 1.246, 1.262,                # 30-39
+    1.278, 1.302, 1.325, 1.357, 1.397, 1.444, 1.500, 1.563, 1.635, 1.706,                # 40-49
+    1.786, 1.865, 1.952, 2.040, 2.135, 2.230, 2.333, 2.437, 2.548, 2.603,                # 50-59
+    2.714, 2.810, 2.873, 2.952, 3.000,                                                   # 60-64
+)
+CURVE_FIRST_AGE = 14
+CURVE_LAST_AGE = 64
+
+CHILD_AGE_LIMIT = 21
+MAX_CHARGED_CHILDREN = 3
+
+BENCHMARK_METAL_LEVEL = 'Silver'
+
+
+class HouseholdQuote(NamedTuple):
+    """The plans offered to a household and its monthly premium for each."""
+
+    rows: Any      # np.ndarray of snapshot row ids
+    premiums: Any  # np.ndarray of premiums, in the same order
+
+
+ResultT = TypeVar('ResultT')
+
+
+def per_snapshot(build: Callable[[PlanSnapshot], ResultT]) -> Callable[[PlanSnapshot], ResultT]:
+    """
+    Cache what build derives from a snapshot for as long as the snapshot is alive.
+
+    Results are held weakly by snapshot, so once PlanStore.refresh() has
+    swapped a snapshot out and its readers are done, the snapshot and its
+    derived arrays are freed together.
+    """
+    results: "WeakKeyDictionary[PlanSnapshot, ResultT]" = WeakKeyDictionary()
+
+    @wraps(build)
+    def cached(snapshot: PlanSnapshot) -> ResultT:
+        try:
+            return results[snapshot]
+        except KeyError:
+            result = results[snapshot] = build(snapshot)
+            return result
+
+    return cached
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ValueError("Household quotes require numpy; install it with `uv sync --extra fast`")
+
+
+def age_weights(ages: "np.ndarray") -> "np.ndarray":
+    """
+    Weight of each published premium point in the premium of each age.
+
+    Returns an array of shape (len(ages), len(PREMIUM_POINTS)) with at most
+    two non-zero weights per row; multiplying it by a plan's published
+    premiums gives the interpolated premium at each age.
+    """
+    _require_numpy()
+    curve = np.asarray(DEFAULT_AGE_CURVE)
+    point_ages = np.array([age for _, age in PREMIUM_POINTS])
+    point_factors = curve[point_ages - CURVE_FIRST_AGE]
+
+    ages = np.clip(np.asarray(ages, dtype=np.int64), CURVE_FIRST_AGE, CURVE_LAST_AGE)
+    factors = curve[ages - CURVE_FIRST_AGE]
+    # Segment [point i, point i + 1] holding each age; ages past the last point use the last segment
+    lower = np.clip(np.searchsorted(point_ages, ages, side='right') - 1, 0, len(point_ages) - 2)
+    t = (factors - point_factors[lower]) / (point_factors[lower + 1] - point_factors[lower])
+
+    weights = np.zeros((len(ages), len(point_ages)))
+    members = np.arange(len(ages))
+    weights[members, lower] = 1.0 - t
+    weights[members, lower + 1] = t
+    return weights
+
+
+def household_weights(member_ages: Sequence[Sequence[int]]) -> "np.ndarray":
+    """
+    Sum the age weights of the charged members of each household.
+
+    Children under 21 beyond the three oldest are not charged.
+
+    Returns:
+        np.ndarray: Shape (len(member_ages), len(PREMIUM_POINTS))
+    """
+    _require_numpy()
+    width = max((len(ages) for ages in member_ages), default=0)
+    ages = np.full((len(member_ages), width), -1, dtype=np.int64)
+    for index, household in enumerate(member_ages):
+        ages[index, :len(household)] = household
+
+    # Oldest first, so the charged children are the first three under 21 in each row
+    ages = -np.sort(-ages, axis=1)
+    present = ages >= 0
+    children = present & (ages < CHILD_AGE_LIMIT)
+    charged = present & (~children | (np.cumsum(children, axis=1) <= MAX_CHARGED_CHILDREN))
+
+    weights = np.zeros((len(member_ages), len(PREMIUM_POINTS)))
+    households, _ = np.nonzero(charged)
+    np.add.at(weights, households, age_weights(ages[charged]))
+    return weights
+
+
+@per_snapshot
+def premium_matrix(snapshot: PlanSnapshot) -> "np.ndarray":
+    """
+    The published premiums of every plan in a snapshot, shape (rows, len(PREMIUM_POINTS)).
+
+    Missing premiums are NaN. Built once per snapshot; packed columns are
+    read without copying them first.
+    """
+    _require_numpy()
+    columns = []
+    for name, _ in PREMIUM_POINTS:
+        column = snapshot.columns[name]
+        if isinstance(column, list):
+            columns.append(np.array([np.nan if value is None else value for value in column], dtype=np.float64))
+        else:
+            columns.append(np.frombuffer(column, dtype=np.float64) if column.typecode == 'd'
+                           else np.asarray(column, dtype=np.float64))
+    return np.column_stack(columns) if columns[0].size else np.zeros((0, len(PREMIUM_POINTS)))
+
+
+@per_snapshot
+def slcsp_premiums(snapshot: PlanSnapshot) -> Dict[Tuple[str, int], "np.ndarray"]:
+    """
+    The second-lowest-cost silver plan premium of every county at each published point.
+
+    At each point the Silver plans with a premium are ranked by premium; a
+    county with a single one uses it. Points no Silver plan publishes are NaN,
+    and counties without Silver plans are left out.
+
+    Returns:
+        Dict[Tuple[str, int], np.ndarray]: Premiums in PREMIUM_POINTS order, per (state_code, fips_county_code)
+    """
+    _require_numpy()
+    premiums = premium_matrix(snapshot)
+    silver = np.array([level == BENCHMARK_METAL_LEVEL for level in snapshot.columns['metal_level']], dtype=bool)
+
+    benchmarks = {}
+    for county, rows in snapshot.by_county.items():
+        rows = np.frombuffer(rows, dtype=np.dtype(rows.typecode)).astype(np.int64)
+        rows = rows[silver[rows]]
+        if not rows.size:
+            continue
+        # NaN sorts last, so the second-lowest premium is at min(1, published - 1)
+        ranked = np.sort(premiums[rows], axis=0)
+        published = np.count_nonzero(~np.isnan(ranked), axis=0)
+        benchmark = ranked[np.clip(np.minimum(1, published - 1), 0, None), np.arange(len(PREMIUM_POINTS))]
+        benchmarks[county] = np.where(published > 0, benchmark, np.nan)
+    return benchmarks
+
+
+def price(weights: "np.ndarray", premiums: "np.ndarray") -> "np.ndarray":
+    """
+    Price households (rows of weights) against plans (rows of premiums).
+
+    A premium is NaN when a published point it depends on is missing;
+    points a household does not use do not affect it.
+    """
+    missing = np.isnan(premiums)
+    if not missing.any():
+        return weights @ premiums.T
+    quotes = weights @ np.where(missing, 0.0, premiums).T
+    quotes[(weights != 0) @ missing.T] = np.nan
+    return quotes
+
+
+def quote_households(snapshot: PlanSnapshot,
+                     households: Sequence[Tuple[str, int, Sequence[int]]]) -> List[HouseholdQuote]:
+    """
+    Price each household against every plan offered in its county.
+
+    Args:
+        snapshot (PlanSnapshot): Plans to quote, e.g. PlanStore.snapshot
+        households: (state_code, fips_county_code, member ages) per household
+
+    Returns:
+        List[HouseholdQuote]: One quote per household, in input order; a
+        household in a county without plans gets empty arrays
+
+    Raises:
+        ValueError: If numpy is not installed or an age is negative
+    """
+    _require_numpy()
+    if any(age < 0 for _, _, ages in households for age in ages):
+        raise ValueError("Member ages must not be negative")
+
+    premiums = premium_matrix(snapshot)
+    weights = household_weights([ages for _, _, ages in households])
+
+    by_county: Dict[Tuple[str, int], List[int]] = {}
+    for index, (state_code, fips_county_code, _) in enumerate(households):
+        by_county.setdefault((state_code, int(fips_county_code)), []).append(index)
+
+    empty = HouseholdQuote(np.zeros(0, dtype=np.int64), np.zeros(0))
+    quotes: List[HouseholdQuote] = [empty] * len(households)
+    for county, indexes in by_county.items():
+        rows = snapshot.by_county.get(county)
+        if not rows:
+            continue
+        rows = np.frombuffer(rows, dtype=np.dtype(rows.typecode)).astype(np.int64)
+        county_premiums = price(weights[indexes], premiums[rows])
+        for index, household_premiums in zip(indexes, county_premiums):
+            quotes[index] = HouseholdQuote(rows, household_premiums)
+    return quotes
@@ -0,0 +1,120 @@
+"""
+Pre-serialized JSON request bodies for PostgREST inserts.
+
+supabase-py takes a batch as a list of dicts and httpx serializes it with the
+standard json module on every send. Here each record is encoded once, with
+orjson when it is installed, and a batch body is joined from the encoded
+rows. A batch that is retried sends the same bytes again, and the halves of
+a split batch reuse the rows that were already encoded.
+
+The request itself is still built by postgrest-py (method, path, headers and
+the columns and on_conflict parameters) and sent on its httpx session; only
+the body is swapped in. Responses are read into postgrest-py's APIResponse
+and errors raised as its APIError, so callers see what execute() returns.
+
+orjson is optional (``uv sync --extra fast``); without it rows are encoded
+with the standard json module, the same way httpx would. Either way a row
+holding NaN or Infinity is rejected with ValueError (orjson would otherwise
+write it as null).
+"""
+
+import json
+import math
+import time
+from typing import Any, Dict, List, Sequence, Tuple
+
+import httpx
+from postgrest import APIError, APIResponse
+
+try:
+    import orjson
+except ImportError:  # orjson is an optional dependency
+    orjson = None
+
+
+def is_finite_json(value: Any) -> bool:
+    """Return False if value is, or contains, a NaN or infinite float."""
+    if isinstance(value, float):
+        return math.isfinite(value)
+    if isinstance(value, dict):
+        return all(map(is_finite_json, value.values()))
+    if isinstance(value, (list, tuple)):
+        return all(map(is_finite_json, value))
+    return True
+
+
+def encode_row(record: Dict[str, Any]) -> bytes:
+    """
+    Encode one record as compact JSON.
+
+    Raises:
+        ValueError: If the record holds a NaN or infinite float, which JSON cannot represent
+    """
+    if not is_finite_json(record):
+        raise ValueError("Out of range float values are not JSON compliant")
+    if orjson is not None:
+        return orjson.dumps(record)
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':'), allow_nan=False).encode('utf-8')
+
+
+def encode_rows(records: Sequence[Dict[str, Any]]) -> Tuple[List[bytes], float]:
+    """
+    Encode each record of a batch.
+
+    Returns:
+        Tuple[List[bytes], float]: The encoded rows and the CPU seconds spent encoding them
+    """
+    started = time.thread_time()
+    rows = [encode_row(record) for record in records]
+    return rows, time.thread_time() - started
+
+
+def join_rows(rows: Sequence[bytes]) -> bytes:
+    """Join encoded rows into the JSON array sent as the request body."""
+    return b'[' + b','.join(rows) + b']'
+
+
+def response_error(response: httpx.Response) -> Dict[str, Any]:
+    """Return the PostgREST error of a failed response, or a generic one if its body is not JSON."""
+    try:
+        error = response.json()
+    except ValueError:
+        error = None
+    if isinstance(error, dict):
+        return error
+    return {
+        "message": response.reason_phrase or "JSON could not be generated",
+        "code": str(response.status_code),
+        "hint": None,
+        "details": response.text,
+    }
+
+
+def execute_with_payload(request_builder: Any, payload: bytes) -> Any:
+    """
+    Execute a postgrest-py insert/upsert builder with a pre-serialized body.
+
+    The builder's own json is never encoded; its method, path, headers and
+    query parameters are sent on its httpx session, so the request is the one
+    postgrest-py would have sent. postgrest-py 1.x keeps these on the builder
+    and 2.x on its ``request``; a builder without an httpx session is simply
+    executed.
+    """
+    request = getattr(request_builder, 'request', request_builder)
+    session = getattr(request, 'session', None)
+    if not isinstance(session, httpx.Client):
+        return request_builder.execute()
+
+    headers = httpx.Headers(request.headers)
+    headers['Content-Type'] = 'application/json'
+    response = session.request(
+        request.http_method,
+        str(request.path),
+        content=payload,
+        params=request.params,
+        headers=headers,
+        auth=getattr(request, 'auth', httpx.USE_CLIENT_DEFAULT),
+    )
+    if not response.is_success:
+        raise APIError(response_error(response))
+    return APIResponse.from_http_request_response(response)
@@ -0,0 +1,429 @@
+"""
+Readers and writers for the intermediate marketplace plan files.
+
+create_json.py writes the transformed plans either as a single JSON array
+(``marketplace_plans.json``) or as newline-delimited JSON with one record per
+line (``marketplace_plans.ndjson``). Either format can be compressed with
+gzip (``.gz``) or zstandard (``.zst``). The plans can also be stored as a
+columnar Parquet file (``marketplace_plans.parquet``) whose schema follows
+MarketplacePlanJSON. The format and compression are detected from the file
+name, so upload_to_db.py and generate_seed_sql.py can read whatever
+create_json.py produced.
+"""
+
+import codecs
+import gzip
+import json
+import mmap
+import os
+import re
+import typing
+from functools import lru_cache
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from models.model import MarketplacePlanJSON
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional; only needed for .zst files
+    zstandard = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; only needed for .parquet files
+    pa = None
+    pq = None
+
+JSON_FORMAT = 'json'
+NDJSON_FORMAT = 'ndjson'
+PARQUET_FORMAT = 'parquet'
+OUTPUT_FORMATS = (JSON_FORMAT, NDJSON_FORMAT, PARQUET_FORMAT)
+
+NO_COMPRESSION = 'none'
+GZIP_COMPRESSION = 'gzip'
+ZSTD_COMPRESSION = 'zstd'
+COMPRESSION_SUFFIXES = {GZIP_COMPRESSION: '.gz', ZSTD_COMPRESSION: '.zst'}
+
+NDJSON_SUFFIXES = ('.ndjson', '.jsonl')
+PARQUET_SUFFIX = '.parquet'
+
+# Records inside the indented JSON array written by create_json.py start on
+# their own line at two spaces of indentation. json.dumps escapes newlines in
+# strings, so this byte sequence only ever marks the start of a record.
+INDENTED_ARRAY_START = b'[\n  {'
+INDENTED_RECORD_START = b'\n  {'
+
+# Bytes decoded at a time when parsing other JSON array layouts
+JSON_READ_WINDOW = 1024 * 1024
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+# Rows per Parquet row group when writing and per record batch when reading
+PARQUET_BATCH_SIZE = 10000
+PARQUET_CODEC = 'zstd'
+
+# Every column has a companion column holding, as JSON text, the values that
+# do not fit its type (e.g. "Included in Medical" in a deductible column)
+OVERFLOW_SUFFIX = '__json'
+
+
+def detect_compression(file_path: str) -> str:
+    """Return the compression of a plan file based on its suffix."""
+    for compression, suffix in COMPRESSION_SUFFIXES.items():
+        if str(file_path).endswith(suffix):
+            return compression
+    return NO_COMPRESSION
+
+
+def detect_format(file_path: str) -> str:
+    """Return JSON_FORMAT, NDJSON_FORMAT or PARQUET_FORMAT based on the file name."""
+    name = str(file_path)
+    if name.endswith(PARQUET_SUFFIX):
+        return PARQUET_FORMAT
+    suffix = COMPRESSION_SUFFIXES.get(detect_compression(name))
+    if suffix:
+        name = name[:-len(suffix)]
+    return NDJSON_FORMAT if name.endswith(NDJSON_SUFFIXES) else JSON_FORMAT
+
+
+def plan_file_name(base_name: str, output_format: str = JSON_FORMAT,
+                   compression: str = NO_COMPRESSION) -> str:
+    """
+    Build a file name such as ``marketplace_plans.ndjson.gz``.
+
+    Parquet files are compressed internally, so they never get a compression suffix.
+    """
+    if output_format == PARQUET_FORMAT:
+        return f"{base_name}{PARQUET_SUFFIX}"
+    return f"{base_name}.{output_format}{COMPRESSION_SUFFIXES.get(compression, '')}"
+
+
+def open_text(file_path: str, mode: str = 'rt', compression: Optional[str] = None) -> TextIO:
+    """
+    Open a plan file in text mode, transparently handling compression.
+
+    Args:
+        file_path (str): Path to the file
+        mode (str): 'rt' to read or 'wt' to write
+        compression (str, optional): Override the compression detected from the suffix
+
+    Raises:
+        ValueError: If zstd compression is requested but zstandard is not installed
+    """
+    if compression is None:
+        compression = detect_compression(file_path)
+
+    if compression == GZIP_COMPRESSION:
+        return gzip.open(file_path, mode, encoding='utf-8')  # type: ignore[return-value]
+    if compression == ZSTD_COMPRESSION:
+        if zstandard is None:
+            raise ValueError("zstd compression requires the 'zstandard' package (uv sync --extra fast)")
+        return zstandard.open(file_path, mode, encoding='utf-8')  # type: ignore[return-value]
+    return open(file_path, mode[0], encoding='utf-8')
+
+
+def encode_ndjson_record(record: Dict[str, Any]) -> str:
+    """Encode a record as a single compact NDJSON line (without the newline)."""
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+def iter_ndjson_records(file_path: str) -> Iterator[Dict[str, Any]]:
+    """Yield records from an NDJSON file one line at a time, skipping blank lines."""
+    with open_text(file_path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _iter_indented_array(buffer: "mmap.mmap", offset: int) -> Iterator[Dict[str, Any]]:
+    """Yield records from the indented array layout, skipping records without parsing them."""
+    end_of_array = buffer.rfind(b']')
+    start = len(INDENTED_ARRAY_START) - 1
+
+    for _ in range(offset):
+        start = buffer.find(INDENTED_RECORD_START, start + 1)
+        if start == -1:
+            return
+        start += len(INDENTED_RECORD_START) - 1
+
+    while start != -1:
+        end = buffer.find(INDENTED_RECORD_START, start + 1)
+        record_end = end_of_array if end == -1 else end
+        yield json.loads(buffer[start:record_end].rstrip(b' \t\r\n,'))
+        start = -1 if end == -1 else end + len(INDENTED_RECORD_START) - 1
+
+
+def _iter_any_array(buffer: "mmap.mmap", offset: int) -> Iterator[Any]:
+    """Yield the elements of a JSON array of any layout, decoding a window at a time."""
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    text, pos, read = '', 0, 0
+    expected = '['
+    index = 0
+
+    while True:
+        pos = _WHITESPACE.match(text, pos).end()
+        if pos == len(text):
+            if read >= len(buffer):
+                raise json.JSONDecodeError("Unterminated array", text, pos)
+            text = utf8.decode(buffer[read:read + JSON_READ_WINDOW], final=read + JSON_READ_WINDOW >= len(buffer))
+            pos, read = 0, read + JSON_READ_WINDOW
+            continue
+
+        char = text[pos]
+        if expected == '[':
+            if char != '[':
+                raise json.JSONDecodeError("Expecting '['", text, pos)
+            pos, expected = pos + 1, 'value or ]'
+        elif char == ']' and expected != 'value':
+            return
+        elif expected == ', or ]':
+            if char != ',':
+                raise json.JSONDecodeError("Expecting ',' delimiter", text, pos)
+            pos, expected = pos + 1, 'value'
+        else:
+            try:
+                value, end = decoder.raw_decode(text, pos)
+                # A value running into the end of the window may be cut short (e.g. a number)
+                complete = end < len(text) or read >= len(buffer)
+            except json.JSONDecodeError:
+                if read >= len(buffer):
+                    raise
+                complete = False
+
+            if not complete:
+                text = text[pos:] + utf8.decode(buffer[read:read + JSON_READ_WINDOW],
+                                                final=read + JSON_READ_WINDOW >= len(buffer))
+                pos, read = 0, read + JSON_READ_WINDOW
+                continue
+
+            if index >= offset:
+                yield value
+            index += 1
+            pos, expected = end, ', or ]'
+
+        # Drop the consumed text so memory stays bounded by the window size
+        if pos > JSON_READ_WINDOW:
+            text, pos = text[pos:], 0
+
+
+def iter_json_array_records(file_path: str, offset: int = 0) -> Iterator[Dict[str, Any]]:
+    """
+    Yield records from an uncompressed JSON array file through a memory map.
+
+    The indented layout written by create_json.py is split into records with
+    byte searches over the mapped file, so records before ``offset`` are
+    skipped without being parsed and only the returned records are copied
+    out of the map. Other layouts are decoded incrementally one window at a
+    time, parsing and discarding records before ``offset``.
+
+    Raises:
+        FileNotFoundError: If the file does not exist
+        json.JSONDecodeError: If the file is not a valid JSON array
+    """
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise json.JSONDecodeError("Expecting value", "", 0)
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            if buffer[:len(INDENTED_ARRAY_START)] == INDENTED_ARRAY_START:
+                yield from _iter_indented_array(buffer, offset)
+            else:
+                yield from _iter_any_array(buffer, offset)
+
+
+def iter_plan_records(file_path: str, offset: int = 0) -> Iterator[Dict[str, Any]]:
+    """
+    Yield plan records from a JSON array, NDJSON or Parquet file.
+
+    Uncompressed JSON arrays are read through a memory map, NDJSON files one
+    line at a time and Parquet files one record batch at a time, so no format
+    needs the whole file in memory before the first record is available.
+    Compressed JSON arrays are the exception and are parsed as a whole.
+
+    Args:
+        file_path (str): Path to the file
+        offset (int): Number of records to skip before the first one yielded
+
+    Raises:
+        FileNotFoundError: If the file does not exist
+        json.JSONDecodeError: If the file is not valid JSON
+    """
+    file_format = detect_format(file_path)
+    if file_format == NDJSON_FORMAT:
+        yield from islice(iter_ndjson_records(file_path), offset, None)
+        return
+    if file_format == PARQUET_FORMAT:
+        for batch in iter_parquet_batches(file_path):
+            if offset >= batch.num_rows:
+                offset -= batch.num_rows
+                continue
+            yield from record_batch_to_records(batch.slice(offset))
+            offset = 0
+        return
+
+    if detect_compression(file_path) == NO_COMPRESSION:
+        yield from iter_json_array_records(file_path, offset)
+        return
+
+    with open_text(file_path) as f:
+        data = json.load(f)
+    yield from data[offset:]
+
+
+def file_size_mb(file_path: str) -> float:
+    """Return the size of a file in megabytes."""
+    return os.path.getsize(file_path) / (1024 * 1024)
+
+
+def _require_pyarrow() -> None:
+    """Raise a helpful error when pyarrow is not installed."""
+    if pa is None:
+        raise ValueError("Parquet files require the 'pyarrow' package (uv sync --extra parquet)")
+
+
+@lru_cache(maxsize=1)
+def plan_columns() -> Tuple[Tuple[str, str], ...]:
+    """
+    Map each MarketplacePlanJSON field to a column kind.
+
+    Returns (name, kind) pairs in model order, where kind is 'float', 'int',
+    'text' or 'null'.
+    """
+    columns = []
+    for name, field in MarketplacePlanJSON.model_fields.items():
+        types = typing.get_args(field.annotation) or (field.annotation,)
+        if float in types:
+            kind = 'float'
+        elif int in types:
+            kind = 'int'
+        elif str in types:
+            kind = 'text'
+        else:
+            kind = 'null'
+        columns.append((name, kind))
+    return tuple(columns)
+
+
+def _fits_column(kind: str, value: Any) -> bool:
+    """Return True if a non-null value can be stored in a column of this kind as is."""
+    if kind == 'float':
+        return type(value) in (int, float)
+    if kind == 'int':
+        return type(value) is int
+    if kind == 'text':
+        return type(value) is str
+    return False
+
+
+def plan_arrow_schema() -> "pa.Schema":
+    """
+    Build the Arrow schema for plan files from MarketplacePlanJSON.
+
+    Strings are dictionary-encoded since most of them (state, county, issuer,
+    metal level) repeat across thousands of rows; premiums are float64.
+    """
+    _require_pyarrow()
+    text_type = pa.dictionary(pa.int32(), pa.string())
+    arrow_types = {'float': pa.float64(), 'int': pa.int64(), 'text': text_type, 'null': pa.null()}
+
+    fields = []
+    for name, kind in plan_columns():
+        fields.append(pa.field(name, arrow_types[kind]))
+        fields.append(pa.field(name + OVERFLOW_SUFFIX, text_type))
+    return pa.schema(fields)
+
+
+def records_to_record_batch(records: List[Dict[str, Any]]) -> "pa.RecordBatch":
+    """
+    Convert plan records to an Arrow record batch using the plan schema.
+
+    Values that do not fit their column type go to the overflow column as
+    JSON, so every record reads back unchanged (ints in float columns come
+    back as floats).
+
+    Raises:
+        ValueError: If a record has keys that are not MarketplacePlanJSON fields
+    """
+    _require_pyarrow()
+    unknown = {key for record in records for key in record} - dict(plan_columns()).keys()
+    if unknown:
+        raise ValueError(f"Columns not in MarketplacePlanJSON: {', '.join(sorted(unknown))}")
+
+    schema = plan_arrow_schema()
+    arrays = []
+    for name, kind in plan_columns():
+        values = [record.get(name) for record in records]
+        fits = [value is None or _fits_column(kind, value) for value in values]
+        typed = [value if fit else None for value, fit in zip(values, fits)]
+        overflow = [None if fit else json.dumps(value, ensure_ascii=False) for value, fit in zip(values, fits)]
+
+        if kind == 'text':
+            arrays.append(pa.array(typed, pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(typed, schema.field(name).type))
+        arrays.append(pa.array(overflow, pa.string()).dictionary_encode())
+
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def record_batch_to_records(batch: "pa.RecordBatch") -> List[Dict[str, Any]]:
+    """Convert an Arrow record batch back to plan records, merging the overflow columns."""
+    columns = dict(zip(batch.schema.names, batch.columns))
+    names = [name for name in columns if not name.endswith(OVERFLOW_SUFFIX)]
+
+    data = []
+    for name in names:
+        column = columns[name]
+        # Decoding first is much faster than to_pylist() on a dictionary array
+        values = (column.dictionary_decode() if pa.types.is_dictionary(column.type) else column).to_pylist()
+
+        overflow = columns.get(name + OVERFLOW_SUFFIX)
+        if overflow is not None and overflow.null_count < len(overflow):
+            if not pa.types.is_dictionary(overflow.type):
+                overflow = overflow.dictionary_encode()
+            # Parse each distinct overflow value once, in a single json.loads call
+            parsed = json.loads(f"[{','.join(overflow.dictionary.to_pylist())}]")
+            values = [value if index is None else parsed[index]
+                      for value, index in zip(values, overflow.indices.to_pylist())]
+        data.append(values)
+
+    return [dict(zip(names, row)) for row in zip(*data)]
+
+
+def write_parquet_records(records: Iterable[Dict[str, Any]], file_path: str,
+                          batch_size: int = PARQUET_BATCH_SIZE) -> int:
+    """
+    Write plan records to a Parquet file one row group at a time.
+
+    Returns the number of records written.
+    """
+    _require_pyarrow()
+    count = 0
+    records = iter(records)
+    with pq.ParquetWriter(file_path, plan_arrow_schema(), compression=PARQUET_CODEC) as writer:
+        while batch := list(islice(records, batch_size)):
+            writer.write_batch(records_to_record_batch(batch))
+            count += len(batch)
+    return count
+
+
+def iter_parquet_batches(file_path: str, batch_size: int = PARQUET_BATCH_SIZE) -> Iterator["pa.RecordBatch"]:
+    """
+    Yield Arrow record batches from a Parquet plan file.
+
+    String columns are read back dictionary-encoded, so repeated values are
+    only decoded once per batch.
+
+    Raises:
+        FileNotFoundError: If the file does not exist
+    """
+    _require_pyarrow()
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(file_path)
+
+    parquet_file = pq.ParquetFile(file_path, read_dictionary=[
+        field.name for field in plan_arrow_schema() if pa.types.is_dictionary(field.type)
+    ])
+    yield from parquet_file.iter_batches(batch_size=batch_size)
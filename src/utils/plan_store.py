@@ -0,0 +1,259 @@
+"""
+In-memory, indexed store of marketplace plans for low-latency lookups.
+
+The whole dataset is loaded once, from one of the pipeline's plan files
+(anything iter_plan_records reads) or from the Supabase marketplace_plans
+table, and kept column by column:
+
+- numeric columns without nulls are packed into ``array`` buffers
+  (which NumPy can view without copying), other columns are lists
+- repeated strings (state codes, issuer names, metal levels...) are
+  stored once per column
+- hash indexes map (state_code, fips_county_code), hios_issuer_id and
+  plan_id_standard_component to the rows that have them
+
+A lookup goes through the most selective index given, so answering "which
+plans are offered in this county" does not touch the network or scan the
+table. refresh() loads a new snapshot and swaps it in with a single
+assignment; lookups already running keep reading the snapshot they
+started with.
+"""
+
+import threading
+import time
+from array import array
+from collections import defaultdict
+from itertools import islice, repeat
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from utils.db import get_client_pool, stream_table
+from utils.plan_files import iter_plan_records, plan_columns
+
+COUNTY_KEY = ('state_code', 'fips_county_code')
+ISSUER_KEY = 'hios_issuer_id'
+PLAN_ID_KEY = 'plan_id_standard_component'
+
+TABLE_NAME = 'marketplace_plans'
+SUPABASE_PAGE_SIZE = 1000
+
+# Records are read from the loader in chunks of this size
+LOAD_CHUNK_SIZE = 10000
+
+# array typecodes for numeric columns that have no nulls
+ARRAY_TYPECODES = {'float': 'd', 'int': 'q'}
+
+
+def iter_supabase_plans(client: Any, columns: Sequence[str], page_size: int = SUPABASE_PAGE_SIZE,
+                        table: str = TABLE_NAME) -> Iterator[Dict[str, Any]]:
+    """Yield every row of the plans table, one keyset-paginated page at a time in id order."""
+    yield from stream_table(table, ','.join(columns), page_size=page_size, client=client)
+
+
+def iter_chunks(records: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Yield lists of up to size records."""
+    iterator = iter(records)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class PlanSnapshot:
+    """One immutable load of the plans, stored column by column with its indexes."""
+
+    __slots__ = ('columns', 'row_count', 'by_county', 'by_issuer', 'by_plan_id', 'source', 'loaded_at',
+                 '__weakref__')
+
+    def __init__(self, columns: Dict[str, Sequence[Any]], row_count: int,
+                 by_county: Dict[Tuple[str, int], array], by_issuer: Dict[int, array],
+                 by_plan_id: Dict[str, array], source: str):
+        self.columns = columns
+        self.row_count = row_count
+        self.by_county = by_county
+        self.by_issuer = by_issuer
+        self.by_plan_id = by_plan_id
+        self.source = source
+        self.loaded_at = time.time()
+
+    def rows(self, row_ids: Iterable[int], columns: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Build a record for each row, with the given columns (default: all) in model order."""
+        names = list(columns) if columns is not None else list(self.columns)
+        row_ids = list(row_ids)
+        values = [map(self.columns[name].__getitem__, row_ids) for name in names]
+        return [dict(zip(names, row)) for row in zip(*values)] if names else [{} for _ in row_ids]
+
+
+def build_snapshot(records: Iterable[Dict[str, Any]], source: str = '') -> PlanSnapshot:
+    """
+    Load records into a column-oriented snapshot and index them.
+
+    Only the MarketplacePlanJSON columns are kept; other fields (id,
+    content_hash...) are dropped.
+    """
+    kinds = plan_columns()
+    names = [name for name, _ in kinds]
+    values: List[List[Any]] = [[] for _ in names]
+    # One shared instance per distinct value, per text column
+    interned = {index: {} for index, (_, kind) in enumerate(kinds) if kind == 'text'}
+
+    row_count = 0
+    for chunk in iter_chunks(records, LOAD_CHUNK_SIZE):
+        for index, name in enumerate(names):
+            column = list(map(dict.get, chunk, repeat(name)))
+            if index in interned:
+                column = list(map(interned[index].setdefault, column, column))
+            values[index].extend(column)
+        row_count += len(chunk)
+
+    columns: Dict[str, Sequence[Any]] = {}
+    for (name, kind), column in zip(kinds, values):
+        typecode = ARRAY_TYPECODES.get(kind)
+        if typecode is not None and all(type(value) in (int, float) for value in column):
+            try:
+                columns[name] = array(typecode, column)
+                continue
+            except TypeError:
+                pass  # e.g. a float in an int column; keep the values as they are
+        columns[name] = column
+
+    by_county: Dict[Any, List[int]] = defaultdict(list)
+    by_issuer: Dict[Any, List[int]] = defaultdict(list)
+    by_plan_id: Dict[Any, List[int]] = defaultdict(list)
+    counties = zip(columns[COUNTY_KEY[0]], columns[COUNTY_KEY[1]])
+    for row, (county, issuer, plan_id) in enumerate(zip(counties, columns[ISSUER_KEY], columns[PLAN_ID_KEY])):
+        by_county[county].append(row)
+        by_issuer[issuer].append(row)
+        by_plan_id[plan_id].append(row)
+
+    def pack(index: Dict[Any, List[int]]) -> Dict[Any, array]:
+        return {key: array('I', rows) for key, rows in index.items()}
+
+    return PlanSnapshot(columns, row_count, pack(by_county), pack(by_issuer), pack(by_plan_id), source)
+
+
+class PlanStore:
+    """
+    Indexed in-memory plans, loaded from a plan file or from Supabase.
+
+    Example:
+        >>> store = PlanStore.from_file('data/marketplace_plans.ndjson')
+        >>> store.lookup(state_code='CA', fips_county_code=6001, metal_level='Silver',
+        ...              columns=['plan_id_standard_component', 'premium_adult_individual_age_40'])
+    """
+
+    def __init__(self, loader: Callable[[], Iterable[Dict[str, Any]]], source: str = ''):
+        """
+        Initialize the store and load the first snapshot.
+
+        Args:
+            loader: Called on load and on every refresh to get the records
+            source (str): Description of where the records come from
+        """
+        self._loader = loader
+        self._source = source
+        self._refresh_lock = threading.Lock()
+        self._snapshot = build_snapshot(loader(), source)
+
+    @classmethod
+    def from_file(cls, file_path: str) -> 'PlanStore':
+        """Load the plans from a JSON, NDJSON or Parquet plan file."""
+        return cls(lambda: iter_plan_records(file_path), source=file_path)
+
+    @classmethod
+    def from_supabase(cls, page_size: int = SUPABASE_PAGE_SIZE, table: str = TABLE_NAME) -> 'PlanStore':
+        """Load the plans from Supabase with a client checked out of the shared pool."""
+        columns = [name for name, _ in plan_columns()]
+
+        def load() -> Iterator[Dict[str, Any]]:
+            with get_client_pool().client() as client:
+                yield from iter_supabase_plans(client, columns, page_size, table)
+
+        return cls(load, source=f"supabase:{table}")
+
+    @property
+    def snapshot(self) -> PlanSnapshot:
+        """The snapshot lookups are currently answered from."""
+        return self._snapshot
+
+    def __len__(self) -> int:
+        return self._snapshot.row_count
+
+    def refresh(self) -> PlanSnapshot:
+        """
+        Reload the plans and swap the new snapshot in.
+
+        The old snapshot keeps answering lookups while the new one is built;
+        if loading fails the store is left unchanged and the error is raised.
+        """
+        with self._refresh_lock:
+            snapshot = build_snapshot(self._loader(), self._source)
+            self._snapshot = snapshot
+        return snapshot
+
+    def row_ids(self, state_code: Optional[str] = None, fips_county_code: Optional[int] = None,
+                hios_issuer_id: Optional[int] = None, plan_id_standard_component: Optional[str] = None,
+                snapshot: Optional[PlanSnapshot] = None, **filters: Any) -> List[int]:
+        """
+        Find the rows matching every given value, in row order.
+
+        state_code and fips_county_code must be given together to use the
+        county index; other keyword arguments are equality filters on any
+        column, checked on the rows the indexes selected.
+        """
+        snapshot = snapshot or self._snapshot
+        if (state_code is None) != (fips_county_code is None):
+            raise ValueError("state_code and fips_county_code must be given together")
+
+        candidates: List[Sequence[int]] = []
+        if state_code is not None:
+            candidates.append(snapshot.by_county.get((state_code, int(fips_county_code)), ()))  # type: ignore[arg-type]
+        if hios_issuer_id is not None:
+            candidates.append(snapshot.by_issuer.get(int(hios_issuer_id), ()))
+        if plan_id_standard_component is not None:
+            candidates.append(snapshot.by_plan_id.get(plan_id_standard_component, ()))
+
+        if candidates:
+            candidates.sort(key=len)
+            rows: Iterable[int] = candidates[0]
+            for other in candidates[1:]:
+                other_rows = set(other)
+                rows = [row for row in rows if row in other_rows]
+        else:
+            rows = range(snapshot.row_count)
+
+        for name, expected in filters.items():
+            if name not in snapshot.columns:
+                raise ValueError(f"Unknown column: {name}")
+            column = snapshot.columns[name]
+            rows = [row for row in rows if column[row] == expected]
+        return list(rows)
+
+    def lookup(self, state_code: Optional[str] = None, fips_county_code: Optional[int] = None,
+               hios_issuer_id: Optional[int] = None, plan_id_standard_component: Optional[str] = None,
+               columns: Optional[Sequence[str]] = None, **filters: Any) -> List[Dict[str, Any]]:
+        """
+        Get the plans matching every given value.
+
+        Args:
+            state_code, fips_county_code: County to look up (given together)
+            hios_issuer_id: Issuer to look up
+            plan_id_standard_component: Plan to look up (one row per county it is offered in)
+            columns (Optional[Sequence[str]]): Columns to return (default: all)
+            **filters: Equality filters on other columns, e.g. metal_level='Silver'
+
+        Returns:
+            List[Dict[str, Any]]: Matching plans in load order
+
+        Raises:
+            ValueError: If a column is unknown or only half the county key is given
+        """
+        snapshot = self._snapshot
+        if columns is not None:
+            unknown = [name for name in columns if name not in snapshot.columns]
+            if unknown:
+                raise ValueError(f"Unknown column: {', '.join(unknown)}")
+        rows = self.row_ids(state_code, fips_county_code, hios_issuer_id, plan_id_standard_component,
+                            snapshot=snapshot, **filters)
+        return snapshot.rows(rows, columns)
+
+    def county_plans(self, state_code: str, fips_county_code: int, **kwargs: Any) -> List[Dict[str, Any]]:
+        """Get the plans offered in a county (see lookup for the other arguments)."""
+        return self.lookup(state_code=state_code, fips_county_code=fips_county_code, **kwargs)
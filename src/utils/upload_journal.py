@@ -0,0 +1,172 @@
+"""
+Checkpoint journal for resumable uploads.
+
+upload_to_db.py records every committed batch in a small SQLite database:
+the file positions the batch covered and the business key of every row.
+Positions of records that failed validation are recorded too, since they
+would fail again. A ``--resume`` run skips the contiguous prefix of the
+file that is already done without reading it, and filters out any later
+rows whose business key was committed (batches can complete out of order
+when several are in flight).
+
+The journal is tied to the input file by its size and modification time,
+so resuming against a different file is refused.
+"""
+
+import os
+import sqlite3
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+# Columns of the uk_marketplace_plans_business_key unique constraint
+BUSINESS_KEY_COLUMNS = ('state_code', 'fips_county_code', 'plan_id_standard_component')
+
+COMMITTED = 'committed'
+INVALID = 'invalid'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS source (
+    path TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    started_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ranges (
+    first_position INTEGER NOT NULL,
+    last_position INTEGER NOT NULL,
+    rows INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    recorded_at TEXT NOT NULL
+);
+-- Untyped columns keep key values exactly as they appear in the records
+CREATE TABLE IF NOT EXISTS business_keys (
+    state_code,
+    fips_county_code,
+    plan_id_standard_component,
+    PRIMARY KEY (state_code, fips_county_code, plan_id_standard_component)
+);
+"""
+
+
+def business_key(record: Dict[str, Any]) -> Tuple[Any, ...]:
+    """Return the (state_code, fips_county_code, plan_id_standard_component) key of a record."""
+    return tuple(record.get(column) for column in BUSINESS_KEY_COLUMNS)
+
+
+def source_fingerprint(file_path: str) -> str:
+    """Identify the input file by its size and modification time."""
+    stat = os.stat(file_path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def position_ranges(positions: Iterable[int]) -> List[Tuple[int, int, int]]:
+    """Group sorted positions into (first, last, count) runs of consecutive positions."""
+    runs: List[Tuple[int, int, int]] = []
+    for position in sorted(positions):
+        if runs and position == runs[-1][1] + 1:
+            first, _, count = runs[-1]
+            runs[-1] = (first, position, count + 1)
+        else:
+            runs.append((position, position, 1))
+    return runs
+
+
+class UploadJournal:
+    """SQLite journal of the batches committed by an upload."""
+
+    def __init__(self, journal_path: str, source_path: str, resume: bool = False):
+        """
+        Open the journal for an upload of source_path.
+
+        Args:
+            journal_path (str): Path to the SQLite journal file
+            source_path (str): Path to the file being uploaded
+            resume (bool): Keep the progress of a previous run instead of starting over
+
+        Raises:
+            ValueError: If resuming and the journal belongs to a different or changed file
+        """
+        fingerprint = source_fingerprint(source_path)
+
+        self.path = journal_path
+        self.connection = sqlite3.connect(journal_path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+
+        row = self.connection.execute("SELECT path, fingerprint FROM source").fetchone()
+
+        if resume and row is not None and row != (os.path.abspath(source_path), fingerprint):
+            self.connection.close()
+            raise ValueError(f"Journal {journal_path} was written for {row[0]}, which has changed or is a "
+                             f"different file; run without --resume to start over")
+
+        if not resume or row is None:
+            with self.connection:
+                self.connection.execute("DELETE FROM source")
+                self.connection.execute("DELETE FROM ranges")
+                self.connection.execute("DELETE FROM business_keys")
+                self.connection.execute("INSERT INTO source VALUES (?, ?, ?)",
+                                        (os.path.abspath(source_path), fingerprint, datetime.now().isoformat()))
+
+    def __enter__(self) -> 'UploadJournal':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the journal database."""
+        self.connection.close()
+
+    def _record_ranges(self, positions: Iterable[int], kind: str) -> None:
+        recorded_at = datetime.now().isoformat()
+        self.connection.executemany(
+            "INSERT INTO ranges VALUES (?, ?, ?, ?, ?)",
+            [(first, last, count, kind, recorded_at) for first, last, count in position_ranges(positions)]
+        )
+
+    def commit_batch(self, positions: Sequence[int], records: Sequence[Dict[str, Any]]) -> None:
+        """Record a batch that the database has committed."""
+        with self.connection:
+            self._record_ranges(positions, COMMITTED)
+            self.connection.executemany("INSERT OR IGNORE INTO business_keys VALUES (?, ?, ?)",
+                                        [business_key(record) for record in records])
+
+    def mark_invalid(self, positions: Iterable[int]) -> None:
+        """Record positions of records that failed validation and will not be uploaded."""
+        with self.connection:
+            self._record_ranges(positions, INVALID)
+
+    def done_prefix(self) -> int:
+        """Return the number of leading file positions that are committed or invalid."""
+        prefix = 0
+        for first, last in self.connection.execute(
+                "SELECT first_position, last_position FROM ranges ORDER BY first_position"):
+            if first > prefix:
+                break
+            prefix = max(prefix, last + 1)
+        return prefix
+
+    def committed_keys(self) -> Set[Tuple[Any, ...]]:
+        """Return the business keys of all committed rows."""
+        return set(self.connection.execute("SELECT * FROM business_keys"))
+
+    def summary(self) -> Dict[str, int]:
+        """Return the number of committed and invalid rows recorded so far."""
+        counts = dict(self.connection.execute("SELECT kind, SUM(rows) FROM ranges GROUP BY kind").fetchall())
+        return {COMMITTED: counts.get(COMMITTED) or 0, INVALID: counts.get(INVALID) or 0}
+
+
+def open_journal(journal_path: Optional[str], source_path: str, resume: bool) -> Optional[UploadJournal]:
+    """Open a journal, or return None with a warning if it cannot be used (unless resuming)."""
+    if not journal_path:
+        return None
+    try:
+        return UploadJournal(journal_path, source_path, resume=resume)
+    except ValueError:
+        raise
+    except Exception as e:
+        if resume:
+            raise ValueError(f"Cannot open journal {journal_path}: {e}") from e
+        print(f"⚠️ Checkpoint journal unavailable ({e}); this upload cannot be resumed")
+        return None
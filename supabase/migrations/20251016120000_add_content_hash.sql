@@ -0,0 +1,7 @@
+-- Add a content hash so upserts can skip rows that have not changed
+-- upload_to_db.py --upsert computes the hash from the row values (excluding id)
+
+ALTER TABLE marketplace_plans ADD COLUMN content_hash VARCHAR(32);
+
+-- Add comment for documentation
+COMMENT ON COLUMN marketplace_plans.content_hash IS 'BLAKE2b hash of the row values, used to send only changed rows on upsert';
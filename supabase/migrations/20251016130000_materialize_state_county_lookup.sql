@@ -0,0 +1,45 @@
+-- Turn state_county_lookup into a materialized view
+-- The plain view ran SELECT DISTINCT over the whole marketplace_plans table on every query;
+-- the materialized view holds the few thousand distinct counties and is refreshed after each load
+-- (upload_to_db.py and seed.sql call refresh_state_county_lookup())
+
+DROP VIEW IF EXISTS state_county_lookup;
+
+CREATE MATERIALIZED VIEW state_county_lookup AS
+SELECT DISTINCT
+    state_code,
+    county_name,
+    fips_county_code
+FROM marketplace_plans
+ORDER BY state_code, county_name;
+
+-- Unique index required by REFRESH MATERIALIZED VIEW CONCURRENTLY; its column order also
+-- serves lookups by state_code ordered by county_name
+CREATE UNIQUE INDEX idx_state_county_lookup_unique
+    ON state_county_lookup (state_code, county_name, fips_county_code);
+
+-- Refresh without blocking readers of the lookup
+CREATE OR REPLACE FUNCTION refresh_state_county_lookup()
+RETURNS void
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    REFRESH MATERIALIZED VIEW CONCURRENTLY state_county_lookup;
+END;
+$$;
+
+-- Only the roles that load data may trigger a refresh
+REVOKE ALL ON FUNCTION refresh_state_county_lookup() FROM PUBLIC;
+REVOKE ALL ON FUNCTION refresh_state_county_lookup() FROM anon;
+GRANT EXECUTE ON FUNCTION refresh_state_county_lookup() TO authenticated, service_role;
+
+GRANT SELECT ON state_county_lookup TO anon, authenticated, service_role;
+
+-- Add comment for documentation
+COMMENT ON MATERIALIZED VIEW state_county_lookup IS 'Distinct state codes and county names available in marketplace plans data, refreshed after each load';
+COMMENT ON COLUMN state_county_lookup.state_code IS 'Two-letter state abbreviation';
+COMMENT ON COLUMN state_county_lookup.county_name IS 'County name';
+COMMENT ON COLUMN state_county_lookup.fips_county_code IS 'Federal Information Processing Standard county code';
+COMMENT ON FUNCTION refresh_state_county_lookup() IS 'Refresh state_county_lookup concurrently; called by upload_to_db.py and seed.sql after loading plans';
@@ -0,0 +1,166 @@
+-- Create the second-lowest-cost silver plan (SLCSP) benchmark table
+-- Subsidy math needs the SLCSP premium per county and age; this table holds it for every
+-- published age point so it does not have to be derived from the Silver rows on each request.
+-- Statement-level triggers on marketplace_plans rebuild the rows of the counties each
+-- INSERT, UPDATE, DELETE or COPY touched, so every load path keeps it current. Loads made of
+-- many small statements (the seed's one INSERT per plan) can set marketplace.defer_slcsp = 'on'
+-- for their transaction and call refresh_slcsp_benchmarks() once at the end instead.
+
+CREATE TABLE slcsp_benchmarks (
+    state_code VARCHAR(2) NOT NULL,
+    fips_county_code INTEGER NOT NULL,
+    age SMALLINT NOT NULL,
+    premium DECIMAL(10,2) NOT NULL,
+    plan_id_standard_component VARCHAR(200) NOT NULL,
+    silver_plan_count INTEGER NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (state_code, fips_county_code, age)
+);
+
+-- The rebuild only reads the Silver plans of the counties it is given
+CREATE INDEX idx_marketplace_plans_silver_county ON marketplace_plans(state_code, fips_county_code)
+    WHERE metal_level = 'Silver';
+
+-- Rebuild the benchmarks of the given counties (state_codes[i], fips_county_codes[i]), or of all counties
+CREATE OR REPLACE FUNCTION refresh_slcsp_benchmarks(
+    state_codes TEXT[] DEFAULT NULL,
+    fips_county_codes INTEGER[] DEFAULT NULL
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    written INTEGER;
+BEGIN
+    IF state_codes IS NULL THEN
+        DELETE FROM slcsp_benchmarks;
+    ELSE
+        DELETE FROM slcsp_benchmarks b
+        USING unnest(state_codes, fips_county_codes) AS c(state_code, fips_county_code)
+        WHERE b.state_code = c.state_code AND b.fips_county_code = c.fips_county_code;
+    END IF;
+
+    INSERT INTO slcsp_benchmarks (state_code, fips_county_code, age, premium,
+                                  plan_id_standard_component, silver_plan_count)
+    SELECT state_code, fips_county_code, age, premium, plan_id_standard_component, silver_plan_count
+    FROM (
+        SELECT p.state_code,
+               p.fips_county_code,
+               a.age,
+               a.premium,
+               p.plan_id_standard_component,
+               ROW_NUMBER() OVER county_age AS premium_rank,
+               COUNT(*) OVER (PARTITION BY p.state_code, p.fips_county_code, a.age) AS silver_plan_count
+        FROM marketplace_plans p
+        CROSS JOIN LATERAL (VALUES
+            (14, p.premium_child_age_0_14),
+            (18, p.premium_child_age_18),
+            (21, p.premium_adult_individual_age_21),
+            (27, p.premium_adult_individual_age_27),
+            (30, p.premium_adult_individual_age_30),
+            (40, p.premium_adult_individual_age_40),
+            (50, p.premium_adult_individual_age_50),
+            (60, p.premium_adult_individual_age_60)
+        ) AS a(age, premium)
+        WHERE p.metal_level = 'Silver'
+          AND a.premium IS NOT NULL
+          AND (state_codes IS NULL OR (p.state_code, p.fips_county_code) IN (
+                SELECT c.state_code, c.fips_county_code
+                FROM unnest(state_codes, fips_county_codes) AS c(state_code, fips_county_code)))
+        WINDOW county_age AS (PARTITION BY p.state_code, p.fips_county_code, a.age
+                              ORDER BY a.premium, p.plan_id_standard_component)
+    ) ranked
+    -- A county with a single Silver plan uses that plan as its benchmark
+    WHERE premium_rank = LEAST(2, silver_plan_count);
+
+    GET DIAGNOSTICS written = ROW_COUNT;
+    RETURN written;
+END;
+$$;
+
+-- Collect the counties a statement changed and rebuild their benchmarks, unless the
+-- transaction deferred the rebuild with SET LOCAL marketplace.defer_slcsp = 'on'
+CREATE OR REPLACE FUNCTION marketplace_plans_refresh_slcsp()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    states TEXT[];
+    counties INTEGER[];
+BEGIN
+    IF current_setting('marketplace.defer_slcsp', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(state_code), array_agg(fips_county_code) INTO states, counties
+        FROM (SELECT DISTINCT state_code, fips_county_code FROM new_rows) changed;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(state_code), array_agg(fips_county_code) INTO states, counties
+        FROM (SELECT DISTINCT state_code, fips_county_code FROM old_rows) changed;
+    ELSE
+        SELECT array_agg(state_code), array_agg(fips_county_code) INTO states, counties
+        FROM (SELECT state_code, fips_county_code FROM new_rows
+              UNION
+              SELECT state_code, fips_county_code FROM old_rows) changed;
+    END IF;
+
+    IF states IS NOT NULL THEN
+        PERFORM refresh_slcsp_benchmarks(states, counties);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION marketplace_plans_clear_slcsp()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    DELETE FROM slcsp_benchmarks;
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER trg_marketplace_plans_slcsp_insert
+    AFTER INSERT ON marketplace_plans
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION marketplace_plans_refresh_slcsp();
+
+CREATE TRIGGER trg_marketplace_plans_slcsp_update
+    AFTER UPDATE ON marketplace_plans
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION marketplace_plans_refresh_slcsp();
+
+CREATE TRIGGER trg_marketplace_plans_slcsp_delete
+    AFTER DELETE ON marketplace_plans
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION marketplace_plans_refresh_slcsp();
+
+CREATE TRIGGER trg_marketplace_plans_slcsp_truncate
+    AFTER TRUNCATE ON marketplace_plans
+    FOR EACH STATEMENT EXECUTE FUNCTION marketplace_plans_clear_slcsp();
+
+-- Only the roles that load data may rebuild the table by hand
+REVOKE ALL ON FUNCTION refresh_slcsp_benchmarks(TEXT[], INTEGER[]) FROM PUBLIC;
+REVOKE ALL ON FUNCTION refresh_slcsp_benchmarks(TEXT[], INTEGER[]) FROM anon;
+GRANT EXECUTE ON FUNCTION refresh_slcsp_benchmarks(TEXT[], INTEGER[]) TO authenticated, service_role;
+
+GRANT SELECT ON slcsp_benchmarks TO anon, authenticated, service_role;
+
+-- Build the benchmarks for the plans already loaded
+SELECT refresh_slcsp_benchmarks();
+
+-- Add comments for documentation
+COMMENT ON TABLE slcsp_benchmarks IS 'Second-lowest-cost silver plan premium per county and published age point, maintained by triggers on marketplace_plans';
+COMMENT ON COLUMN slcsp_benchmarks.age IS 'Published age point: 14 (covering ages 0-14), 18, 21, 27, 30, 40, 50 or 60';
+COMMENT ON COLUMN slcsp_benchmarks.premium IS 'Monthly premium of the benchmark plan at this age';
+COMMENT ON COLUMN slcsp_benchmarks.plan_id_standard_component IS 'Benchmark plan: the second cheapest Silver plan at this age, or the only one';
+COMMENT ON COLUMN slcsp_benchmarks.silver_plan_count IS 'Number of Silver plans with a premium at this age in the county';
+COMMENT ON FUNCTION refresh_slcsp_benchmarks(TEXT[], INTEGER[]) IS 'Rebuild slcsp_benchmarks for the given counties (all counties when called without arguments)';
@@ -0,0 +1,81 @@
+-- Serialize concurrent rebuilds of the same slcsp_benchmarks counties
+-- upload_to_db.py sends several batches at once, and a county often spans two of them. Each
+-- batch's statement trigger deleted and re-inserted that county's benchmarks, so the second
+-- transaction failed on the primary key and rolled its plans back, or ranked the county
+-- without the first transaction's uncommitted plans. A rebuild now takes a transaction-level
+-- advisory lock per county (in a fixed order, so two rebuilds cannot deadlock) before touching
+-- it; the second rebuild waits for the first to commit and then sees both sets of plans.
+-- A full rebuild locks the whole table instead.
+
+CREATE OR REPLACE FUNCTION refresh_slcsp_benchmarks(
+    state_codes TEXT[] DEFAULT NULL,
+    fips_county_codes INTEGER[] DEFAULT NULL
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    written INTEGER;
+    county RECORD;
+BEGIN
+    IF state_codes IS NULL THEN
+        -- Waits for transactions rebuilding single counties, and makes them wait for this one
+        LOCK TABLE slcsp_benchmarks IN EXCLUSIVE MODE;
+        DELETE FROM slcsp_benchmarks;
+    ELSE
+        FOR county IN
+            SELECT DISTINCT c.state_code, c.fips_county_code
+            FROM unnest(state_codes, fips_county_codes) AS c(state_code, fips_county_code)
+            ORDER BY c.state_code, c.fips_county_code
+        LOOP
+            PERFORM pg_advisory_xact_lock(hashtext('slcsp_benchmarks'),
+                                          hashtext(county.state_code || ':' || county.fips_county_code));
+        END LOOP;
+
+        DELETE FROM slcsp_benchmarks b
+        USING unnest(state_codes, fips_county_codes) AS c(state_code, fips_county_code)
+        WHERE b.state_code = c.state_code AND b.fips_county_code = c.fips_county_code;
+    END IF;
+
+    -- Read committed: this statement sees the plans of every rebuild that finished while we waited
+    INSERT INTO slcsp_benchmarks (state_code, fips_county_code, age, premium,
+                                  plan_id_standard_component, silver_plan_count)
+    SELECT state_code, fips_county_code, age, premium, plan_id_standard_component, silver_plan_count
+    FROM (
+        SELECT p.state_code,
+               p.fips_county_code,
+               a.age,
+               a.premium,
+               p.plan_id_standard_component,
+               ROW_NUMBER() OVER county_age AS premium_rank,
+               COUNT(*) OVER (PARTITION BY p.state_code, p.fips_county_code, a.age) AS silver_plan_count
+        FROM marketplace_plans p
+        CROSS JOIN LATERAL (VALUES
+            (14, p.premium_child_age_0_14),
+            (18, p.premium_child_age_18),
+            (21, p.premium_adult_individual_age_21),
+            (27, p.premium_adult_individual_age_27),
+            (30, p.premium_adult_individual_age_30),
+            (40, p.premium_adult_individual_age_40),
+            (50, p.premium_adult_individual_age_50),
+            (60, p.premium_adult_individual_age_60)
+        ) AS a(age, premium)
+        WHERE p.metal_level = 'Silver'
+          AND a.premium IS NOT NULL
+          AND (state_codes IS NULL OR (p.state_code, p.fips_county_code) IN (
+                SELECT c.state_code, c.fips_county_code
+                FROM unnest(state_codes, fips_county_codes) AS c(state_code, fips_county_code)))
+        WINDOW county_age AS (PARTITION BY p.state_code, p.fips_county_code, a.age
+                              ORDER BY a.premium, p.plan_id_standard_component)
+    ) ranked
+    -- A county with a single Silver plan uses that plan as its benchmark
+    WHERE premium_rank = LEAST(2, silver_plan_count);
+
+    GET DIAGNOSTICS written = ROW_COUNT;
+    RETURN written;
+END;
+$$;
+
+COMMENT ON FUNCTION refresh_slcsp_benchmarks(TEXT[], INTEGER[]) IS 'Rebuild slcsp_benchmarks for the given counties (all counties when called without arguments); concurrent rebuilds of a county wait for each other';